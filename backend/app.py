@@ -1,23 +1,55 @@
 import logging
-from fastapi import FastAPI, HTTPException
+from typing import List, Optional
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from prometheus_client import make_asgi_app
 
 from config import Config
+from core.admission import LANE_BATCH, LANES, AdmissionRejected, Ticket, admitted_stream, get_admission_controller
+from core.batch import run_batch
+from core.drain import get_drain
+from core.jobs import JobNotFoundError, ResearchJob, get_job_manager
+from core.loop import LoopLagMonitor
 from core.orchestrator import perform_market_research_stream
-from core.metrics import REQUESTS_TOTAL
-from llm_client import get_gemini_client
+from core.protocol import PROTOCOL_DELTA, PROTOCOL_LEGACY, SUPPORTED_PROTOCOLS, StateStream
+from core.state import AgentState
+from core.streaming import stream_until_disconnect
+from core.tracing import get_tracer, waterfall
+from core.metrics import REQUESTS_TOTAL, mark_worker_dead, metrics_registry
+from core.sse import dumps
+from tools.extract import shutdown_extract_pool
+from tools.http import close_http_clients
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("market_analyst_agent")
 
-app = FastAPI(title="Market Analyst Agent")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loop_monitor = LoopLagMonitor(Config.LOOP_LAG_INTERVAL)
+    if Config.LOOP_LAG_INTERVAL > 0:
+        loop_monitor.start()
+    drain = get_drain()
+    drain.install(Config.SHUTDOWN_GRACE_SECONDS)
+    yield
+    await loop_monitor.stop()
+    # Let background jobs finish within what is left of the drain's grace
+    # period, then close pooled outbound connections and extraction workers
+    await get_job_manager().shutdown(drain.remaining())
+    await close_http_clients()
+    shutdown_extract_pool()
+    get_tracer().shutdown()
+    drain.uninstall()
+    mark_worker_dead()
 
-# Metrics endpoint
-metrics_app = make_asgi_app()
+
+app = FastAPI(title="Market Analyst Agent", lifespan=lifespan)
+
+# Metrics endpoint (aggregated over workers in multi-worker mode)
+metrics_app = make_asgi_app(metrics_registry())
 app.mount("/metrics", metrics_app)
 
 # CORS mapping
@@ -29,22 +61,197 @@ app.add_middleware(
 class ResearchRequest(BaseModel):
     topic: str
     research_depth: int = 1
+    # SSE wire protocol: 1 = legacy full state, 2 = delta patches (core.protocol)
+    protocol: int = PROTOCOL_LEGACY
+
+def _too_busy(e: AdmissionRejected) -> HTTPException:
+    REQUESTS_TOTAL.labels(status="rejected").inc()
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+def _check_not_draining() -> None:
+    if get_drain().draining:
+        REQUESTS_TOTAL.labels(status="draining").inc()
+        raise HTTPException(status_code=503, detail="Server is restarting", headers={"Retry-After": "5"})
+
+class AdmittedResponse(StreamingResponse):
+    """Event stream that frees its admission ticket even if the body never starts."""
+
+    def __init__(self, ticket: Ticket, content, **kwargs):
+        super().__init__(content, **kwargs)
+        self.ticket = ticket
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # admitted_stream releases it too, but only once iteration began;
+            # a client gone before the response started never iterates it
+            self.ticket.release()
+
+class AttachedResponse(StreamingResponse):
+    """Event stream of a shared job that detaches its caller however the response ends."""
+
+    def __init__(self, job: ResearchJob, content, **kwargs):
+        super().__init__(content, **kwargs)
+        self.job = job
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # Not left to the subscription: a client gone before the response
+            # started never iterates it, and the job would run for nobody
+            self.job.detach()
+
+def _stream_headers(protocol: int, stream: StateStream) -> dict:
+    headers = {"X-SSE-Protocol": str(protocol)}
+    if stream.trace_id:
+        headers["X-Trace-Id"] = stream.trace_id
+    return headers
 
 @app.post("/research")
-async def research_topic(request: ResearchRequest):
+async def research_topic(request: ResearchRequest, http_request: Request):
+    _check_not_draining()
     if not request.topic or len(request.topic.strip()) == 0:
         REQUESTS_TOTAL.labels(status="bad_request").inc()
         raise HTTPException(status_code=400, detail="Topic is required")
+    if request.protocol not in SUPPORTED_PROTOCOLS:
+        REQUESTS_TOTAL.labels(status="bad_request").inc()
+        raise HTTPException(status_code=400, detail=f"Unsupported protocol {request.protocol}; supported: {list(SUPPORTED_PROTOCOLS)}")
+
+    if not Config.COALESCE_REQUESTS:
+        try:
+            ticket = get_admission_controller().enqueue()
+        except AdmissionRejected as e:
+            raise _too_busy(e)
+        stream = StateStream(AgentState(), request.protocol)
+        frames = admitted_stream(ticket, stream, perform_market_research_stream(
+            request.topic, request.research_depth, request.protocol, stream=stream
+        ))
+        return AdmittedResponse(
+            ticket,
+            stream_until_disconnect(frames, http_request.receive),
+            media_type="text/event-stream",
+            headers=_stream_headers(request.protocol, stream)
+        )
+
+    # Identical in-flight requests share one pipeline run, which is cancelled
+    # once every caller has disconnected
+    try:
+        job, _ = get_job_manager().join_or_create(
+            request.topic, request.research_depth, request.protocol, detached=False
+        )
+    except AdmissionRejected as e:
+        raise _too_busy(e)
+    return AttachedResponse(
+        job,
+        stream_until_disconnect(job.subscribe(), http_request.receive),
+        media_type="text/event-stream",
+        headers=dict(_stream_headers(request.protocol, job.stream), **{"X-Job-Id": job.id})
+    )
+
+class JobRequest(BaseModel):
+    topic: str
+    research_depth: int = 1
+    # Admission lane: "interactive" or "batch" for scheduled work
+    priority: str = "interactive"
+
+def _get_job(job_id: str):
+    try:
+        return get_job_manager().get(job_id)
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
+@app.post("/research/jobs", status_code=202)
+async def create_research_job(request: JobRequest):
+    """Start research in the background; events use the delta protocol."""
+    _check_not_draining()
+    if not request.topic or len(request.topic.strip()) == 0:
+        REQUESTS_TOTAL.labels(status="bad_request").inc()
+        raise HTTPException(status_code=400, detail="Topic is required")
+    if request.priority not in LANES:
+        REQUESTS_TOTAL.labels(status="bad_request").inc()
+        raise HTTPException(status_code=400, detail=f"Unknown priority {request.priority!r}; supported: {list(LANES)}")
+
+    try:
+        job, joined = get_job_manager().join_or_create(
+            request.topic, request.research_depth, PROTOCOL_DELTA, request.priority
+        )
+    except AdmissionRejected as e:
+        raise _too_busy(e)
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "coalesced": joined,
+        "events_url": f"/research/jobs/{job.id}/events",
+    }
+
+@app.get("/research/jobs/{job_id}")
+async def get_research_job(job_id: str):
+    return _get_job(job_id).to_dict()
+
+@app.get("/research/jobs/{job_id}/events")
+async def stream_research_job(job_id: str, http_request: Request, last_event_id: Optional[int] = Header(None)):
+    """Replay a job's events after Last-Event-ID, then follow it live."""
+    job = _get_job(job_id)
+    return StreamingResponse(
+        stream_until_disconnect(job.subscribe(last_event_id or 0), http_request.receive),
+        media_type="text/event-stream",
+        headers={"X-SSE-Protocol": str(job.protocol)}
+    )
+
+class BatchRequest(BaseModel):
+    topics: List[str]
+    research_depth: int = 1
+    # Topics researched at once (default Config.BATCH_CONCURRENCY)
+    concurrency: Optional[int] = None
+
+async def _ndjson(lines):
+    async for line in lines:
+        yield dumps(line) + b"\n"
+
+@app.post("/research/batch")
+async def research_batch(request: BatchRequest):
+    """Research many topics; one NDJSON line per topic as it finishes, then a summary."""
+    _check_not_draining()
+    topics = [topic.strip() for topic in request.topics]
+    if not topics or not all(topics):
+        REQUESTS_TOTAL.labels(status="bad_request").inc()
+        raise HTTPException(status_code=400, detail="Topics must be a non-empty list of non-empty strings")
+    if len(topics) > Config.BATCH_MAX_TOPICS:
+        REQUESTS_TOTAL.labels(status="bad_request").inc()
+        raise HTTPException(status_code=400, detail=f"At most {Config.BATCH_MAX_TOPICS} topics per batch")
+    try:
+        get_admission_controller().check(LANE_BATCH)
+    except AdmissionRejected as e:
+        raise _too_busy(e)
+
+    concurrency = min(request.concurrency or Config.BATCH_CONCURRENCY, Config.BATCH_MAX_CONCURRENCY)
     return StreamingResponse(
-        perform_market_research_stream(request.topic, request.research_depth),
-        media_type="text/event-stream"
+        _ndjson(run_batch(topics, request.research_depth, concurrency)),
+        media_type="application/x-ndjson"
     )
 
+@app.get("/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    """A recent session's spans as a waterfall (needs the `memory` trace exporter)."""
+    exporter = get_tracer().exporter("memory")
+    spans = exporter.get(trace_id) if exporter is not None else None
+    if spans is None:
+        raise HTTPException(status_code=404, detail=f"Trace {trace_id} not found")
+    return {"trace_id": trace_id, "spans": waterfall(spans)}
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "model": Config.GEMINI_MODEL}
 
+@app.get("/health/ready")
+async def readiness_check():
+    """Whether this worker takes new research; 503 while it drains for a shutdown."""
+    if get_drain().draining:
+        raise HTTPException(status_code=503, detail="Draining for shutdown", headers={"Retry-After": "5"})
+    return {"status": "ready"}
+
 @app.get("/")
 async def root():
     return {"service": "Market Analyst Agent", "version": "2.0"}
@@ -0,0 +1 @@
+"""Performance benchmarks for the Market Analyst Agent backend."""
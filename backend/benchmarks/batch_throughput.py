@@ -0,0 +1,63 @@
+"""
+Batch research throughput at different concurrency settings.
+
+Runs `--topics` topics through `run_batch` against a stub LLM and a stub
+search provider, each with a fixed latency, at every concurrency level in
+`--levels`. The stub LLM returns the same search queries for every topic, so
+the summary also shows how many searches the cross-topic deduplication saved.
+
+Usage (from backend/):
+    python -m benchmarks.batch_throughput --topics 32 --levels 1 2 4 8 16
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import time
+from unittest.mock import patch
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-key")
+
+from benchmarks.llm_concurrency import StubLLM  # noqa: E402
+from config import Config  # noqa: E402
+from core.admission import AdmissionController  # noqa: E402
+from core.batch import run_batch  # noqa: E402
+
+
+async def _batch(topics: int, concurrency: int, search_latency: float) -> tuple:
+    async def search(query, research_depth):
+        await asyncio.sleep(search_latency)
+        return [{"title": query, "url": "https://example.com", "description": "stub result"}]
+
+    # Measure the batch scheduler alone, not the server-wide admission limits
+    with patch("core.orchestrator._run_search", side_effect=search), \
+            patch("core.admission._controller", AdmissionController(max_in_flight=0, batch_max_in_flight=0)):
+        start = time.perf_counter()
+        lines = [line async for line in run_batch([f"topic {i}" for i in range(topics)], 1, concurrency)]
+        return time.perf_counter() - start, lines[-1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--topics", type=int, default=32, help="topics per batch")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="concurrency levels")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub LLM latency per call (seconds)")
+    parser.add_argument("--search-latency", type=float, default=0.05, help="stub search latency (seconds)")
+    args = parser.parse_args()
+
+    print(f"{args.topics} topics, LLM latency {args.latency}s, search latency {args.search_latency}s")
+    for level in args.levels:
+        # Fresh client per run so LLM cache hits from one level don't speed up the next
+        with patch("llm_client.client_sdk", StubLLM(args.latency)), \
+                patch("llm_client._client", None), \
+                patch.object(Config, "LLM_CACHE_ENABLED", False), \
+                contextlib.redirect_stdout(io.StringIO()):
+            elapsed, summary = asyncio.run(_batch(args.topics, level, args.search_latency))
+        print(f"  concurrency {level:>3}: {elapsed:6.2f}s  {args.topics / elapsed:6.1f} topics/sec  "
+              f"searches {summary['searches_executed']}/{summary['searches_requested']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Prompt size and stage latency with and without context packing.
+
+Runs one depth-3 research session over the fixed corpus in
+corpus/research_context.json: 5 queries x 5 results of ~500 characters
+(syndicated duplicates included), 5 deep-read documents, and researcher
+and analyst output with the repetition real model output has. The stub
+LLM reports the estimated prompt size as usage metadata and answers after
+`--base` seconds plus `--per-1k` seconds per thousand prompt tokens, a
+simple model of prefill cost.
+
+The baseline uses the unpacked formatting the pipeline had before
+core.context and core.sources: the first 15 results in query order,
+repeats included, every document whole, and the full researcher and
+analyst output.
+
+Usage (from backend/):
+    python -m benchmarks.context_packing --base 0.3 --per-1k 0.25
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-key")
+
+from config import Config  # noqa: E402
+from core import orchestrator  # noqa: E402
+from core.context import estimate_tokens  # noqa: E402
+from core.metrics import AGENT_STEP_DURATION  # noqa: E402
+from core.usage import TokenUsage  # noqa: E402
+
+CORPUS = Path(__file__).parent / "corpus" / "research_context.json"
+ROLES = ("researcher", "analyst", "synthesizer")
+
+
+class _LegacySourceIndex:
+    """Every result in query order, repeats included."""
+
+    def __init__(self):
+        self.results = {}
+
+    def add(self, query_index, results):
+        self.results[query_index] = list(results)
+        return self.results[query_index]
+
+    def ranked(self):
+        return [r for _, results in sorted(self.results.items()) for r in results]
+
+
+def _legacy_sources(sources, budget, seen=None, max_items=None):
+    return "\n\n".join(f"Source {i+1}: {r['title']}\nURL: {r['url']}\nDescription: {r['description']}"
+                       for i, r in enumerate(sources[:15]))
+
+
+def _legacy_documents(documents, budget, seen=None):
+    return "\n\n".join(f"Document {i+1} ({url}):\n{text}" for i, (url, text) in enumerate(documents))
+
+
+def _legacy_text(text, budget):
+    return text
+
+
+class StubLLM:
+    """Stand-in for `genai.Client` whose latency grows with prompt size."""
+
+    def __init__(self, corpus: dict, base: float, per_1k: float):
+        self.corpus = corpus
+        self.base = base
+        self.per_1k = per_1k
+        self.aio = SimpleNamespace(models=SimpleNamespace(
+            generate_content=self._generate,
+            generate_content_stream=self._generate_stream,
+        ))
+
+    def _answer(self, prompt: str) -> str:
+        if prompt.startswith("Extract 3-5"):
+            return "\n".join(self.corpus["queries"])
+        if prompt.startswith("Analyze source data"):
+            return self.corpus["raw_data"]
+        if prompt.startswith("Extract insights"):
+            return self.corpus["insights"]
+        if "Data visualization expert" in prompt:
+            return '{"charts": []}'
+        return "Plan: size the market, map suppliers, track chemistry and policy."
+
+    async def _respond(self, prompt: str) -> SimpleNamespace:
+        tokens = estimate_tokens(prompt)
+        await asyncio.sleep(self.base + self.per_1k * tokens / 1000)
+        usage = SimpleNamespace(prompt_token_count=tokens, candidates_token_count=0)
+        return SimpleNamespace(text=self._answer(prompt), usage_metadata=usage)
+
+    async def _generate(self, **kwargs) -> SimpleNamespace:
+        return await self._respond(kwargs["contents"])
+
+    async def _generate_stream(self, **kwargs):
+        response = await self._respond(kwargs["contents"])
+
+        async def chunks():
+            for line in response.text.splitlines(keepends=True):
+                yield SimpleNamespace(text=line, usage_metadata=None)
+            yield SimpleNamespace(text="", usage_metadata=response.usage_metadata)
+        return chunks()
+
+
+def _stage_seconds() -> dict:
+    return {role: AGENT_STEP_DURATION.labels(role=role)._sum.get() for role in ROLES}
+
+
+async def _session(corpus: dict) -> TokenUsage:
+    by_query = dict(zip(corpus["queries"], corpus["results_by_query"]))
+
+    async def search(query, research_depth):
+        return by_query.get(query, [])
+
+    async def fetch(urls, deadline=None):
+        for url, text in corpus["documents"]:
+            yield url, {"success": True, "content": f"Document from: {url}\n\n{text}"}
+
+    usage = TokenUsage()
+    context = orchestrator.ResearchContext
+    with patch("core.orchestrator._run_search", side_effect=search), \
+            patch("core.orchestrator.iter_fetch_many", fetch), \
+            patch("core.orchestrator.ResearchContext", lambda *a, **kw: context(*a, **kw, usage=usage)):
+        async for _ in orchestrator.perform_market_research_stream(corpus["topic"], research_depth=3):
+            pass
+    return usage
+
+
+def _run(corpus: dict, stub: StubLLM, baseline: bool) -> tuple:
+    packers = {}
+    if baseline:
+        packers = {
+            "SourceIndex": _LegacySourceIndex,
+            "pack_sources": _legacy_sources,
+            "pack_documents": _legacy_documents,
+            "pack_text": _legacy_text,
+        }
+    with contextlib.ExitStack() as stack:
+        for name, replacement in packers.items():
+            stack.enter_context(patch(f"core.orchestrator.{name}", replacement))
+        stack.enter_context(patch("llm_client.client_sdk", stub))
+        stack.enter_context(patch("llm_client._client", None))
+        stack.enter_context(patch.object(Config, "LLM_CACHE_ENABLED", False))
+        stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+        before = _stage_seconds()
+        start = time.perf_counter()
+        usage = asyncio.run(_session(corpus))
+        elapsed = time.perf_counter() - start
+        after = _stage_seconds()
+    return usage, {role: after[role] - before[role] for role in ROLES}, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base", type=float, default=0.3, help="stub LLM latency per call (seconds)")
+    parser.add_argument("--per-1k", type=float, default=0.25, help="extra latency per 1000 prompt tokens (seconds)")
+    args = parser.parse_args()
+
+    corpus = json.loads(CORPUS.read_text())
+    stub = StubLLM(corpus, args.base, args.per_1k)
+
+    print(f"corpus: {CORPUS.name}, LLM latency {args.base}s + {args.per_1k}s per 1k prompt tokens")
+    print(f"  {'':10} {'role':12} {'prompt tokens':>14} {'stage seconds':>14}")
+    for label, baseline in (("before", True), ("after", False)):
+        usage, seconds, elapsed = _run(corpus, stub, baseline)
+        for role in ROLES:
+            tokens = usage.by_role.get(role, {}).get("prompt_tokens", 0)
+            print(f"  {label:10} {role:12} {tokens:>14} {seconds[role]:>14.2f}")
+        print(f"  {label:10} {'session':12} {usage.prompt_tokens:>14} {elapsed:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+HTML extraction throughput and memory per extractor.
+
+Runs every page in benchmarks/corpus/ through each registered extractor in
+a fresh child process and reports:
+
+- pages/sec and MB/sec over `--rounds` passes of the corpus
+- Python heap peak (tracemalloc) while extracting one pass
+- RSS growth over the import baseline (also counts libxml2's C heap,
+  which tracemalloc cannot see)
+
+With `--workers N` it also measures the default extractor through a
+process pool of N workers, the way `aextract_main_text` runs large pages.
+
+Usage (from backend/):
+    python -m benchmarks.extractors --rounds 20 --workers 4
+"""
+
+import argparse
+import glob
+import multiprocessing
+import os
+import resource
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-key")
+
+from tools.extract import EXTRACTORS, _mp_context, extract_main_text  # noqa: E402
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus")
+
+
+def load_corpus() -> list:
+    pages = []
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, "*.html"))):
+        with open(path, "rb") as f:
+            pages.append(f.read())
+    return pages
+
+
+def _measure(name: str, rounds: int) -> dict:
+    """Runs in a child process so peak RSS belongs to one extractor."""
+    pages = load_corpus()
+    extractor = EXTRACTORS[name]
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for page in pages:
+            extractor.extract(page)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    for page in pages:
+        extractor.extract(page)
+    _, heap_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "elapsed": elapsed,
+        "heap_peak": heap_peak,
+        # ru_maxrss is in kilobytes on Linux
+        "rss_growth": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_rss) * 1024,
+    }
+
+
+def _measure_pool(workers: int, rounds: int) -> float:
+    pages = load_corpus()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context()) as pool:
+        list(pool.map(extract_main_text, pages))  # start and warm workers
+        start = time.perf_counter()
+        list(pool.map(extract_main_text, pages * rounds))
+        return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=20, help="passes over the corpus")
+    parser.add_argument("--workers", type=int, default=0, help="also benchmark a process pool of this size")
+    args = parser.parse_args()
+
+    pages = load_corpus()
+    total_pages = len(pages) * args.rounds
+    total_mb = sum(len(page) for page in pages) * args.rounds / 1e6
+    print(f"{len(pages)} pages ({sum(len(page) for page in pages) / 1024:.0f}KB) x {args.rounds} rounds")
+    print(f"  {'extractor':<16} {'pages/sec':>10} {'MB/sec':>8} {'heap peak':>10} {'rss growth':>11}")
+
+    context = multiprocessing.get_context("spawn")
+    for name in EXTRACTORS:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as child:
+            result = child.submit(_measure, name, args.rounds).result()
+        print(f"  {name:<16} {total_pages / result['elapsed']:10.1f} {total_mb / result['elapsed']:8.2f} "
+              f"{result['heap_peak'] / 1e6:8.1f}MB {result['rss_growth'] / 1e6:9.1f}MB")
+
+    if args.workers:
+        elapsed = _measure_pool(args.workers, args.rounds)
+        label = f"pool x{args.workers}"
+        print(f"  {label:<16} {total_pages / elapsed:10.1f} {total_mb / elapsed:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+Microbenchmarks of the CPU-bound work done per request, with a regression gate.
+
+Cases (inputs built from benchmarks/corpus/):
+  sse.*          send_sse_update and encode_frame on a small and a full
+                 legacy state (25 sources, 40 log lines, full report)
+  extract.*      main-text extraction of each saved page, as fetch_document
+                 does after download
+  charts.*       JSON parsing of a fenced and a bare visualizer response
+  report.*       chart injection into the report's JSON metadata block
+  researcher.*   deduplicating and packing 25 search results for the
+                 researcher prompt
+  search.*       normalizing a 20-result Brave response and a Tavily response
+
+Each case is timed with timeit (best of `--repeat` short runs) and compared with
+benchmarks/baseline.json. Times are divided by a fixed pure-Python
+calibration workload timed in the same run, so a baseline recorded on one
+machine still applies on a faster or slower one. A case more than
+`--threshold` slower than its baseline is re-measured up to `--retries`
+times, keeping its best time, and fails the run (exit status 1) if it is
+still slower; cases without a baseline are reported as new.
+
+Usage (from backend/):
+    python -m benchmarks.hotpaths                  # compare with the baseline
+    python -m benchmarks.hotpaths --update         # record a new baseline
+    python -m benchmarks.hotpaths -k extract --threshold 0.5
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import timeit
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-key")
+
+from config import Config  # noqa: E402
+from core.context import pack_sources  # noqa: E402
+from core.orchestrator import inject_charts  # noqa: E402
+from core.sources import SourceIndex  # noqa: E402
+from core.sse import encode_frame  # noqa: E402
+from core.state import send_sse_update  # noqa: E402
+from tools.charts import parse_chart_response  # noqa: E402
+from tools.extract import extract_main_text  # noqa: E402
+from tools.search import _parse_results  # noqa: E402
+from tools.tavily import _format_results  # noqa: E402
+
+BENCHMARKS = Path(__file__).parent
+CORPUS = BENCHMARKS / "corpus"
+BASELINE = BENCHMARKS / "baseline.json"
+DEFAULT_THRESHOLD = 0.25
+
+# name -> setup returning the operation to time
+CASES: Dict[str, Callable[[], Callable[[], Any]]] = {}
+
+
+def case(name: str):
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+def _context() -> dict:
+    return json.loads((CORPUS / "research_context.json").read_text())
+
+
+def _results() -> List[Dict[str, str]]:
+    return [r for results in _context()["results_by_query"] for r in results]
+
+
+def _charts() -> List[Dict[str, Any]]:
+    years = [{"label": str(year), "value": round(56.0 * 1.18 ** (year - 2023), 1)} for year in range(2020, 2031)]
+    shares = [{"label": name, "value": share} for name, share in
+              (("CATL", 37.4), ("BYD", 15.8), ("LG Energy Solution", 13.6), ("Panasonic", 6.4), ("SK On", 4.9), ("Other", 21.9))]
+    regions = [{"label": region, "value": value} for region, value in (("China", 75), ("Europe", 14), ("North America", 8), ("Rest of world", 3))]
+    return [
+        {"type": "line", "title": "Global EV Battery Market (2020-2030)", "subtitle": "Billions USD, 2025+ (est)",
+         "data": years, "xAxisKey": "label", "dataKey": "value", "color": "#3b82f6"},
+        {"type": "bar", "title": "Cell Maker Market Share", "subtitle": "Source: installations 2024",
+         "data": shares, "xAxisKey": "label", "dataKey": "value", "color": "#10b981"},
+        {"type": "pie", "title": "Cell Manufacturing Capacity by Region", "subtitle": "Share of GWh",
+         "data": regions, "xAxisKey": "label", "dataKey": "value"},
+    ]
+
+
+def _report() -> str:
+    corpus = _context()
+    metadata = {
+        "title": f"{corpus['topic']} report",
+        "key_metrics": [{"name": f"metric {i}", "value": f"{i * 7.5}%"} for i in range(8)],
+        "sources": [{"title": r["title"], "url": r["url"]} for r in _results()[:12]],
+    }
+    return f"# {corpus['topic']}\n\n{corpus['insights']}\n\n```json\n{json.dumps(metadata, indent=2)}\n```\n"
+
+
+def _state(sources: int, logs: int, report: str) -> Dict[str, Any]:
+    results = _results()
+    return {
+        "current_step": "synthesizer",
+        "logs": [f"  → Search {i + 1}/{logs}: EV battery supplier market share (3 results)" for i in range(logs)],
+        "sources": [results[i % len(results)] for i in range(sources)],
+        "raw_data": _context()["raw_data"] if report else "",
+        "insights": _context()["insights"] if report else "",
+        "final_report": report,
+    }
+
+
+@case("sse.send_sse_update.small")
+def _sse_small():
+    state = _state(sources=3, logs=5, report="")
+    return lambda: send_sse_update("state", state)
+
+
+@case("sse.send_sse_update.full")
+def _sse_full():
+    state = _state(sources=25, logs=40, report=_report())
+    return lambda: send_sse_update("state", state)
+
+
+@case("sse.encode_frame.full")
+def _encode_full():
+    state = _state(sources=25, logs=40, report=_report())
+    return lambda: encode_frame("state", state, 42)
+
+
+def _extract_case(path: str):
+    content = Path(path).read_bytes()
+    return lambda: extract_main_text(content)
+
+
+for _page in sorted(glob.glob(str(CORPUS / "*.html"))):
+    case(f"extract.{Path(_page).stem}")(lambda path=_page: _extract_case(path))
+
+
+@case("charts.parse_fenced")
+def _charts_fenced():
+    response = f"Here are the charts:\n```json\n{json.dumps({'charts': _charts()}, indent=2)}\n```\nLet me know."
+    return lambda: parse_chart_response(response)
+
+
+@case("charts.parse_bare")
+def _charts_bare():
+    response = json.dumps({"charts": _charts()}, indent=2)
+    return lambda: parse_chart_response(response)
+
+
+@case("report.inject_charts")
+def _inject():
+    report = _report()
+    charts = _charts()
+    return lambda: inject_charts(report, charts)
+
+
+@case("researcher.format_sources")
+def _format_sources():
+    results_by_query = _context()["results_by_query"]
+
+    def format_sources():
+        index = SourceIndex()
+        for query_index, results in enumerate(results_by_query):
+            index.add(query_index, results)
+        return pack_sources(index.ranked(), Config.CONTEXT_BUDGET_RESEARCHER, set())
+    return format_sources
+
+
+@case("search.parse_brave")
+def _parse_brave():
+    web = [dict(r, age="2 days ago", language="en", family_friendly=True, extra_snippets=[r["description"][:200]] * 3,
+                profile={"name": r["title"].split(" - ")[-1], "url": r["url"], "img": "https://imgs.search.brave.com/x"},
+                meta_url={"scheme": "https", "netloc": r["url"].split("/")[2], "path": r["url"]})
+           for r in (_results() * 2)[:20]]
+    response_text = json.dumps({"type": "search", "query": {"original": "ev battery"}, "web": {"type": "search", "results": web}})
+    return lambda: _parse_results(response_text, 20)
+
+
+@case("search.format_tavily")
+def _format_tavily():
+    response = {"query": "ev battery", "results": [
+        {"title": r["title"], "url": r["url"], "content": r["description"] * 3, "score": 0.9, "raw_content": None}
+        for r in _results()[:10]
+    ]}
+    return lambda: _format_results(response)
+
+
+def _calibration() -> None:
+    """Fixed pure-Python workload that scales with the machine like the cases do."""
+    words = [f"word{i % 97}" for i in range(400)]
+    counts: Dict[str, int] = {}
+    for word in words:
+        counts[word] = counts.get(word, 0) + 1
+    json.loads(json.dumps(sorted(counts.items())))
+    " ".join(words).split()
+
+
+def _timer(op: Callable[[], Any], min_time: float = 0.02) -> tuple:
+    """A timeit.Timer for `op` and the loop count that takes at least `min_time`."""
+    timer = timeit.Timer(op, timer=time.process_time)
+    loops = 1
+    while timer.timeit(loops) < min_time:
+        loops *= 2
+    return timer, loops
+
+
+def run(names: List[str], repeat: int) -> Dict[str, Any]:
+    """
+    Best seconds per call of the calibration workload and the named cases.
+
+    Calibration runs are interleaved with every case's, so a machine that
+    speeds up or slows down mid-run affects both alike.
+    """
+    calibration, calibration_loops = _timer(_calibration)
+    best_calibration = float("inf")
+    cases = {}
+    for name in names:
+        timer, loops = _timer(CASES[name]())
+        best = float("inf")
+        for _ in range(repeat):
+            best_calibration = min(best_calibration, calibration.timeit(calibration_loops) / calibration_loops)
+            best = min(best, timer.timeit(loops) / loops)
+        cases[name] = best
+    return {"calibration": best_calibration, "cases": cases}
+
+
+def merge_best(current: Dict[str, Any], again: Dict[str, Any]) -> None:
+    """Keep the faster of two measurements of each case and of the calibration."""
+    current["calibration"] = min(current["calibration"], again["calibration"])
+    for name, seconds in again["cases"].items():
+        current["cases"][name] = min(current["cases"].get(name, seconds), seconds)
+
+
+def compare(current: Dict[str, Any], baseline: Optional[Dict[str, Any]], threshold: float) -> List[Dict[str, Any]]:
+    """
+    Rows of (case, baseline and current seconds, calibrated change, status).
+
+    Status is "ok", "regressed" (slower than baseline by more than
+    `threshold`), "improved" (faster by as much) or "new" (no baseline).
+    """
+    rows = []
+    scale = baseline["calibration"] / current["calibration"] if baseline else 1.0
+    for name, seconds in current["cases"].items():
+        base = (baseline or {}).get("cases", {}).get(name)
+        row = {"case": name, "baseline": base, "current": seconds, "change": None, "status": "new"}
+        if base:
+            row["change"] = seconds * scale / base - 1
+            row["status"] = ("regressed" if row["change"] > threshold
+                             else "improved" if row["change"] < -threshold else "ok")
+        rows.append(row)
+    return rows
+
+
+def _us(seconds: Optional[float]) -> str:
+    return "-" if seconds is None else f"{seconds * 1e6:.1f}"
+
+
+def format_rows(rows: List[Dict[str, Any]]) -> str:
+    lines = [f"  {'case':36} {'baseline us':>12} {'current us':>12} {'change':>8}  status"]
+    for row in rows:
+        change = "-" if row["change"] is None else f"{row['change']:+.0%}"
+        lines.append(f"  {row['case']:36} {_us(row['baseline']):>12} {_us(row['current']):>12} {change:>8}  {row['status']}")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="filter", default="", help="only cases whose name contains this")
+    parser.add_argument("--repeat", type=int, default=10, help="timed runs per case (best is kept)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown before a case fails, as a fraction")
+    parser.add_argument("--baseline", default=str(BASELINE), help="baseline file")
+    parser.add_argument("--retries", type=int, default=2,
+                        help="times to re-measure cases that look regressed before failing")
+    parser.add_argument("--update", action="store_true", help="write the results as the new baseline")
+    args = parser.parse_args()
+
+    names = [name for name in CASES if args.filter in name]
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else None
+    current = run(names, args.repeat)
+
+    if args.update:
+        # Timing noise only ever adds time, so record the best of two passes
+        merge_best(current, run(names, args.repeat))
+        if baseline and args.filter:
+            # Keep the other cases when re-recording a subset, on the old calibration
+            scale = baseline["calibration"] / current["calibration"]
+            rescaled = {name: seconds * scale for name, seconds in current["cases"].items()}
+            current = {"calibration": baseline["calibration"], "cases": {**baseline["cases"], **rescaled}}
+        baseline_path.write_text(json.dumps(current, indent=2, sort_keys=True) + "\n")
+        print(f"Wrote {len(current['cases'])} cases to {baseline_path}")
+        return
+
+    rows = compare(current, baseline, args.threshold)
+    for _ in range(args.retries):
+        suspects = [row["case"] for row in rows if row["status"] == "regressed"]
+        if not suspects:
+            break
+        print(f"Re-measuring {len(suspects)} case(s) that look slower: {', '.join(suspects)}")
+        merge_best(current, run(suspects, args.repeat * 2))
+        rows = compare(current, baseline, args.threshold)
+    print(format_rows(rows))
+    regressed = [row["case"] for row in rows if row["status"] == "regressed"]
+    if regressed:
+        print(f"\n{len(regressed)} case(s) regressed by more than {args.threshold:.0%}: {', '.join(regressed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
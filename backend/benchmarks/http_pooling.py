@@ -0,0 +1,151 @@
+"""
+Per-request cost of fresh connections vs the pooled HTTP layer.
+
+Starts a local HTTPS stub server with a throwaway self-signed certificate
+and sends the same sequence of small GET requests three ways:
+
+- fresh:        bare `requests.get` per call (the old search/fetch path)
+- pooled sync:  the shared keep-alive requests.Session
+- pooled async: the shared httpx client from `tools.http`
+
+Usage (from backend/):
+    python -m benchmarks.http_pooling --requests 200
+"""
+
+import argparse
+import asyncio
+import datetime
+import ipaddress
+import os
+import ssl
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-key")
+
+from tools.http import create_async_client, create_sync_session  # noqa: E402
+
+BODY = b'{"web": {"results": []}}'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this, Nagle plus
+    # delayed ACKs add ~40ms to every keep-alive response.
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+def _write_self_signed_cert(directory: str) -> tuple:
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=1))
+        .not_valid_after(now + datetime.timedelta(hours=1))
+        .add_extension(x509.SubjectAlternativeName([
+            x509.DNSName("localhost"), x509.IPAddress(ipaddress.ip_address("127.0.0.1"))
+        ]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = os.path.join(directory, "cert.pem")
+    key_path = os.path.join(directory, "key.pem")
+    with open(cert_path, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        ))
+    return cert_path, key_path
+
+
+def _start_server(cert_path: str, key_path: str) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert_path, key_path)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _bench_fresh(url: str, n: int, cafile: str) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        requests.get(url, verify=cafile, timeout=10).raise_for_status()
+    return time.perf_counter() - start
+
+
+def _bench_pooled_sync(url: str, n: int, cafile: str) -> float:
+    session = create_sync_session()
+    start = time.perf_counter()
+    for _ in range(n):
+        session.get(url, verify=cafile, timeout=10).raise_for_status()
+    elapsed = time.perf_counter() - start
+    session.close()
+    return elapsed
+
+
+async def _bench_pooled_async(url: str, n: int, cafile: str) -> float:
+    client = create_async_client(verify=ssl.create_default_context(cafile=cafile))
+    try:
+        start = time.perf_counter()
+        for _ in range(n):
+            (await client.get(url)).raise_for_status()
+        return time.perf_counter() - start
+    finally:
+        await client.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="requests per client")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cert_path, key_path = _write_self_signed_cert(tmp)
+        server = _start_server(cert_path, key_path)
+        url = f"https://localhost:{server.server_address[1]}/res/v1/web/search"
+        try:
+            results = {
+                "fresh": _bench_fresh(url, args.requests, cert_path),
+                "pooled sync": _bench_pooled_sync(url, args.requests, cert_path),
+                "pooled async": asyncio.run(_bench_pooled_async(url, args.requests, cert_path)),
+            }
+        finally:
+            server.shutdown()
+
+    baseline = results["fresh"] / args.requests
+    print(f"{args.requests} sequential HTTPS GETs against a local stub")
+    for name, elapsed in results.items():
+        per_request = elapsed / args.requests
+        print(f"  {name:<13} {per_request * 1000:7.2f} ms/request  "
+              f"(saves {(baseline - per_request) * 1000:6.2f} ms vs fresh)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Concurrency benchmark for the research pipeline against a local stub LLM.
+
+Runs N research sessions at once with every Gemini call replaced by a stub
+that waits a fixed latency. With async LLM calls the N sessions overlap on
+one event loop and finish in roughly the time of a single session; with the
+old blocking path they serialize and take N times as long.
+
+Usage (from backend/):
+    python -m benchmarks.llm_concurrency --sessions 8 --latency 0.2
+    python -m benchmarks.llm_concurrency --blocking   # emulate the old sync path
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-key")
+
+from config import Config  # noqa: E402
+from core.orchestrator import perform_market_research_stream  # noqa: E402
+
+
+class StubLLM:
+    """Stand-in for `genai.Client` that answers after a fixed delay."""
+
+    def __init__(self, latency: float, blocking: bool = False):
+        self.latency = latency
+        self.blocking = blocking
+        self.calls = 0
+        self.models = SimpleNamespace(generate_content=self._generate_sync)
+        self.aio = SimpleNamespace(models=SimpleNamespace(
+            generate_content=self._generate_async,
+            generate_content_stream=self._generate_stream,
+        ))
+
+    def _response(self) -> SimpleNamespace:
+        self.calls += 1
+        return SimpleNamespace(text="query one\nquery two\nquery three")
+
+    def _generate_sync(self, **kwargs) -> SimpleNamespace:
+        time.sleep(self.latency)
+        return self._response()
+
+    async def _generate_async(self, **kwargs) -> SimpleNamespace:
+        if self.blocking:
+            # Old behaviour: the sync SDK call runs directly on the event loop.
+            time.sleep(self.latency)
+        else:
+            await asyncio.sleep(self.latency)
+        return self._response()
+
+    async def _generate_stream(self, **kwargs):
+        response = await self._generate_async(**kwargs)
+
+        async def chunks():
+            yield response
+        return chunks()
+
+
+async def _run_session(topic: str) -> None:
+    async for _ in perform_market_research_stream(topic, research_depth=1):
+        pass
+
+
+async def _run_batch(sessions: int) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(_run_session(f"topic {i}") for i in range(sessions)))
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent research sessions")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub LLM latency per call (seconds)")
+    parser.add_argument("--blocking", action="store_true", help="block the event loop like the old sync client")
+    args = parser.parse_args()
+
+    stub = StubLLM(args.latency, blocking=args.blocking)
+    # Force mock search data so only LLM latency is measured.
+    with patch("llm_client.client_sdk", stub), \
+            patch.object(Config, "BRAVE_SEARCH_API_KEY", ""), \
+            contextlib.redirect_stdout(io.StringIO()):
+        single = asyncio.run(_run_batch(1))
+        concurrent = asyncio.run(_run_batch(args.sessions))
+
+    mode = "blocking" if args.blocking else "async"
+    print(f"mode={mode} latency={args.latency}s llm_calls={stub.calls}")
+    print(f"  1 session:  {single:.2f}s")
+    print(f"  {args.sessions} sessions: {concurrent:.2f}s ({concurrent / single:.2f}x a single session)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Hermetic load test of POST /research.
+
+Starts the provider stand-in (benchmarks.standin) in this process and the
+app as a uvicorn subprocess pointed at it, so every session goes through
+the real Gemini SDK, HTTP pool, rate limiters, caches, admission control
+and SSE stream without touching a real API. Then runs `--sessions`
+research sessions, at most `--concurrency` at a time, and reports:
+
+  throughput    completed sessions per second of wall time
+  end-to-end    request sent to terminal event, p50/p95/p99/max
+  first event   request sent to the first SSE event, p50/p95/p99/max
+  loop lag      the app's event-loop lag over the run, from the
+                event_loop_lag_seconds histogram on /metrics (bucket
+                upper bounds)
+
+Sessions end as completed, error (an error event), rejected (429 from
+admission control) or failed (connection error or other status).
+`--target` drives an already running app instead; `--app-env KEY=VALUE`
+overrides the spawned app's settings (e.g. ADMISSION_MAX_IN_FLIGHT=32)
+and `--json PATH` writes the report for later comparison.
+
+Usage (from backend/):
+    python -m benchmarks.load_test --sessions 40 --concurrency 20
+    python -m benchmarks.load_test --sessions 100 --concurrency 50 --llm-error-rate 0.02 --brave-rps 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.standin import add_arguments, app_env, from_arguments, serve_in_thread
+
+BACKEND = Path(__file__).resolve().parent.parent
+# The stand-in enforces provider rate limits; the app's own limiters
+# shouldn't throttle first, and denser lag sampling suits a short run
+SPAWN_DEFAULTS = {
+    "BRAVE_RATE_LIMIT": "1000",
+    "BRAVE_RATE_BURST": "1000",
+    "TAVILY_RATE_LIMIT": "1000",
+    "TAVILY_RATE_BURST": "1000",
+    "LOOP_LAG_INTERVAL": "0.1",
+}
+_LAG_BUCKET = re.compile(r'^event_loop_lag_seconds_bucket\{le="([^"]+)"\} (\S+)$', re.M)
+_LAG_SUM = re.compile(r"^event_loop_lag_seconds_sum (\S+)$", re.M)
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile (q in 0-100); None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def parse_lag(metrics_text: str) -> Dict:
+    """Cumulative event-loop lag bucket counts and sum from a /metrics scrape."""
+    buckets = {float(le): float(count) for le, count in _LAG_BUCKET.findall(metrics_text)}
+    total = _LAG_SUM.search(metrics_text)
+    return {"buckets": buckets, "sum": float(total.group(1)) if total else 0.0}
+
+
+def lag_summary(before: Dict, after: Dict) -> Dict:
+    """Lag quantiles (bucket upper bounds) and mean for the samples between two scrapes."""
+    buckets = {le: count - before["buckets"].get(le, 0) for le, count in after["buckets"].items()}
+    samples = buckets.get(float("inf"), 0)
+    summary = {"samples": int(samples), "mean": (after["sum"] - before["sum"]) / samples if samples else None}
+    for q in (50, 95, 99):
+        summary[f"p{q}"] = next((le for le, count in sorted(buckets.items()) if samples and count >= samples * q / 100), None)
+    return summary
+
+
+def summarize(sessions: List[Dict], wall: float) -> Dict:
+    """Throughput, outcome counts and latency percentiles of a run."""
+    outcomes = {status: 0 for status in ("completed", "error", "rejected", "failed")}
+    for session in sessions:
+        outcomes[session["status"]] += 1
+    completed = [s for s in sessions if s["status"] == "completed"]
+    report = {"sessions": len(sessions), "wall_seconds": wall, **outcomes,
+              "throughput": len(completed) / wall if wall else 0.0}
+    for name, values in (("end_to_end", [s["latency"] for s in completed]),
+                         ("first_event", [s["first_event"] for s in sessions if s["first_event"] is not None])):
+        report[name] = {f"p{q}": percentile(values, q) for q in (50, 95, 99)}
+        report[name]["max"] = max(values) if values else None
+    return report
+
+
+async def _session(client: httpx.AsyncClient, topic: str, depth: int, protocol: int) -> Dict:
+    started = time.perf_counter()
+    session = {"status": "failed", "first_event": None}
+    body = {"topic": topic, "research_depth": depth, "protocol": protocol}
+    try:
+        async with client.stream("POST", "/research", json=body) as response:
+            if response.status_code != 200:
+                await response.aread()
+                session["status"] = "rejected" if response.status_code == 429 else "failed"
+            else:
+                async for line in response.aiter_lines():
+                    if not line.startswith("event: "):
+                        continue
+                    if session["first_event"] is None:
+                        session["first_event"] = time.perf_counter() - started
+                    event = line[len("event: "):]
+                    if event in ("complete", "error"):
+                        session["status"] = "completed" if event == "complete" else "error"
+    except httpx.HTTPError:
+        pass
+    session["latency"] = time.perf_counter() - started
+    return session
+
+
+async def run_load(target: str, sessions: int, concurrency: int, depth: int, protocol: int) -> Dict:
+    """Run the sessions against `target` and return the summarized report."""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=target, timeout=httpx.Timeout(600, connect=30), limits=limits) as client:
+        async def one(i: int) -> Dict:
+            async with semaphore:
+                return await _session(client, f"EV battery market segment {i}", depth, protocol)
+
+        lag_before = parse_lag((await client.get("/metrics/")).text)
+        started = time.perf_counter()
+        results = await asyncio.gather(*(one(i) for i in range(sessions)))
+        wall = time.perf_counter() - started
+        lag_after = parse_lag((await client.get("/metrics/")).text)
+
+    report = summarize(results, wall)
+    report["loop_lag"] = lag_summary(lag_before, lag_after)
+    return report
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _spawn_app(stack: ExitStack, env: Dict[str, str]) -> str:
+    """Start the app with uvicorn in a subprocess; returns its URL once healthy."""
+    port = _free_port()
+    log = stack.enter_context(tempfile.TemporaryFile())
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND, env={**os.environ, **env}, stdout=log, stderr=subprocess.STDOUT,
+    )
+    stack.callback(process.wait, 30)
+    stack.callback(process.terminate)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            log.seek(0)
+            raise RuntimeError(f"App exited during startup:\n{log.read().decode(errors='replace')}")
+        try:
+            if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                return url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("App did not become healthy within 30s")
+
+
+def _ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value * 1000:.0f}"
+
+
+def format_report(report: Dict) -> str:
+    lines = [
+        f"{report['sessions']} sessions: {report['completed']} completed, {report['error']} error, "
+        f"{report['rejected']} rejected, {report['failed']} failed",
+        f"  throughput  {report['throughput']:.2f} sessions/s over {report['wall_seconds']:.1f}s",
+        f"  {'(ms)':12} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}",
+    ]
+    for label, key in (("end-to-end", "end_to_end"), ("first event", "first_event")):
+        row = report[key]
+        lines.append(f"  {label:12} " + " ".join(f"{_ms(row[k]):>8}" for k in ("p50", "p95", "p99", "max")))
+    lag = report["loop_lag"]
+    lines.append(f"  {'loop lag':12} " + " ".join(f"{'<=' + _ms(lag[k]):>8}" for k in ("p50", "p95", "p99"))
+                 + f"  mean {_ms(lag['mean'])}ms over {lag['samples']} samples")
+    if "standin" in report:
+        for provider, stats in report["standin"].items():
+            lines.append(f"  stand-in {provider:7} {stats['requests']:>6} requests, {stats['errors']} errors, "
+                         f"{stats['throttled']} throttled")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=40, help="research sessions to run")
+    parser.add_argument("--concurrency", type=int, default=20, help="sessions in flight at once")
+    parser.add_argument("--depth", type=int, default=1, help="research depth (2+ searches Tavily)")
+    parser.add_argument("--protocol", type=int, default=2, help="SSE protocol")
+    parser.add_argument("--target", help="URL of a running app to drive instead of spawning one")
+    parser.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE",
+                        help="setting for the spawned app (repeatable)")
+    parser.add_argument("--json", help="write the report to this file")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    with ExitStack() as stack:
+        standin = None
+        target = args.target
+        if target is None:
+            standin = from_arguments(args)
+            env = {**app_env(stack.enter_context(serve_in_thread(standin))), **SPAWN_DEFAULTS}
+            env.update(item.split("=", 1) for item in args.app_env)
+            target = _spawn_app(stack, env)
+        report = asyncio.run(run_load(target, args.sessions, args.concurrency, args.depth, args.protocol))
+        report["config"] = {k: v for k, v in vars(args).items() if k != "json"}
+        if standin is not None:
+            report["standin"] = standin.stats
+
+    print(format_report(report))
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Source deduplication cost and effect.
+
+Builds `--results` search results from the snippets in
+corpus/research_context.json: a third are the corpus results themselves,
+a third are the same pages under URL variants (tracking parameters,
+`www.`, AMP), and a third are syndicated copies on other sites with a
+few words changed. Indexes them with `SourceIndex` as `--queries` queries
+and reports the time per result and the unique sources left, with and
+without near-duplicate detection.
+
+Usage (from backend/):
+    python -m benchmarks.source_dedup --results 500 --queries 5
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from pathlib import Path
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-key")
+
+from core.sources import SourceIndex  # noqa: E402
+
+CORPUS = Path(__file__).parent / "corpus" / "research_context.json"
+URL_VARIANTS = ("{}?utm_source=newsletter&utm_medium=email", "{}/", "{}/amp", "{}#top")
+
+
+def _results(count: int, seed: int = 7) -> list:
+    corpus = json.loads(CORPUS.read_text())
+    originals = [r for results in corpus["results_by_query"] for r in results]
+    rng = random.Random(seed)
+    results = []
+    for i in range(count):
+        original = originals[i % len(originals)]
+        kind = i % 3
+        if kind == 0:
+            results.append(original)
+        elif kind == 1:
+            url = rng.choice(URL_VARIANTS).format(original["url"].replace("https://", "https://www."))
+            results.append(dict(original, url=url))
+        else:
+            words = original["description"].split()
+            for _ in range(3):
+                words[rng.randrange(len(words))] = rng.choice(("reportedly", "analysts", "said", "new"))
+            results.append(dict(original, url=f"https://syndicate{i}.example/story", description=" ".join(words)))
+    return results
+
+
+def _index(results: list, queries: int, similarity: float) -> tuple:
+    index = SourceIndex(similarity=similarity)
+    per_query = max(1, len(results) // queries)
+    start = time.perf_counter()
+    for query_index in range(queries):
+        index.add(query_index, results[query_index * per_query:(query_index + 1) * per_query])
+    elapsed = time.perf_counter() - start
+    return len(index), elapsed / (per_query * queries)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--results", type=int, default=500, help="search results per session")
+    parser.add_argument("--queries", type=int, default=5, help="queries the results are split across")
+    args = parser.parse_args()
+
+    results = _results(args.results)
+    print(f"{len(results)} results over {args.queries} queries")
+    print(f"  {'mode':16} {'unique':>8} {'us/result':>10}")
+    for label, similarity in (("url only", 0), ("near-duplicate", None)):
+        unique, per_result = _index(results, args.queries, similarity)
+        print(f"  {label:16} {unique:>8} {per_result * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
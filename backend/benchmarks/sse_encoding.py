@@ -0,0 +1,84 @@
+"""
+SSE frame encoding throughput: old string helper vs the bytes encoder.
+
+Encodes the legacy `state` frames of a session, the heaviest frames the
+pipeline sends repeatedly: every frame carries all sources and one more log
+line than the last. Three encoders are compared:
+
+- send_sse_update:  json.dumps + f-string, then .encode() as Starlette does
+- encode_frame:     bytes encoder (orjson when installed)
+- + fragments:      bytes encoder reusing cached item encodings
+
+Usage (from backend/):
+    python -m benchmarks.sse_encoding --frames 20000 --sources 25 --logs 40
+"""
+
+import argparse
+import os
+import time
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-key")
+
+from core import sse  # noqa: E402
+from core.sse import FragmentCache, encode_frame  # noqa: E402
+from core.state import send_sse_update  # noqa: E402
+
+
+def _state(sources: int, logs: int) -> dict:
+    return {
+        "current_step": "researcher",
+        "logs": [f"  → Search {i}/{logs}: electric vehicle battery supply chain... (5 results)" for i in range(logs)],
+        "sources": [
+            {"title": f"EV battery market report {i}", "url": f"https://example.com/reports/{i}",
+             "description": "Global lithium-ion battery demand, capacity additions and pricing outlook. " * 3}
+            for i in range(sources)
+        ],
+    }
+
+
+def _frames(state: dict, count: int):
+    """Yield `count` frame payloads whose log list grows by one line each, wrapping around."""
+    logs = state["logs"]
+    for i in range(count):
+        yield {"current_step": state["current_step"], "logs": logs[:i % len(logs) + 1], "sources": state["sources"]}
+
+
+def _rate(encode, state: dict, frames: int) -> float:
+    payloads = list(_frames(state, frames))
+    start = time.perf_counter()
+    for payload in payloads:
+        encode(payload)
+    return frames / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=20000, help="frames per encoder")
+    parser.add_argument("--sources", type=int, default=25, help="sources in each frame")
+    parser.add_argument("--logs", type=int, default=40, help="log lines in the largest frame")
+    args = parser.parse_args()
+
+    state = _state(args.sources, args.logs)
+    cache = FragmentCache()
+    encoders = {
+        "send_sse_update": lambda data: send_sse_update("state", data).encode("utf-8"),
+        "encode_frame": lambda data: encode_frame("state", data),
+        "+ fragments": lambda data: encode_frame("state", {
+            "current_step": data["current_step"],
+            "logs": cache.encode_list("logs", data["logs"]),
+            "sources": cache.encode_list("sources", data["sources"]),
+        }),
+    }
+
+    backend = "orjson" if sse.orjson is not None else "json (orjson not installed)"
+    size = len(encode_frame("state", state))
+    print(f"state frames: {args.sources} sources, up to {args.logs} logs ({size / 1024:.1f}KB); backend={backend}")
+    baseline = None
+    for name, encode in encoders.items():
+        rate = _rate(encode, state, args.frames)
+        baseline = baseline or rate
+        print(f"  {name:<16} {rate:10.0f} frames/sec  ({rate / baseline:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
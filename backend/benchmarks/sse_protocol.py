@@ -0,0 +1,91 @@
+"""
+Bytes on the wire per research session: legacy vs delta SSE protocol.
+
+Runs one research session per protocol against a stub LLM that streams a
+report of `--report-kb` kilobytes in `--chunks` pieces, with `--results`
+search results per query, and reports events and bytes sent.
+
+Usage (from backend/):
+    python -m benchmarks.sse_protocol --report-kb 8 --chunks 400 --results 5
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+from types import SimpleNamespace
+from unittest.mock import patch
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-key")
+
+from core.orchestrator import perform_market_research_stream  # noqa: E402
+from core.protocol import PROTOCOL_DELTA, PROTOCOL_LEGACY  # noqa: E402
+
+
+class StubLLM:
+    """Stand-in for `genai.Client` returning fixed-size text instantly."""
+
+    def __init__(self, report_bytes: int, chunks: int):
+        self.text = ("Market share grew across all regions. " * (report_bytes // 38 + 1))[:report_bytes]
+        self.chunks = chunks
+        self.aio = SimpleNamespace(models=SimpleNamespace(
+            generate_content=self._generate,
+            generate_content_stream=self._generate_stream,
+        ))
+
+    async def _generate(self, **kwargs) -> SimpleNamespace:
+        if kwargs["contents"].startswith("Extract 3-5"):
+            return SimpleNamespace(text="query one\nquery two\nquery three\nquery four\nquery five")
+        return SimpleNamespace(text=self.text)
+
+    async def _generate_stream(self, **kwargs):
+        size = max(1, len(self.text) // self.chunks)
+
+        async def pieces():
+            for i in range(0, len(self.text), size):
+                yield SimpleNamespace(text=self.text[i:i + size])
+        return pieces()
+
+
+async def _session_bytes(protocol: int, results: int) -> tuple:
+    async def search(query, research_depth):
+        return [
+            {"title": f"{query} result {i}", "url": f"https://example.com/{query}/{i}",
+             "description": "Industry analysis with revenue, share and forecast figures. " * 3}
+            for i in range(results)
+        ]
+
+    events = total = 0
+    with patch("core.orchestrator._run_search", side_effect=search):
+        async for frame in perform_market_research_stream("EV batteries", 1, protocol):
+            events += frame.count(b"\n\n")
+            total += len(frame)
+    return events, total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--report-kb", type=float, default=8, help="size of each streamed LLM response")
+    parser.add_argument("--chunks", type=int, default=400, help="stream chunks per response")
+    parser.add_argument("--results", type=int, default=5, help="search results per query")
+    args = parser.parse_args()
+
+    stub = StubLLM(int(args.report_kb * 1024), args.chunks)
+    with patch("llm_client.client_sdk", stub), \
+            patch("llm_client._client", None), \
+            patch("llm_client.Config.LLM_CACHE_ENABLED", False), \
+            contextlib.redirect_stdout(io.StringIO()):
+        results = {
+            "legacy (v1)": asyncio.run(_session_bytes(PROTOCOL_LEGACY, args.results)),
+            "delta (v2)": asyncio.run(_session_bytes(PROTOCOL_DELTA, args.results)),
+        }
+
+    baseline = results["legacy (v1)"][1]
+    print(f"one session: {args.report_kb:g}KB responses in {args.chunks} chunks, {args.results} results/query")
+    for name, (events, total) in results.items():
+        print(f"  {name:<12} {events:5d} events {total / 1024:9.1f} KB  ({total / baseline:.2f}x legacy)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+Local stand-in for the Gemini, Brave and Tavily APIs.
+
+Speaks enough of each provider's REST API for the real clients to talk to
+it unchanged: the google-genai SDK (generateContent and
+streamGenerateContent over SSE), the Brave web search GET and the Tavily
+search POST. Answers come from the fixed corpus in
+corpus/research_context.json, with the prompt's hash folded into search
+queries so different topics don't share search or LLM cache entries.
+
+Each provider has its own profile:
+  latency     a distribution: fixed:S, uniform:LO,HI, lognormal:MEDIAN,SIGMA
+              or exp:MEAN (seconds)
+  error rate  fraction of requests answered with a 500
+  rate limit  requests/second with a burst; excess requests get a 429
+
+LLM calls also pay `--llm-per-1k` seconds per thousand prompt tokens, and
+streamed responses arrive line by line `--llm-chunk-delay` seconds apart.
+GET /stats returns request, error and throttle counts per provider.
+
+Point the app at it with the environment printed on startup:
+
+Usage (from backend/):
+    python -m benchmarks.standin --port 8900 --llm-latency lognormal:0.8,0.5 --brave-rps 20
+"""
+
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import json
+import math
+import random
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CORPUS = Path(__file__).parent / "corpus" / "research_context.json"
+PROVIDERS = ("llm", "brave", "tavily")
+
+
+class Latency:
+    """A latency distribution parsed from a `kind:params` spec."""
+
+    PARAMS = {"fixed": 1, "uniform": 2, "lognormal": 2, "exp": 1}
+
+    def __init__(self, spec: str):
+        kind, _, params = spec.partition(":")
+        try:
+            values = [float(v) for v in params.split(",")]
+        except ValueError:
+            values = []
+        if self.PARAMS.get(kind) != len(values) or any(v < 0 for v in values) \
+                or (kind == "lognormal" and values[0] == 0):
+            raise ValueError(f"Invalid latency spec: {spec}")
+        self.spec = spec
+        self.kind = kind
+        self.values = values
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            return rng.uniform(*self.values)
+        if self.kind == "lognormal":
+            return rng.lognormvariate(math.log(self.values[0]), self.values[1])
+        if self.kind == "exp":
+            return rng.expovariate(1 / self.values[0]) if self.values[0] else 0.0
+        return self.values[0]
+
+
+class _Bucket:
+    """Non-blocking token bucket; `rate` <= 0 admits everything."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+@dataclass
+class Profile:
+    """Latency, error rate and rate limit of one stand-in provider."""
+
+    latency: Latency = field(default_factory=lambda: Latency("fixed:0"))
+    error_rate: float = 0.0
+    rate_limit: float = 0.0
+    burst: int = 1
+
+
+class StandIn:
+    """Provider behaviour and counters shared by the stand-in's endpoints."""
+
+    def __init__(self, profiles: Optional[Dict[str, Profile]] = None, llm_per_1k: float = 0.0,
+                 llm_chunk_delay: float = 0.0, seed: Optional[int] = None):
+        profiles = profiles or {}
+        self.profiles = {name: profiles.get(name) or Profile() for name in PROVIDERS}
+        self.llm_per_1k = llm_per_1k
+        self.llm_chunk_delay = llm_chunk_delay
+        self.corpus = json.loads(CORPUS.read_text())
+        self.rng = random.Random(seed)
+        self.stats = {name: {"requests": 0, "errors": 0, "throttled": 0} for name in PROVIDERS}
+        self._buckets = {name: _Bucket(p.rate_limit, p.burst) for name, p in self.profiles.items()}
+
+    async def admit(self, provider: str) -> Optional[JSONResponse]:
+        """Wait out the provider's latency; returns an error response to send instead, if any."""
+        profile = self.profiles[provider]
+        stats = self.stats[provider]
+        stats["requests"] += 1
+        if not self._buckets[provider].take():
+            stats["throttled"] += 1
+            return JSONResponse({"error": {"code": 429, "message": "Rate limit exceeded"}}, status_code=429)
+        await asyncio.sleep(profile.latency.sample(self.rng))
+        if self.rng.random() < profile.error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"error": {"code": 500, "message": "Injected error"}}, status_code=500)
+        return None
+
+    def answer(self, prompt: str) -> str:
+        """Pipeline-shaped text for a prompt, as the prompts' roles expect."""
+        tag = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:6]
+        if prompt.startswith("Extract 3-5"):
+            return "\n".join(f"{query} {tag}" for query in self.corpus["queries"])
+        if prompt.startswith("Analyze source data"):
+            return self.corpus["raw_data"]
+        if prompt.startswith("Extract insights"):
+            return self.corpus["insights"]
+        if "Data visualization expert" in prompt:
+            return json.dumps({"charts": [{"type": "bar", "title": "Market share", "data": [
+                {"name": "A", "value": 40}, {"name": "B", "value": 35}, {"name": "C", "value": 25}]}]})
+        return f"Plan {tag}: size the market, map suppliers, track chemistry and policy."
+
+    def results(self, query: str, count: int) -> list:
+        """`count` corpus results picked by the query's hash."""
+        pool = [r for results in self.corpus["results_by_query"] for r in results]
+        start = int(hashlib.sha1(query.encode("utf-8")).hexdigest(), 16) % len(pool)
+        return [pool[(start + i) % len(pool)] for i in range(min(count, len(pool)))]
+
+
+def _usage(prompt: str, text: str) -> dict:
+    prompt_tokens = max(1, len(prompt) // 4)
+    response_tokens = max(1, len(text) // 4)
+    return {"promptTokenCount": prompt_tokens, "candidatesTokenCount": response_tokens,
+            "totalTokenCount": prompt_tokens + response_tokens}
+
+
+def _candidate(text: str, finished: bool) -> dict:
+    candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+    if finished:
+        candidate["finishReason"] = "STOP"
+    return candidate
+
+
+def _prompt(body: dict) -> str:
+    return "".join(part.get("text", "") for content in body.get("contents", [])
+                   for part in content.get("parts", []))
+
+
+def create_app(standin: StandIn) -> FastAPI:
+    """The stand-in's HTTP API."""
+    app = FastAPI(title="Provider stand-in")
+
+    @app.post("/{version}/models/{target}")
+    async def gemini(version: str, target: str, request: Request):
+        model, _, method = target.partition(":")
+        if method not in ("generateContent", "streamGenerateContent"):
+            return JSONResponse({"error": {"code": 404, "message": f"Unknown method: {method}"}}, status_code=404)
+        prompt = _prompt(await request.json())
+        error = await standin.admit("llm")
+        if error is not None:
+            return error
+        await asyncio.sleep(standin.llm_per_1k * len(prompt) / 4000)
+        text = standin.answer(prompt)
+        if method == "generateContent":
+            return {"candidates": [_candidate(text, True)], "usageMetadata": _usage(prompt, text), "modelVersion": model}
+
+        async def frames():
+            lines = text.splitlines(keepends=True) or [text]
+            for i, line in enumerate(lines):
+                if i:
+                    await asyncio.sleep(standin.llm_chunk_delay)
+                chunk = {"candidates": [_candidate(line, i == len(lines) - 1)], "modelVersion": model}
+                if i == len(lines) - 1:
+                    chunk["usageMetadata"] = _usage(prompt, text)
+                yield f"data: {json.dumps(chunk)}\r\n\r\n"
+        return StreamingResponse(frames(), media_type="text/event-stream")
+
+    @app.get("/res/v1/web/search")
+    async def brave(q: str, count: int = 10):
+        error = await standin.admit("brave")
+        if error is not None:
+            return error
+        return {"web": {"results": standin.results(q, count)}}
+
+    @app.post("/search")
+    async def tavily(request: Request):
+        body = await request.json()
+        error = await standin.admit("tavily")
+        if error is not None:
+            return error
+        results = standin.results(body.get("query", ""), int(body.get("max_results", 5)))
+        return {"results": [{"title": r["title"], "url": r["url"], "content": r["description"]} for r in results]}
+
+    @app.get("/stats")
+    async def stats():
+        return standin.stats
+
+    return app
+
+
+def app_env(base_url: str) -> Dict[str, str]:
+    """Environment that points the app's provider clients at a stand-in."""
+    base_url = base_url.rstrip("/")
+    return {
+        "GOOGLE_API_KEY": "standin-key",
+        "BRAVE_SEARCH_API_KEY": "standin-key",
+        "TAVILY_API_KEY": "standin-key",
+        "GEMINI_BASE_URL": base_url,
+        "BRAVE_SEARCH_URL": f"{base_url}/res/v1/web/search",
+        "TAVILY_SEARCH_URL": f"{base_url}/search",
+    }
+
+
+@contextlib.contextmanager
+def serve_in_thread(standin: StandIn, host: str = "127.0.0.1", port: int = 0) -> Iterator[str]:
+    """Serve the stand-in from a background thread; yields its base URL."""
+    import uvicorn
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    server = uvicorn.Server(uvicorn.Config(create_app(standin), log_level="warning", lifespan="off"))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    try:
+        while not server.started:
+            if not thread.is_alive():
+                raise RuntimeError("Stand-in server failed to start")
+            time.sleep(0.01)
+        yield f"http://{host}:{sock.getsockname()[1]}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+        sock.close()
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Stand-in options, shared with benchmarks.load_test."""
+    for name, latency in (("llm", "lognormal:0.8,0.4"), ("brave", "lognormal:0.3,0.3"), ("tavily", "lognormal:0.6,0.3")):
+        parser.add_argument(f"--{name}-latency", default=latency, help=f"{name} latency distribution")
+        parser.add_argument(f"--{name}-error-rate", type=float, default=0.0, help=f"fraction of {name} requests that fail")
+        parser.add_argument(f"--{name}-rps", type=float, default=0.0, help=f"{name} rate limit (0 = none)")
+        parser.add_argument(f"--{name}-burst", type=int, default=5, help=f"{name} rate-limit burst")
+    parser.add_argument("--llm-per-1k", type=float, default=0.05, help="extra LLM seconds per 1k prompt tokens")
+    parser.add_argument("--llm-chunk-delay", type=float, default=0.02, help="seconds between streamed LLM chunks")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for latencies and errors")
+
+
+def from_arguments(args: argparse.Namespace) -> StandIn:
+    profiles = {
+        name: Profile(
+            latency=Latency(getattr(args, f"{name}_latency")),
+            error_rate=getattr(args, f"{name}_error_rate"),
+            rate_limit=getattr(args, f"{name}_rps"),
+            burst=getattr(args, f"{name}_burst"),
+        )
+        for name in PROVIDERS
+    }
+    return StandIn(profiles, llm_per_1k=args.llm_per_1k, llm_chunk_delay=args.llm_chunk_delay, seed=args.seed)
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    standin = from_arguments(args)
+    print("Start the app with:")
+    for key, value in app_env(f"http://{args.host}:{args.port}").items():
+        print(f"  export {key}={value}")
+    uvicorn.run(create_app(standin), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,7 @@ Centralized configuration management with environment variable validation.
 """
 
 import os
-from typing import List
+from typing import List, Tuple
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -17,10 +17,39 @@ class Config:
     # Google AI Configuration
     GOOGLE_API_KEY: str = os.getenv("GOOGLE_API_KEY", "")
     GEMINI_MODEL: str = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+    # Gemini API endpoint override, e.g. a local stand-in (empty = SDK default)
+    GEMINI_BASE_URL: str = os.getenv("GEMINI_BASE_URL", "")
+
+    # LLM response cache (identical model/prompt/config -> reuse the response)
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "500"))
+    LLM_CACHE_TTL: float = float(os.getenv("LLM_CACHE_TTL", "86400"))
+    # Optional SQLite disk tier shared across workers and restarts (empty = memory only)
+    LLM_CACHE_PATH: str = os.getenv("LLM_CACHE_PATH", "")
+    LLM_CACHE_DISK_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_DISK_MAX_ENTRIES", "10000"))
+    # Prompt context budgets in estimated tokens per stage (0 = unlimited),
+    # and the most search results the researcher sees
+    CONTEXT_BUDGET_RESEARCHER: int = int(os.getenv("CONTEXT_BUDGET_RESEARCHER", "3000"))
+    CONTEXT_BUDGET_ANALYST: int = int(os.getenv("CONTEXT_BUDGET_ANALYST", "2500"))
+    CONTEXT_BUDGET_SYNTHESIZER: int = int(os.getenv("CONTEXT_BUDGET_SYNTHESIZER", "2500"))
+    CONTEXT_MAX_SOURCES: int = int(os.getenv("CONTEXT_MAX_SOURCES", "15"))
+    # Word-bigram similarity at which two result snippets are merged as
+    # copies of one story (0 = merge repeated URLs only)
+    SOURCE_NEAR_DUPLICATE_SIMILARITY: float = float(os.getenv("SOURCE_NEAR_DUPLICATE_SIMILARITY", "0.5"))
+    # LLM tokens one research session may use before it degrades (0 = unlimited)
+    SESSION_TOKEN_BUDGET: int = int(os.getenv("SESSION_TOKEN_BUDGET", "0"))
 
     # Server Configuration
     PORT: int = int(os.getenv("PORT", "8000"))
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
+    # Server worker processes (0 = one per CPU); ignored with auto-reload in development
+    WORKERS: int = int(os.getenv("WORKERS", "1"))
+    # Directory for state shared between workers: multiprocess metrics and the
+    # default rate-limit and search-cache files (empty = a fresh temp directory)
+    WORKER_STATE_DIR: str = os.getenv("WORKER_STATE_DIR", "")
+    # Seconds a stopping worker lets in-flight SSE streams finish before
+    # ending them with a retryable error (core.drain)
+    SHUTDOWN_GRACE_SECONDS: float = float(os.getenv("SHUTDOWN_GRACE_SECONDS", "30"))
 
     # CORS Configuration
     ALLOWED_ORIGINS: List[str] = os.getenv(
@@ -43,6 +72,87 @@ class Config:
     # Search API Configuration
     BRAVE_SEARCH_API_KEY: str = os.getenv("BRAVE_SEARCH_API_KEY", "")
     TAVILY_API_KEY: str = os.getenv("TAVILY_API_KEY", "")
+    BRAVE_SEARCH_URL: str = os.getenv("BRAVE_SEARCH_URL", "https://api.search.brave.com/res/v1/web/search")
+    TAVILY_SEARCH_URL: str = os.getenv("TAVILY_SEARCH_URL", "https://api.tavily.com/search")
+
+    # Maximum number of researcher search queries in flight per session
+    SEARCH_CONCURRENCY: int = int(os.getenv("SEARCH_CONCURRENCY", "5"))
+
+    # Shared outbound HTTP pool
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE: int = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+    HTTP_MAX_PER_HOST: int = int(os.getenv("HTTP_MAX_PER_HOST", "10"))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+    HTTP_DNS_CACHE_TTL: float = float(os.getenv("HTTP_DNS_CACHE_TTL", "300"))
+    HTTP_TIMEOUT: float = float(os.getenv("HTTP_TIMEOUT", "10"))
+    HTTP2_ENABLED: bool = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+
+    # Concurrent document fetching (tools.fetch.fetch_many)
+    FETCH_CONCURRENCY: int = int(os.getenv("FETCH_CONCURRENCY", "10"))
+    FETCH_MAX_PER_HOST: int = int(os.getenv("FETCH_MAX_PER_HOST", "2"))
+
+    # HTML extraction (tools.extract): "lxml" or "soup"; pages of at least
+    # EXTRACT_PROCESS_MIN_BYTES are parsed in a process pool started on first use.
+    # EXTRACT_WORKERS is per server worker (0 = auto: up to 4 CPUs shared between them)
+    HTML_EXTRACTOR: str = os.getenv("HTML_EXTRACTOR", "lxml")
+    EXTRACT_WORKERS: int = int(os.getenv("EXTRACT_WORKERS", "0"))
+    EXTRACT_PROCESS_MIN_BYTES: int = int(os.getenv("EXTRACT_PROCESS_MIN_BYTES", "65536"))
+
+    # Deep-read stage: fetch full text of top sources at high research depth
+    DEEP_READ_MIN_DEPTH: int = int(os.getenv("DEEP_READ_MIN_DEPTH", "3"))
+    DEEP_READ_TOP_K: int = int(os.getenv("DEEP_READ_TOP_K", "5"))
+    DEEP_READ_BUDGET_SECONDS: float = float(os.getenv("DEEP_READ_BUDGET_SECONDS", "8"))
+    DEEP_READ_MAX_CHARS: int = int(os.getenv("DEEP_READ_MAX_CHARS", "3000"))
+
+    # Background research jobs: how long finished jobs stay retrievable and
+    # how many event chunks each job keeps for replay
+    JOB_RETENTION_SECONDS: float = float(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+    JOB_EVENT_LOG_SIZE: int = int(os.getenv("JOB_EVENT_LOG_SIZE", "2000"))
+    # Share one pipeline run between identical in-flight /research requests
+    COALESCE_REQUESTS: bool = os.getenv("COALESCE_REQUESTS", "true").lower() == "true"
+
+    # Batch research (POST /research/batch): topics researched at once by
+    # default, the most a request may ask for, and topics per request
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "4"))
+    BATCH_MAX_CONCURRENCY: int = int(os.getenv("BATCH_MAX_CONCURRENCY", "32"))
+    BATCH_MAX_TOPICS: int = int(os.getenv("BATCH_MAX_TOPICS", "500"))
+
+    # Admission control: pipelines running at once (0 = unlimited), sessions
+    # allowed to wait per lane, and slots batch work may hold so interactive
+    # users always get through. Retry-After when there is no timing history yet.
+    # Limits are for the whole server; each of WORKERS workers enforces its share.
+    ADMISSION_MAX_IN_FLIGHT: int = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "8"))
+    ADMISSION_QUEUE_SIZE: int = int(os.getenv("ADMISSION_QUEUE_SIZE", "32"))
+    ADMISSION_BATCH_MAX_IN_FLIGHT: int = int(os.getenv("ADMISSION_BATCH_MAX_IN_FLIGHT", "6"))
+    ADMISSION_BATCH_QUEUE_SIZE: int = int(os.getenv("ADMISSION_BATCH_QUEUE_SIZE", "64"))
+    ADMISSION_RETRY_AFTER_SECONDS: int = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "30"))
+
+    # Event-loop lag sampling interval in seconds (core.loop; 0 = off)
+    LOOP_LAG_INTERVAL: float = float(os.getenv("LOOP_LAG_INTERVAL", "0.5"))
+
+    # Session tracing (core.tracing): comma-separated exporters out of
+    # memory, jsonl and otlp (empty = tracing off)
+    TRACE_EXPORTERS: str = os.getenv("TRACE_EXPORTERS", "memory")
+    TRACE_MEMORY_MAX_TRACES: int = int(os.getenv("TRACE_MEMORY_MAX_TRACES", "200"))
+    TRACE_JSONL_PATH: str = os.getenv("TRACE_JSONL_PATH", "traces.jsonl")
+    TRACE_OTLP_ENDPOINT: str = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318")
+    TRACE_SERVICE_NAME: str = os.getenv("TRACE_SERVICE_NAME", "market-analyst-agent")
+
+    # Search provider rate limits (sustained requests/second and burst size)
+    BRAVE_RATE_LIMIT: float = float(os.getenv("BRAVE_RATE_LIMIT", "1.0"))
+    BRAVE_RATE_BURST: int = int(os.getenv("BRAVE_RATE_BURST", "1"))
+    TAVILY_RATE_LIMIT: float = float(os.getenv("TAVILY_RATE_LIMIT", "5.0"))
+    TAVILY_RATE_BURST: int = int(os.getenv("TAVILY_RATE_BURST", "5"))
+
+    # SQLite file for rate-limit state shared across workers (empty = per process)
+    RATE_LIMIT_DB_PATH: str = os.getenv("RATE_LIMIT_DB_PATH", "")
+
+    # Search result cache (SQLite file shared across workers; empty = in-memory)
+    SEARCH_CACHE_PATH: str = os.getenv("SEARCH_CACHE_PATH", "")
+    SEARCH_CACHE_MAX_ENTRIES: int = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "5000"))
+    SEARCH_CACHE_TTL_BRAVE: float = float(os.getenv("SEARCH_CACHE_TTL_BRAVE", "21600"))
+    SEARCH_CACHE_TTL_TAVILY: float = float(os.getenv("SEARCH_CACHE_TTL_TAVILY", "21600"))
+    SEARCH_CACHE_NEGATIVE_TTL: float = float(os.getenv("SEARCH_CACHE_NEGATIVE_TTL", "300"))
 
     # Logging Configuration
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
@@ -87,6 +197,44 @@ class Config:
         """Check if running in production mode."""
         return cls.ENVIRONMENT == "production"
 
+    @classmethod
+    def get_rate_limit(cls, provider: str) -> Tuple[float, int]:
+        """
+        Get (requests per second, burst) for a search provider.
+        """
+        if provider == "brave":
+            return cls.BRAVE_RATE_LIMIT, cls.BRAVE_RATE_BURST
+        if provider == "tavily":
+            return cls.TAVILY_RATE_LIMIT, cls.TAVILY_RATE_BURST
+        raise ValueError(f"Unknown search provider: {provider}")
+
+    @classmethod
+    def worker_count(cls) -> int:
+        """Number of server worker processes, resolving 0 to the CPU count."""
+        return cls.WORKERS if cls.WORKERS > 0 else (os.cpu_count() or 1)
+
+    @classmethod
+    def per_worker(cls, limit: int) -> int:
+        """
+        One worker's share of a server-wide limit, rounded up.
+
+        0 (unlimited) stays 0, and a positive limit never drops below 1.
+        """
+        if limit <= 0:
+            return limit
+        return -(-limit // cls.worker_count())
+
+    @classmethod
+    def get_search_cache_ttl(cls, provider: str) -> float:
+        """
+        Get the search cache TTL in seconds for a provider.
+        """
+        if provider == "brave":
+            return cls.SEARCH_CACHE_TTL_BRAVE
+        if provider == "tavily":
+            return cls.SEARCH_CACHE_TTL_TAVILY
+        raise ValueError(f"Unknown search provider: {provider}")
+
     @classmethod
     def get_cors_config(cls) -> dict:
         """
@@ -97,6 +245,8 @@ class Config:
             "allow_credentials": True,
             "allow_methods": cls.ALLOWED_METHODS,
             "allow_headers": cls.ALLOWED_HEADERS,
+            # Read cross-origin by the frontend (429 countdown, trace links)
+            "expose_headers": ["Retry-After", "X-Trace-Id", "X-Job-Id", "X-SSE-Protocol"],
         }
 
 # Internal initialization check
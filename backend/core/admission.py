@@ -0,0 +1,263 @@
+"""
+Admission control for research pipelines.
+
+At most Config.ADMISSION_MAX_IN_FLIGHT pipelines run at once. Further
+sessions wait in a bounded per-lane queue and are told their position;
+when a lane's queue is full the request is rejected with a retry hint.
+
+There are two lanes. Interactive sessions (a user waiting on /research)
+are always admitted before batch or scheduled work, and batch work never
+holds more than Config.ADMISSION_BATCH_MAX_IN_FLIGHT slots, so a large
+sweep cannot starve users.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from config import Config
+from .metrics import ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTED, ADMISSION_WAIT
+from .protocol import StateStream
+
+LANE_INTERACTIVE = "interactive"
+LANE_BATCH = "batch"
+# In priority order
+LANES = (LANE_INTERACTIVE, LANE_BATCH)
+
+
+class AdmissionRejected(Exception):
+    """Exception raised when a lane's wait queue is full."""
+
+    def __init__(self, lane: str, retry_after: int):
+        super().__init__(f"Server busy: {lane} queue is full, retry in {retry_after}s")
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """A session's place in the admission queue, and later its slot."""
+
+    def __init__(self, controller: "AdmissionController", lane: str):
+        self.lane = lane
+        self.admitted = False
+        self.released = False
+        self.enqueued_at = time.monotonic()
+        self.admitted_at: Optional[float] = None
+        self._controller = controller
+        self._changed = asyncio.Event()
+
+    @property
+    def position(self) -> int:
+        """1-based place in line across lanes; 0 once admitted."""
+        return self._controller._position(self)
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def positions(self) -> AsyncIterator[int]:
+        """Yield the queue position whenever it changes, until admitted."""
+        last = None
+        while not self.admitted:
+            changed = self._changed
+            position = self.position
+            if position != last:
+                last = position
+                yield position
+            elif not self.admitted:
+                await changed.wait()
+
+    def release(self) -> None:
+        """Give up the slot, or the place in line if not yet admitted."""
+        self._controller._release(self)
+
+
+class AdmissionController:
+    """Bounds concurrent pipelines, queueing the rest by lane."""
+
+    def __init__(
+        self,
+        max_in_flight: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        batch_max_in_flight: Optional[int] = None,
+        batch_queue_size: Optional[int] = None,
+    ):
+        """
+        Defaults are this worker's share (Config.per_worker) of the
+        server-wide ADMISSION_* settings.
+
+        Args:
+            max_in_flight: Pipelines running at once (0 = unlimited)
+            queue_size: Interactive sessions allowed to wait
+            batch_max_in_flight: Slots batch work may hold at once (0 = no separate cap)
+            batch_queue_size: Batch sessions allowed to wait
+        """
+        self.max_in_flight = Config.per_worker(Config.ADMISSION_MAX_IN_FLIGHT) if max_in_flight is None else max_in_flight
+        self.batch_max_in_flight = (
+            Config.per_worker(Config.ADMISSION_BATCH_MAX_IN_FLIGHT) if batch_max_in_flight is None else batch_max_in_flight
+        )
+        self.queue_sizes = {
+            LANE_INTERACTIVE: Config.per_worker(Config.ADMISSION_QUEUE_SIZE) if queue_size is None else queue_size,
+            LANE_BATCH: Config.per_worker(Config.ADMISSION_BATCH_QUEUE_SIZE) if batch_queue_size is None else batch_queue_size,
+        }
+        self._queues: Dict[str, Deque[Ticket]] = {lane: deque() for lane in LANES}
+        self._in_flight: Dict[str, int] = {lane: 0 for lane in LANES}
+        # Moving average of how long a session holds its slot, for Retry-After
+        self._avg_hold: Optional[float] = None
+
+    @property
+    def in_flight(self) -> int:
+        return sum(self._in_flight.values())
+
+    def queued(self, lane: str) -> int:
+        return len(self._queues[lane])
+
+    def enqueue(self, lane: str = LANE_INTERACTIVE, bounded: bool = True) -> Ticket:
+        """
+        Take a slot if one is free, otherwise a place in the lane's queue.
+
+        Internal callers that already bound their own concurrency (batch
+        runs) pass bounded=False to wait without a queue limit.
+
+        Raises:
+            AdmissionRejected: If the ticket would have to wait and the
+                lane's queue is full
+        """
+        self._check_lane(lane)
+        ticket = Ticket(self, lane)
+        self._queues[lane].append(ticket)
+        self._dispatch()
+        if not ticket.admitted and bounded and self.queued(lane) > self.queue_sizes[lane]:
+            self._queues[lane].remove(ticket)
+            self._update_gauges()
+            raise self._rejection(lane)
+        return ticket
+
+    def check(self, lane: str) -> None:
+        """
+        Raise AdmissionRejected if new work in `lane` would not fit in its queue.
+        """
+        self._check_lane(lane)
+        if not self._has_slot(lane) and self.queued(lane) >= self.queue_sizes[lane]:
+            raise self._rejection(lane)
+
+    def promote(self, ticket: Ticket, lane: str) -> None:
+        """Move a waiting ticket to a higher-priority lane."""
+        self._check_lane(lane)
+        if ticket.admitted or ticket.released or LANES.index(lane) >= LANES.index(ticket.lane):
+            return
+        self._queues[ticket.lane].remove(ticket)
+        ticket.lane = lane
+        self._queues[lane].append(ticket)
+        self._dispatch(changed=True)
+
+    @asynccontextmanager
+    async def slot(self, lane: str = LANE_BATCH) -> AsyncIterator[Ticket]:
+        """Wait, without a queue limit, for a slot held for the block."""
+        ticket = self.enqueue(lane, bounded=False)
+        try:
+            async for _ in ticket.positions():
+                pass
+            yield ticket
+        finally:
+            ticket.release()
+
+    def _check_lane(self, lane: str) -> None:
+        if lane not in LANES:
+            raise ValueError(f"Unknown admission lane: {lane}")
+
+    def _has_slot(self, lane: str) -> bool:
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            return False
+        if lane == LANE_BATCH and self.batch_max_in_flight:
+            return self._in_flight[LANE_BATCH] < self.batch_max_in_flight
+        return True
+
+    def _position(self, ticket: Ticket) -> int:
+        if ticket.admitted or ticket.released:
+            return 0
+        ahead = 0
+        for lane in LANES:
+            if lane == ticket.lane:
+                return ahead + self._queues[lane].index(ticket) + 1
+            ahead += len(self._queues[lane])
+        return 0
+
+    def _dispatch(self, changed: bool = False) -> None:
+        """Admit waiting tickets, interactive first, while slots are free."""
+        while True:
+            lane = next((lane for lane in LANES if self._queues[lane] and self._has_slot(lane)), None)
+            if lane is None:
+                break
+            ticket = self._queues[lane].popleft()
+            ticket.admitted = True
+            ticket.admitted_at = time.monotonic()
+            self._in_flight[lane] += 1
+            ADMISSION_WAIT.labels(lane=lane).observe(ticket.admitted_at - ticket.enqueued_at)
+            ticket._notify()
+            changed = True
+        if changed:
+            # Everyone behind an admitted ticket moved up
+            for queue in self._queues.values():
+                for ticket in queue:
+                    ticket._notify()
+        self._update_gauges()
+
+    def _release(self, ticket: Ticket) -> None:
+        if ticket.released:
+            return
+        ticket.released = True
+        if ticket.admitted:
+            self._in_flight[ticket.lane] -= 1
+            held = time.monotonic() - ticket.admitted_at
+            self._avg_hold = held if self._avg_hold is None else 0.8 * self._avg_hold + 0.2 * held
+        else:
+            self._queues[ticket.lane].remove(ticket)
+        self._dispatch(changed=True)
+
+    def _rejection(self, lane: str) -> AdmissionRejected:
+        ADMISSION_REJECTED.labels(lane=lane).inc()
+        if self._avg_hold is None or not self.max_in_flight:
+            retry_after = Config.ADMISSION_RETRY_AFTER_SECONDS
+        else:
+            # Time for the sessions ahead to drain through the slots
+            ahead = sum(len(queue) for queue in self._queues.values())
+            retry_after = math.ceil(self._avg_hold * (ahead + 1) / self.max_in_flight)
+        return AdmissionRejected(lane, max(1, retry_after))
+
+    def _update_gauges(self) -> None:
+        for lane, queue in self._queues.items():
+            ADMISSION_QUEUE_DEPTH.labels(lane=lane).set(len(queue))
+
+
+async def admitted_stream(
+    ticket: Ticket, stream: StateStream, frames: AsyncIterator[bytes]
+) -> AsyncIterator[bytes]:
+    """
+    Send `queued` events while `ticket` waits, then the pipeline's frames.
+
+    The slot is released when the pipeline ends or the consumer stops.
+    """
+    try:
+        async for position in ticket.positions():
+            yield stream.queued(position)
+        async for frame in frames:
+            yield frame
+    finally:
+        ticket.release()
+        await frames.aclose()
+
+
+# Global controller instance
+_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """Get or create the global admission controller."""
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController()
+    return _controller
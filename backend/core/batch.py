@@ -0,0 +1,123 @@
+"""
+Batch research over many topics.
+
+Topics run concurrently under one concurrency budget, and all of them share
+a `SharedSearch`, so a query that several topics generate is searched only
+once per batch. Each topic also takes a pipeline slot in the admission
+controller's batch lane, so sweeps queue behind interactive requests.
+Results are yielded per topic as each one finishes, followed by a summary.
+"""
+
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from config import Config
+from tools.search_cache import normalize_query
+from . import orchestrator
+from .admission import LANE_BATCH, get_admission_controller
+from .metrics import BATCH_SEARCHES
+from .protocol import PROTOCOL_DELTA, StateStream
+from .state import AgentState
+
+
+class SharedSearch:
+    """
+    Memoized, single-flight search shared by the topics of one batch.
+
+    Concurrent calls for the same normalized query await one provider call;
+    later calls reuse its result (or its error).
+    """
+
+    def __init__(self, search: Optional[orchestrator.SearchFunction] = None):
+        self._search = search
+        self._calls: Dict[Tuple[str, int], asyncio.Task] = {}
+        self.requested = 0
+
+    @property
+    def executed(self) -> int:
+        return len(self._calls)
+
+    async def __call__(self, query: str, research_depth: int) -> List[Dict[str, Any]]:
+        self.requested += 1
+        key = (normalize_query(query), research_depth)
+        task = self._calls.get(key)
+        if task is None:
+            search = self._search or orchestrator._run_search
+            task = self._calls[key] = asyncio.create_task(search(query, research_depth))
+            BATCH_SEARCHES.labels(outcome="executed").inc()
+        else:
+            BATCH_SEARCHES.labels(outcome="deduplicated").inc()
+        # A topic being cancelled must not cancel the search for the others
+        return await asyncio.shield(task)
+
+    def close(self) -> None:
+        for task in self._calls.values():
+            task.cancel()
+
+
+async def _research_topic(topic: str, research_depth: int, search: SharedSearch) -> Dict[str, Any]:
+    """Run one topic to completion and return its result line."""
+    stream = StateStream(AgentState(), PROTOCOL_DELTA)
+    started = time.monotonic()
+    async for _ in orchestrator.perform_market_research_stream(
+        topic, research_depth, PROTOCOL_DELTA, stream=stream, search=search
+    ):
+        pass
+
+    state = stream.state
+    result: Dict[str, Any] = {
+        "type": "result",
+        "topic": topic,
+        "duration_seconds": round(time.monotonic() - started, 3),
+        "trace_id": stream.trace_id,
+    }
+    if state.current_step == "complete":
+        result.update(status="success", final_report=state.final_report, sources=state.sources, usage=state.usage)
+    else:
+        # The orchestrator records its failure as the last log line
+        result.update(status="error", error=state.logs[-1] if state.logs else "Research failed")
+    return result
+
+
+async def run_batch(
+    topics: List[str], research_depth: int = 1, concurrency: Optional[int] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Research `topics` with at most `concurrency` running at once.
+
+    Yields one result dict per topic in completion order, then a summary.
+    Closing the iterator cancels unfinished topics.
+    """
+    slots = asyncio.Semaphore(max(1, concurrency or Config.BATCH_CONCURRENCY))
+    search = SharedSearch()
+    admission = get_admission_controller()
+    started = time.monotonic()
+
+    async def run(topic: str) -> Dict[str, Any]:
+        async with slots, admission.slot(LANE_BATCH):
+            return await _research_topic(topic, research_depth, search)
+
+    pending = {asyncio.create_task(run(topic)) for topic in topics}
+    succeeded = 0
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.result()
+                succeeded += result["status"] == "success"
+                yield result
+    finally:
+        for task in pending:
+            task.cancel()
+        search.close()
+
+    yield {
+        "type": "summary",
+        "topics": len(topics),
+        "succeeded": succeeded,
+        "failed": len(topics) - succeeded,
+        "searches_requested": search.requested,
+        "searches_executed": search.executed,
+        "duration_seconds": round(time.monotonic() - started, 3),
+    }
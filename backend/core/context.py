@@ -0,0 +1,150 @@
+"""
+Token-aware packing of prompt context.
+
+Prompt size drives Gemini latency, so each stage's context is packed into
+a token budget (Config.CONTEXT_BUDGET_*) instead of being passed on whole.
+Tokens are estimated locally with `estimate_tokens`. Search results,
+already ranked and deduplicated by core.sources, are added best first
+until the budget is full. Long text has repeated sentences removed and
+is cut at a line or sentence boundary.
+"""
+
+import re
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from config import Config
+from tools.search_cache import normalize_query
+
+_PIECE = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_SPACES = re.compile(r"[ \t]+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+# Shorter sentences (headings, list labels) are never dropped as repeats
+MIN_DEDUPE_CHARS = 24
+# Don't bother adding an item that only has room for a few words
+MIN_ITEM_TOKENS = 40
+TRUNCATION_MARK = " …"
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of `text` without calling the API.
+
+    Words cost about one token per four characters and punctuation one
+    token each, which tracks Gemini's tokenizer closely for English prose.
+    """
+    return sum((len(piece) + 3) // 4 for piece in _PIECE.findall(text))
+
+
+def dedupe_sentences(text: str, seen: Optional[Set[str]] = None) -> str:
+    """
+    Remove sentences already seen in `text` (or recorded in `seen`).
+
+    Line structure is kept so lists and headings survive; runs of spaces
+    and blank lines are collapsed. `seen` is updated, so passing the same
+    set across calls also drops text repeated between items.
+    """
+    seen = set() if seen is None else seen
+    lines = []
+    for line in text.split("\n"):
+        kept = []
+        for sentence in _SENTENCE_END.split(_SPACES.sub(" ", line.strip())):
+            key = normalize_query(sentence)
+            if len(key) >= MIN_DEDUPE_CHARS:
+                if key in seen:
+                    continue
+                seen.add(key)
+            kept.append(sentence)
+        lines.append(" ".join(kept).rstrip())
+    return _BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """
+    Cut `text` to at most `budget` estimated tokens.
+
+    Prefers to end at a line break, then a sentence end, in the last
+    third of the allowed span; a cut text ends with TRUNCATION_MARK.
+    """
+    if budget <= 0 or estimate_tokens(text) <= budget:
+        return text
+    chars_per_token = len(text) / max(1, estimate_tokens(text))
+    limit = int(budget * chars_per_token)
+    while limit > 0:
+        cut = text[:limit]
+        floor = limit * 2 // 3
+        boundary = cut.rfind("\n", floor)
+        if boundary < 0:
+            ends = [m.end() for m in _SENTENCE_END.finditer(cut, floor)]
+            boundary = ends[-1] if ends else -1
+        if boundary > 0:
+            cut = cut[:boundary]
+        cut = cut.rstrip() + TRUNCATION_MARK
+        if estimate_tokens(cut) <= budget:
+            return cut
+        limit = int(limit * 0.9)
+    return ""
+
+
+def pack_text(text: str, budget: int) -> str:
+    """Drop repeated sentences from `text` and fit it into `budget` tokens (0 = no limit)."""
+    return truncate_to_tokens(dedupe_sentences(text), budget)
+
+
+def _fill(items: List[Any], header: Callable[[int, Any], str], body: Callable[[Any], str],
+          budget: int, seen: Set[str]) -> List[str]:
+    """
+    Pack items in order until `budget` tokens are used.
+
+    Bodies lose sentences seen in earlier items; items whose whole body
+    was a repeat are skipped, and `header` numbers the rest from 1. The first item that
+    doesn't fit is truncated if there is meaningful room left, and
+    packing stops there.
+    """
+    blocks, used = [], 0
+    for item in items:
+        raw = body(item)
+        text = dedupe_sentences(raw, seen)
+        if raw.strip() and not text:
+            continue
+        head = header(len(blocks) + 1, item)
+        block = f"{head}{text}"
+        cost = estimate_tokens(block) + 1
+        if budget and used + cost > budget:
+            room = budget - used - estimate_tokens(head) - 1
+            if room >= MIN_ITEM_TOKENS:
+                blocks.append(f"{head}{truncate_to_tokens(text, room)}")
+            break
+        blocks.append(block)
+        used += cost
+    return blocks
+
+
+def pack_sources(
+    sources: List[Dict[str, Any]],
+    budget: int,
+    seen: Optional[Set[str]] = None,
+    max_items: Optional[int] = None,
+) -> str:
+    """
+    Format search results for a prompt within `budget` tokens (0 = no limit).
+
+    `sources` should be ranked best first (see core.sources.SourceIndex);
+    at most `max_items` (default Config.CONTEXT_MAX_SOURCES) are packed.
+    """
+    seen = set() if seen is None else seen
+    ranked = sources[:max_items or Config.CONTEXT_MAX_SOURCES]
+
+    def header(n: int, result: Dict[str, Any]) -> str:
+        title = _SPACES.sub(" ", result.get("title", "")).strip()
+        return f"Source {n}: {title}\nURL: {result.get('url', '')}\nDescription: "
+
+    return "\n\n".join(_fill(ranked, header, lambda r: r.get("description", ""), budget, seen))
+
+
+def pack_documents(documents: List[Tuple[str, str]], budget: int, seen: Optional[Set[str]] = None) -> str:
+    """Format (url, text) deep-read excerpts for a prompt within `budget` tokens (0 = no limit)."""
+    seen = set() if seen is None else seen
+    blocks = _fill(documents, lambda n, doc: f"Document {n} ({doc[0]}):\n", lambda doc: doc[1], budget, seen)
+    return "\n\n".join(blocks)
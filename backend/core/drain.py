@@ -0,0 +1,108 @@
+"""
+Graceful drain of a stopping worker.
+
+On SIGTERM (a deploy, or the uvicorn supervisor restarting workers on
+SIGHUP) uvicorn stops accepting connections and waits for open responses
+to finish before shutting the app down. Research streams run for minutes,
+so the worker also starts a drain:
+
+- /health/ready and new research requests answer 503, so load balancers
+  and retrying clients move to another worker;
+- in-flight SSE streams keep running for up to SHUTDOWN_GRACE_SECONDS;
+- streams still open then end with a retryable `error` frame
+  (`stream_until_disconnect` watches for this) rather than being cut off,
+  and background jobs still running are cancelled.
+
+`install` chains onto the signal handlers uvicorn has already set, so it
+must run on the server's loop after startup, i.e. from the app lifespan.
+"""
+
+import asyncio
+import logging
+import signal
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from .sse import encode_frame
+
+logger = logging.getLogger("market_analyst_agent")
+
+RESTART_FRAME = encode_frame("error", {"error": "Server is restarting; please retry", "retryable": True})
+DRAIN_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+
+class Drain:
+    """Drain state of this worker."""
+
+    def __init__(self):
+        self.deadline: Optional[float] = None
+        self._expired: Optional[asyncio.Event] = None
+        self._previous: Dict[int, Callable] = {}
+
+    @property
+    def draining(self) -> bool:
+        return self.deadline is not None
+
+    def remaining(self) -> float:
+        """Seconds left before in-flight work is cut off (0 when not draining)."""
+        if self.deadline is None:
+            return 0.0
+        return max(0.0, self.deadline - time.monotonic())
+
+    def _event(self) -> asyncio.Event:
+        if self._expired is None:
+            self._expired = asyncio.Event()
+        return self._expired
+
+    def begin(self, grace: float) -> None:
+        """Start draining on the running loop; streams are ended `grace` seconds from now."""
+        if self.draining:
+            return
+        self.deadline = time.monotonic() + grace
+        logger.info(f"Draining: in-flight streams have {grace:.0f}s to finish")
+        asyncio.get_running_loop().call_later(grace, self._event().set)
+
+    async def expired(self) -> None:
+        """Wait until the grace period of a drain has run out."""
+        await self._event().wait()
+
+    def install(self, grace: float) -> None:
+        """Begin draining when the process receives SIGTERM or SIGINT."""
+        if threading.current_thread() is not threading.main_thread():
+            return
+        loop = asyncio.get_running_loop()
+        self._event()
+
+        def handler(sig, frame):
+            # Runs between bytecodes of the loop's thread; hand over to the loop
+            loop.call_soon_threadsafe(self.begin, grace)
+            previous = self._previous.get(sig)
+            if callable(previous):
+                previous(sig, frame)
+
+        for sig in DRAIN_SIGNALS:
+            self._previous[sig] = signal.signal(sig, handler)
+
+    def uninstall(self) -> None:
+        for sig, previous in self._previous.items():
+            signal.signal(sig, previous)
+        self._previous.clear()
+
+
+# Global drain instance
+_drain: Optional[Drain] = None
+
+
+def get_drain() -> Drain:
+    """Get or create this worker's drain state."""
+    global _drain
+    if _drain is None:
+        _drain = Drain()
+    return _drain
+
+
+def set_drain(drain: Optional[Drain]) -> None:
+    """Replace the drain state (None resets it, e.g. in tests)."""
+    global _drain
+    _drain = drain
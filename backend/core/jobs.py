@@ -0,0 +1,314 @@
+"""
+Detached background research jobs with resumable event streams.
+
+A job runs the orchestrator as its own task, independent of any HTTP
+connection, and records the frames it produces in a bounded per-job log.
+Jobs started through /research/jobs use the delta protocol. Subscribers
+replay the log after their `Last-Event-ID` and then tail new frames. A
+subscriber whose position has fallen out of the log gets one snapshot
+frame of the current state instead, then continues live.
+
+Requests for a topic that is already being researched (same normalized
+topic, depth and protocol) join the running job instead of starting the
+pipeline again; see `JobManager.join_or_create`.
+
+Jobs started for a /research request are attached to their callers: when
+the last caller's stream ends before the job does, the job is cancelled
+and what it finished is reported as its `partial_result`. A retry runs a
+new job, but the LLM calls and searches the cancelled job completed are
+served from their caches (llm_client, tools.search_cache), so only the
+unfinished work is redone. Jobs from /research/jobs are detached and run
+to completion regardless of subscribers.
+
+Jobs take a pipeline slot from the admission controller (core.admission);
+while they wait, their stream carries `queued` events with their position.
+
+Finished jobs stay retrievable for Config.JOB_RETENTION_SECONDS.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional, Tuple
+
+from config import Config
+from tools.search_cache import normalize_query
+from .admission import LANE_INTERACTIVE, AdmissionController, Ticket, get_admission_controller
+from .metrics import ACTIVE_JOBS, COALESCED_REQUESTS, JOB_FANOUT, JOBS_TOTAL
+from .orchestrator import perform_market_research_stream
+from .protocol import PROTOCOL_DELTA, StateStream
+from .state import AgentState
+
+logger = logging.getLogger("market_analyst_agent")
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETE = "complete"
+JOB_ERROR = "error"
+JOB_CANCELLED = "cancelled"
+
+
+class JobNotFoundError(Exception):
+    """Exception raised for unknown or expired job ids."""
+    pass
+
+
+def job_key(topic: str, research_depth: int, protocol: int) -> Tuple[str, int, int]:
+    """Requests with the same key produce the same event stream."""
+    return normalize_query(topic), research_depth, protocol
+
+
+class ResearchJob:
+    """One detached research session and its event log."""
+
+    def __init__(
+        self, topic: str, research_depth: int, max_events: int, protocol: int = PROTOCOL_DELTA,
+        ticket: Optional[Ticket] = None, detached: bool = True,
+    ):
+        self.id = uuid.uuid4().hex
+        self.topic = topic
+        self.research_depth = research_depth
+        self.protocol = protocol
+        self.key = job_key(topic, research_depth, protocol)
+        self.ticket = ticket
+        self.status = JOB_QUEUED if ticket is not None and not ticket.admitted else JOB_RUNNING
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        # Requests served by this job, including the one that started it
+        self.callers = 1
+        # Whether the job outlives its callers' streams, and how many
+        # attached callers are still streaming if not
+        self.detached = detached
+        self.attached = 0 if detached else 1
+        self.stream = StateStream(AgentState(), protocol)
+        # (first frame id, last frame id, chunk); ids are consecutive
+        self.events: Deque[Tuple[int, int, bytes]] = deque(maxlen=max_events)
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status not in (JOB_QUEUED, JOB_RUNNING)
+
+    def publish(self, chunk: bytes) -> None:
+        if chunk:
+            first_id = self.events[-1][1] + 1 if self.events else 1
+            self.events.append((first_id, self.stream.last_id, chunk))
+            self._notify()
+
+    def finish(self, status: str) -> None:
+        self.status = status
+        self.finished_at = time.time()
+        self._notify()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def _backlog(self, after: int) -> Tuple[list, int]:
+        """Chunks to send a client that has seen frames up to `after`, and its new position."""
+        if not self.events or after >= self.events[-1][1]:
+            return [], after
+        # Replay only if nothing between the client's position and the log was evicted
+        if after >= self.events[0][0] - 1:
+            return [chunk for _, last_id, chunk in self.events if last_id > after], self.events[-1][1]
+        snapshot = [self.stream.snapshot()]
+        if self.done and self.stream.terminal_frame:
+            snapshot.append(self.stream.terminal_frame)
+        return snapshot, self.stream.last_id
+
+    async def subscribe(self, last_event_id: int = 0, attached: bool = False) -> AsyncIterator[bytes]:
+        """
+        Replay frames after `last_event_id`, then tail until the job ends.
+
+        `attached` subscriptions are the streams of the callers counted in
+        `self.attached`; closing the last one early cancels the job.
+        """
+        position = last_event_id
+        try:
+            while True:
+                changed = self._changed
+                chunks, position = self._backlog(position)
+                for chunk in chunks:
+                    yield chunk
+                if self.done and position >= self.stream.last_id:
+                    return
+                if not chunks:
+                    await changed.wait()
+        finally:
+            if attached:
+                self.detach()
+
+    def detach(self) -> None:
+        """Drop one attached caller; the last one leaving cancels the job."""
+        self.attached -= 1
+        if self.attached <= 0 and not self.detached and not self.done and self.task:
+            logger.info(f"Job {self.id}: all callers disconnected, cancelling")
+            self.task.cancel()
+
+    def to_dict(self) -> Dict[str, Any]:
+        state = self.stream.state
+        data = {
+            "job_id": self.id,
+            "topic": self.topic,
+            "research_depth": self.research_depth,
+            "protocol": self.protocol,
+            "status": self.status,
+            "callers": self.callers,
+            "current_step": state.current_step,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "last_event_id": self.stream.last_id,
+            "trace_id": self.stream.trace_id,
+        }
+        if self.status == JOB_QUEUED:
+            data["queue_position"] = self.ticket.position
+        if self.status == JOB_COMPLETE:
+            data["result"] = {"final_report": state.final_report, "sources": state.sources, "usage": state.usage}
+        elif self.status == JOB_CANCELLED:
+            # Whatever finished before the cancel
+            data["partial_result"] = {
+                "strategy": state.strategy,
+                "sources": state.sources,
+                "insights": state.insights,
+                "final_report": state.final_report,
+            }
+        return data
+
+
+class JobManager:
+    """Starts research jobs and keeps them until their retention expires."""
+
+    def __init__(
+        self,
+        runner: Callable[..., AsyncIterator[bytes]] = perform_market_research_stream,
+        retention_seconds: Optional[float] = None,
+        max_events: Optional[int] = None,
+        admission: Optional[AdmissionController] = None,
+    ):
+        self.runner = runner
+        self.admission = admission or get_admission_controller()
+        self.retention_seconds = Config.JOB_RETENTION_SECONDS if retention_seconds is None else retention_seconds
+        self.max_events = max_events or Config.JOB_EVENT_LOG_SIZE
+        self._jobs: Dict[str, ResearchJob] = {}
+        # Running jobs by job_key, for coalescing
+        self._running: Dict[Tuple[str, int, int], ResearchJob] = {}
+
+    def create(
+        self, topic: str, research_depth: int = 1, protocol: int = PROTOCOL_DELTA, lane: str = LANE_INTERACTIVE,
+        detached: bool = True,
+    ) -> ResearchJob:
+        """
+        Start a job in the background and return it.
+
+        A job that is not `detached` has one attached caller, who must
+        stream it with `subscribe(attached=True)` or call `detach` when done.
+
+        Raises:
+            AdmissionRejected: If the job would have to wait for a slot and
+                `lane`'s queue is full
+        """
+        self._purge()
+        ticket = self.admission.enqueue(lane)
+        job = ResearchJob(topic, research_depth, self.max_events, protocol, ticket, detached)
+        job.task = asyncio.create_task(self._run(job))
+        # A task cancelled before its first step never runs _run's cleanup
+        job.task.add_done_callback(lambda task: job.done or self._finish(job, JOB_CANCELLED))
+        self._jobs[job.id] = job
+        self._running[job.key] = job
+        return job
+
+    def join_or_create(
+        self, topic: str, research_depth: int = 1, protocol: int = PROTOCOL_DELTA, lane: str = LANE_INTERACTIVE,
+        detached: bool = True,
+    ) -> Tuple[ResearchJob, bool]:
+        """
+        Attach to a running job for the same request, or start one.
+
+        Returns (job, joined). A joining caller subscribes from the start and
+        gets the job's earlier events replayed, so it sees the same stream as
+        the caller that started it. An interactive caller joining a queued
+        batch job moves it to the interactive lane. A detached caller makes
+        the job detached, so it no longer stops when attached callers leave.
+        """
+        job = self._running.get(job_key(topic, research_depth, protocol))
+        if job is None or job.done:
+            return self.create(topic, research_depth, protocol, lane, detached), False
+        self.admission.promote(job.ticket, lane)
+        if detached:
+            job.detached = True
+        else:
+            job.attached += 1
+        job.callers += 1
+        COALESCED_REQUESTS.labels(step=job.stream.state.current_step).inc()
+        return job, True
+
+    def get(self, job_id: str) -> ResearchJob:
+        self._purge()
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise JobNotFoundError(f"Unknown or expired job: {job_id}")
+        return job
+
+    async def _run(self, job: ResearchJob) -> None:
+        ACTIVE_JOBS.inc()
+        status = JOB_ERROR
+        try:
+            async for position in job.ticket.positions():
+                job.publish(job.stream.queued(position))
+            job.status = JOB_RUNNING
+            async for chunk in self.runner(job.topic, job.research_depth, job.protocol, stream=job.stream):
+                job.publish(chunk)
+            # The orchestrator reports its own failures as an error event
+            if job.stream.state.current_step == "complete":
+                status = JOB_COMPLETE
+        except asyncio.CancelledError:
+            status = JOB_CANCELLED
+            raise
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}")
+        finally:
+            self._finish(job, status)
+            ACTIVE_JOBS.dec()
+
+    def _finish(self, job: ResearchJob, status: str) -> None:
+        job.ticket.release()
+        if self._running.get(job.key) is job:
+            del self._running[job.key]
+        job.finish(status)
+        JOBS_TOTAL.labels(status=status).inc()
+        JOB_FANOUT.observe(job.callers)
+
+    def _purge(self) -> None:
+        cutoff = time.time() - self.retention_seconds
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    async def shutdown(self, grace: float = 0) -> None:
+        """
+        Cancel running jobs; called on application shutdown.
+
+        Jobs get up to `grace` seconds to finish first.
+        """
+        tasks = [job.task for job in self._jobs.values() if job.task and not job.task.done()]
+        if tasks and grace > 0:
+            await asyncio.wait(tasks, timeout=grace)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# Global manager instance
+_manager: Optional[JobManager] = None
+
+
+def get_job_manager() -> JobManager:
+    """Get or create the global job manager."""
+    global _manager
+    if _manager is None:
+        _manager = JobManager()
+    return _manager
@@ -0,0 +1,56 @@
+"""
+Event-loop lag monitoring.
+
+Every research session, SSE stream and outbound call shares one event loop
+per worker, so any code that blocks it delays all of them. The monitor
+sleeps for a fixed interval and records how much later than due it woke
+up in the `event_loop_lag_seconds` histogram; the load driver in
+benchmarks.load_test reads it from /metrics.
+"""
+
+import asyncio
+import logging
+from typing import Optional
+
+from .metrics import EVENT_LOOP_LAG
+
+logger = logging.getLogger("market_analyst_agent")
+
+
+class LoopLagMonitor:
+    """Samples event-loop lag from a background task."""
+
+    def __init__(self, interval: float):
+        """
+        Args:
+            interval: Seconds between samples
+        """
+        self.interval = interval
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start sampling on the running loop; a no-op if already started."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            due = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - due)
+            self.max_lag = max(self.max_lag, lag)
+            EVENT_LOOP_LAG.observe(lag)
+            if lag >= 1:
+                logger.warning(f"Event loop was blocked for {lag:.2f}s")
@@ -1,7 +1,15 @@
-from prometheus_client import Counter, Gauge, Histogram
+import os
+from typing import Optional
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+
+# With several server workers (main.py), PROMETHEUS_MULTIPROC_DIR is set
+# before any worker imports prometheus_client: every process then writes its
+# values to files there and /metrics aggregates them. Gauges report the sum
+# over live workers.
 
 # --- Prometheus Metrics ---
-ACTIVE_REQUESTS = Gauge("active_research_requests", "Number of active research sessions")
+ACTIVE_REQUESTS = Gauge("active_research_requests", "Number of active research sessions", multiprocess_mode="livesum")
 REPORTS_COMPLETED = Counter("research_reports_completed_total", "Total reports generated")
 RESEARCH_DURATION = Histogram(
     "research_duration_seconds", 
@@ -9,14 +17,108 @@ RESEARCH_DURATION = Histogram(
     buckets=[10, 30, 60, 120, 300]
 )
 REQUESTS_TOTAL = Counter("research_requests_total", "Total requests received", ["status"])
+ACTIVE_JOBS = Gauge("active_research_jobs", "Number of running background research jobs", multiprocess_mode="livesum")
+JOBS_TOTAL = Counter("research_jobs_total", "Finished background research jobs", ["status"])
+COALESCED_REQUESTS = Counter(
+    "research_coalesced_requests_total",
+    "Requests attached to an identical in-flight pipeline instead of starting one, by step at join",
+    ["step"]
+)
+BATCH_SEARCHES = Counter(
+    "batch_search_queries_total",
+    "Search queries in batch runs, executed or deduplicated against another topic",
+    ["outcome"]
+)
+JOB_FANOUT = Histogram(
+    "research_pipeline_fanout",
+    "Requests served per pipeline run",
+    buckets=[1, 2, 3, 5, 10, 25, 50]
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "research_admission_queue_depth",
+    "Research sessions waiting for a pipeline slot",
+    ["lane"],
+    multiprocess_mode="livesum"
+)
+ADMISSION_REJECTED = Counter(
+    "research_admission_rejected_total", "Research sessions rejected because the wait queue was full", ["lane"]
+)
+ADMISSION_WAIT = Histogram(
+    "research_admission_wait_seconds",
+    "Time research sessions waited for a pipeline slot",
+    ["lane"],
+    buckets=[0, 0.1, 0.5, 1, 5, 15, 30, 60, 120, 300]
+)
 
 # Role specific timing
 AGENT_STEP_DURATION = Histogram("agent_step_duration_seconds", "Time spent in each agent role", ["role"])
 
 # External API Latency
 BRAVE_SEARCH_LATENCY = Histogram("brave_search_latency_bucket", "Latency of Brave Search API calls")
-LLM_TOKENS = Counter("llm_tokens_total", "Total LLM tokens used", ["model"])
+RATE_LIMIT_WAIT = Histogram(
+    "search_rate_limit_wait_seconds",
+    "Time spent waiting for a search provider rate-limit token",
+    ["provider"],
+    buckets=[0, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+)
+SEARCH_CACHE_EVENTS = Counter(
+    "search_cache_events_total",
+    "Search cache lookups and evictions (hit, negative_hit, miss, eviction)",
+    ["provider", "event"]
+)
+SOURCES_DEDUPLICATED = Counter(
+    "sources_deduplicated_total",
+    "Search results merged into an earlier copy (url, near_duplicate)",
+    ["reason"]
+)
+LLM_CACHE_EVENTS = Counter(
+    "llm_cache_events_total",
+    "LLM response cache lookups and evictions (memory_hit, disk_hit, miss, eviction)",
+    ["event"]
+)
+LLM_TOKENS = Counter("llm_tokens_total", "Total LLM tokens used, by pipeline role and prompt/response", ["model", "role", "kind"])
+_TOKEN_BUCKETS = [100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000]
+LLM_PROMPT_TOKENS = Histogram(
+    "llm_prompt_tokens", "Prompt tokens per LLM call", ["model", "role"], buckets=_TOKEN_BUCKETS
+)
+LLM_RESPONSE_TOKENS = Histogram(
+    "llm_response_tokens", "Response tokens per LLM call", ["model", "role"], buckets=_TOKEN_BUCKETS
+)
+LLM_CALL_DURATION = Histogram(
+    "llm_call_duration_seconds",
+    "Wall time of uncached LLM calls, to compare against prompt size",
+    ["model", "role"],
+    buckets=[0.25, 0.5, 1, 2, 4, 8, 16, 32, 64]
+)
 
 # System Health
-ACTIVE_SSE = Gauge("active_sse_connections", "Number of active SSE streams")
+ACTIVE_SSE = Gauge("active_sse_connections", "Number of active SSE streams", multiprocess_mode="livesum")
 SSE_DISCONNECTS = Counter("sse_disconnects_total", "Total SSE disconnections")
+SSE_DRAINED = Counter("sse_drained_total", "SSE streams ended by a worker shutdown before they finished")
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop ran a timer it was due to run (core.loop)",
+    buckets=[0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5]
+)
+TRACE_EXPORT_ERRORS = Counter(
+    "trace_export_errors_total", "Traces that failed to export or were dropped, by exporter", ["exporter"]
+)
+
+
+def multiprocess_enabled() -> bool:
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def metrics_registry() -> CollectorRegistry:
+    """Registry for /metrics: this process's, or every worker's in multiprocess mode."""
+    if not multiprocess_enabled():
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def mark_worker_dead(pid: Optional[int] = None) -> None:
+    """Drop an exiting worker's live gauge values (multiprocess mode only)."""
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(pid or os.getpid())
@@ -2,13 +2,21 @@ import asyncio
 import time
 import json
 import logging
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
 
+from config import Config
 from llm_client import get_gemini_client
-from tools.search import search_web
-from tools.tavily import tavily_search
+from tools.search import asearch_web
+from tools.tavily import atavily_search
 from tools.charts import generate_chart_data
-from .state import AgentState, send_sse_update
+from tools.fetch import iter_fetch_many
+from .context import estimate_tokens, pack_documents, pack_sources, pack_text
+from .pipeline import Stage, run_stages
+from .protocol import PROTOCOL_LEGACY, StateStream
+from .sources import SourceIndex
+from .tracing import NOOP_SPAN, STATUS_CANCELLED, STATUS_ERROR, STATUS_OK, current_span, span, start_trace
+from .state import AgentState
+from .usage import TokenUsage
 from .metrics import (
     ACTIVE_REQUESTS, REPORTS_COMPLETED, RESEARCH_DURATION, 
     REQUESTS_TOTAL, AGENT_STEP_DURATION, BRAVE_SEARCH_LATENCY
@@ -16,142 +24,335 @@ from .metrics import (
 
 logger = logging.getLogger("market_analyst_agent")
 
-async def perform_market_research_stream(topic: str, research_depth: int = 1) -> AsyncGenerator[str, None]:
+
+async def _run_search(query: str, research_depth: int) -> List[Dict[str, Any]]:
+    """Runs one search query against the provider chosen by research depth."""
+    with BRAVE_SEARCH_LATENCY.time():
+        if research_depth >= 2:
+            current_span().set(provider="tavily")
+            return await atavily_search(query, max_results=5, depth="advanced" if research_depth >= 3 else "basic")
+        current_span().set(provider="brave")
+        return await asearch_web(query, count=3)
+
+
+SearchFunction = Callable[[str, int], Awaitable[List[Dict[str, Any]]]]
+
+
+async def _fan_out_searches(
+    queries: List[str], research_depth: int, search: Optional[SearchFunction] = None
+) -> AsyncGenerator[Tuple[int, List[Dict[str, Any]], Optional[Exception]], None]:
+    """
+    Runs search queries concurrently, bounded by Config.SEARCH_CONCURRENCY.
+
+    Yields (query_index, results, error) tuples in completion order. A failing
+    query yields its exception instead of results and does not affect the others.
+    """
+    semaphore = asyncio.Semaphore(max(1, Config.SEARCH_CONCURRENCY))
+    search = search or _run_search
+
+    async def run(index: int, query: str):
+        async with semaphore:
+            try:
+                with span("search", query=query, research_depth=research_depth) as call:
+                    results = await search(query, research_depth)
+                    call.set(results=len(results))
+                return index, results, None
+            except Exception as e:
+                return index, [], e
+
+    tasks = [asyncio.create_task(run(i, q)) for i, q in enumerate(queries)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _deep_read(
+    stream: StateStream, sources: List[Dict[str, Any]], documents: List[Tuple[str, str]]
+) -> AsyncGenerator[bytes, None]:
+    """
+    Fetches the top-ranked source URLs in parallel and extracts their text.
+
+    Appends (url, text) pairs to `documents` and streams per-document
+    progress. Documents not back within Config.DEEP_READ_BUDGET_SECONDS
+    are skipped rather than waited on.
+    """
+    urls = list(dict.fromkeys(r["url"] for r in sources if r.get("url")))[:Config.DEEP_READ_TOP_K]
+    if not urls:
+        return
+
+    state = stream.state
+    state.logs.append(f"📖 Reading top {len(urls)} sources (budget {Config.DEEP_READ_BUDGET_SECONDS:g}s)...")
+    yield stream.update()
+
+    handled = 0
+    async for url, result in iter_fetch_many(urls, deadline=Config.DEEP_READ_BUDGET_SECONDS):
+        handled += 1
+        if result["success"] and result["content"].startswith("Document from:"):
+            documents.append((url, result["content"][:Config.DEEP_READ_MAX_CHARS]))
+            state.logs.append(f"  → Read {handled}/{len(urls)}: {url[:60]}")
+        else:
+            reason = result.get("error") or "no readable content"
+            state.logs.append(f"  ✗ Skipped {handled}/{len(urls)}: {url[:60]} ({reason[:80]})")
+        yield stream.update()
+
+    if handled < len(urls):
+        state.logs.append(f"  → {len(urls) - handled} sources not back within budget, skipped")
+    state.logs.append(f"✓ Read {len(documents)} full documents")
+    yield stream.update()
+
+
+class ResearchContext:
+    """Shared state handed to every research stage."""
+
+    def __init__(
+        self, topic: str, research_depth: int, stream: StateStream, search: Optional[SearchFunction] = None,
+        usage: Optional[TokenUsage] = None, root_span: Any = NOOP_SPAN,
+    ):
+        self.topic = topic
+        self.research_depth = research_depth
+        self.stream = stream
+        self.state = stream.state
+        self.search = search
+        # Token totals and budget for the session; run_stages records each stage's calls here
+        self.usage = usage or TokenUsage(Config.SESSION_TOKEN_BUDGET)
+        # Root span of the session's trace; run_stages traces each stage under it
+        self.span = root_span
+        self.client = get_gemini_client()
+
+
+def _fit_context(ctx: ResearchContext, text: str, what: str) -> str:
+    """Trims prompt context to the session's remaining token budget, noting it in the logs."""
+    trimmed = ctx.usage.fit(text)
+    if len(trimmed) < len(text):
+        ctx.usage.degraded.append(f"trimmed {what}")
+        ctx.state.logs.append(f"  ⚠️ Token budget low: trimmed {what} to ~{estimate_tokens(trimmed)} tokens")
+    return trimmed
+
+
+async def _strategist(ctx: ResearchContext) -> AsyncGenerator[bytes, None]:
+    state, stream = ctx.state, ctx.stream
+    state.logs.append("📋 Strategist is breaking down the topic...")
+    yield stream.update()
+
+    strategist_prompt = f"""You are 'The Strategist', a strategic planner for market intelligence.
+Your task: Analyze the topic "{ctx.topic}" and create a research plan.
+Output format:
+1. Context Analysis: Brief overview of the topic
+2. Key Research Questions: 3-5 specific questions to answer
+3. Recommended Data Sources: Types of sources to consult"""
+
+    # Every step goes through the LLM cache. The strategy depends only on
+    # the topic, so a repeat reuses it and the prompts built on it; a step
+    # whose inputs changed (e.g. new search results) misses and is regenerated
+    state.strategy = await ctx.client.agenerate(strategist_prompt, temperature=0.7)
+    state.logs.append("✓ Strategy complete")
+    yield stream.update("strategy")
+
+
+async def _researcher(ctx: ResearchContext) -> AsyncGenerator[bytes, None]:
+    state, stream = ctx.state, ctx.stream
+    state.current_step = "researcher"
+    state.logs.append("🔍 Researcher is collecting market data...")
+
+    # Extract queries
+    query_extraction_prompt = f"Extract 3-5 specific search queries from this plan:\n{state.strategy}\nOutput ONLY queries, one per line."
+    queries_text = await ctx.client.agenerate(query_extraction_prompt, temperature=0.3)
+    search_queries = [q.strip() for q in queries_text.strip().split('\n') if q.strip()][:5]
+
+    state.logs.append(f"  → Dispatching {len(search_queries)} searches (max {Config.SEARCH_CONCURRENCY} concurrent)...")
+    yield stream.update()
+
+    # New unique results stream out in completion order; once every search
+    # is back they are re-sent ranked across queries.
+    index = SourceIndex()
+    completed = 0
+    async for query_index, results, error in _fan_out_searches(search_queries, ctx.research_depth, ctx.search):
+        completed += 1
+        query = search_queries[query_index]
+        if error is not None:
+            logger.error(f"Search error: {error}")
+            state.logs.append(f"  ✗ Search {completed}/{len(search_queries)} failed: {query[:50]}...")
+        else:
+            added = index.add(query_index, results)
+            state.sources.extend(added)
+            state.logs.append(f"  → Search {completed}/{len(search_queries)}: {query[:50]}... "
+                              f"({len(results)} results, {len(added)} new)")
+        yield stream.update("sources")
+
+    all_search_results = index.ranked()
+    state.sources = all_search_results
+    if index.merged:
+        state.logs.append(f"  → {len(index)} unique sources ({index.merged} repeats merged)")
+    yield stream.update("sources")
+
+    # Deep read: full text of the top sources, bounded by a time budget
+    documents: List[Tuple[str, str]] = []
+    if ctx.usage.exhausted:
+        ctx.usage.degraded.append("skipped deep read")
+    elif ctx.research_depth >= Config.DEEP_READ_MIN_DEPTH and all_search_results:
+        with AGENT_STEP_DURATION.labels(role="reader").time():
+            async for frame in _deep_read(stream, all_search_results, documents):
+                yield frame
+
+    # Research synthesis: ranked, deduplicated sources, then full-text
+    # excerpts in whatever budget the sources leave
+    budget = Config.CONTEXT_BUDGET_RESEARCHER
+    seen: Set[str] = set()
+    formatted_results = pack_sources(all_search_results, budget // 2 if documents and budget else budget, seen)
+    if documents:
+        remaining = max(1, budget - estimate_tokens(formatted_results)) if budget else 0
+        formatted_results += "\n\nFull-text excerpts:\n" + pack_documents(documents, remaining, seen)
+    formatted_results = _fit_context(ctx, formatted_results, "source data")
+    researcher_prompt = f"Analyze source data for '{ctx.topic}':\n{formatted_results}\nSynthesize findings based on strategy."
+    state.raw_data = await ctx.client.agenerate(researcher_prompt, temperature=0.6)
+    state.logs.append("✓ Data collection complete")
+    yield stream.update("raw_data")
+
+
+async def _analyst(ctx: ResearchContext) -> AsyncGenerator[bytes, None]:
+    state, stream = ctx.state, ctx.stream
+    state.current_step = "analyst"
+    state.logs.append("📊 Analyst is processing findings...")
+    yield stream.update()
+
+    raw_data = _fit_context(ctx, pack_text(state.raw_data, Config.CONTEXT_BUDGET_ANALYST), "research findings")
+    analyst_prompt = f"Extract insights from data:\n{raw_data}\nProvide: Trends, Metrics, Competitors, SWOT, Actionable Insights."
+    async for chunk in ctx.client.astream(analyst_prompt, temperature=0.5):
+        state.insights += chunk
+        yield stream.delta("insights", chunk)
+    state.logs.append("✓ Analysis complete")
+    yield stream.update("insights")
+
+
+async def _visualizer(ctx: ResearchContext) -> AsyncGenerator[bytes, None]:
+    state, stream = ctx.state, ctx.stream
+    # Runs alongside the synthesizer, so both report the same step; one of
+    # its own would make the step flip with whichever stage yielded last
+    state.current_step = "synthesizer"
+    if ctx.usage.exhausted:
+        # Charts are optional; save the remaining budget for the report
+        ctx.usage.degraded.append("skipped charts")
+        state.logs.append("  ⚠️ Token budget exhausted: skipping charts")
+        yield stream.update()
+        return
+    state.logs.append("📈 Generating visualization data...")
+    yield stream.update()
+    try:
+        state.chart_data = await generate_chart_data(state.insights, ctx.topic)
+        state.logs.append(f"  → Generated {len(state.chart_data.get('charts', []))} charts")
+        yield stream.update()
+    except Exception as e:
+        logger.error(f"Visualizer error: {e}")
+
+
+async def _synthesizer(ctx: ResearchContext) -> AsyncGenerator[bytes, None]:
+    state, stream = ctx.state, ctx.stream
+    state.current_step = "synthesizer"
+    state.logs.append("📄 Generating final report...")
+    yield stream.update()
+
+    insights = _fit_context(ctx, pack_text(state.insights, Config.CONTEXT_BUDGET_SYNTHESIZER), "insights")
+    synthesizer_prompt = f"Create a professional market report for '{ctx.topic}' based on:\n{insights}\nInclude a JSON block for metadata."
+    async for chunk in ctx.client.astream(synthesizer_prompt, temperature=0.4):
+        state.final_report += chunk
+        yield stream.delta("final_report", chunk)
+
+
+def inject_charts(report: str, charts: List[Dict[str, Any]]) -> str:
+    """Returns `report` with `charts` added to its ```json metadata block, if it has one."""
+    if "```json" not in report:
+        return report
+    json_parts = report.split("```json")
+    content_json = json.loads(json_parts[1].split("```")[0].strip())
+    content_json["charts"] = charts
+    new_json = json.dumps(content_json, indent=2)
+    return report.replace(json_parts[1].split("```")[0].strip(), new_json)
+
+
+async def _inject_charts(ctx: ResearchContext) -> None:
+    """Merges the visualizer's charts into the report's JSON metadata block."""
+    state = ctx.state
+    if state.chart_data and "charts" not in state.final_report:
+        try:
+            state.final_report = inject_charts(state.final_report, state.chart_data.get("charts", []))
+        except Exception as e:
+            logger.error(f"Injection error: {e}")
+
+
+# The visualizer and synthesizer both only need the insights, so they run
+# side by side; add a stage here by declaring what it reads and writes.
+RESEARCH_STAGES: List[Stage] = [
+    Stage("strategist", _strategist, outputs=["strategy"], role="strategist"),
+    Stage("researcher", _researcher, inputs=["strategy"], outputs=["sources", "raw_data"], role="researcher"),
+    Stage("analyst", _analyst, inputs=["raw_data"], outputs=["insights"], role="analyst"),
+    Stage("visualizer", _visualizer, inputs=["insights"], outputs=["chart_data"], role="visualizer"),
+    Stage("synthesizer", _synthesizer, inputs=["insights"], outputs=["draft_report"], role="synthesizer"),
+    Stage("inject_charts", _inject_charts, inputs=["draft_report", "chart_data"], outputs=["final_report"]),
+]
+
+
+async def perform_market_research_stream(
+    topic: str, research_depth: int = 1, protocol: int = PROTOCOL_LEGACY,
+    stream: Optional[StateStream] = None, search: Optional[SearchFunction] = None
+) -> AsyncGenerator[bytes, None]:
     """
     Orchestrates research pipeline and streams updates via SSE.
+
+    The steps are the stages in RESEARCH_STAGES, run by core.pipeline with
+    independent stages in parallel. Analyst and synthesizer output is
+    streamed token-by-token. `protocol` selects the wire format (see
+    core.protocol): legacy full-state events or delta patches. Callers that
+    need to inspect what has been sent, such as background jobs, can pass
+    their own `stream`; batch runs pass a `search` function shared between
+    topics.
     """
-    state = AgentState()
-    client = get_gemini_client()
+    if stream is None:
+        stream = StateStream(AgentState(), protocol)
+    state = stream.state
+    root = start_trace("research", trace_id=stream.trace_id, topic=topic, research_depth=research_depth)
+    status = STATUS_OK
 
     try:
         ACTIVE_REQUESTS.inc()
         start_time = time.time()
-        
+        context = ResearchContext(topic, research_depth, stream, search, root_span=root)
+
         # Start
         state.current_step = "strategist"
         state.logs.append("🚀 Research started...")
-        yield send_sse_update("state", {
-            "current_step": state.current_step,
-            "logs": state.logs
-        })
+        yield stream.update()
         await asyncio.sleep(0.1)
 
-        # ==== STEP 1: STRATEGIST ====
-        with AGENT_STEP_DURATION.labels(role="strategist").time():
-            state.logs.append("📋 Strategist is breaking down the topic...")
-            yield send_sse_update("state", {
-                "current_step": state.current_step,
-                "logs": state.logs
-            })
-
-            strategist_prompt = f"""You are 'The Strategist', a strategic planner for market intelligence.
-Your task: Analyze the topic "{topic}" and create a research plan.
-Output format:
-1. Context Analysis: Brief overview of the topic
-2. Key Research Questions: 3-5 specific questions to answer
-3. Recommended Data Sources: Types of sources to consult"""
-
-            state.strategy = client.generate(strategist_prompt, temperature=0.7)
-            state.logs.append("✓ Strategy complete")
-            yield send_sse_update("state", {
-                "current_step": state.current_step,
-                "logs": state.logs,
-                "strategy": state.strategy
-            })
-
-        # ==== STEP 2: RESEARCHER ====
-        with AGENT_STEP_DURATION.labels(role="researcher").time():
-            state.current_step = "researcher"
-            state.logs.append("🔍 Researcher is collecting market data...")
-            
-            # Extract queries
-            query_extraction_prompt = f"Extract 3-5 specific search queries from this plan:\n{state.strategy}\nOutput ONLY queries, one per line."
-            queries_text = client.generate(query_extraction_prompt, temperature=0.3)
-            search_queries = [q.strip() for q in queries_text.strip().split('\n') if q.strip()][:5]
-
-            all_search_results = []
-            for i, query in enumerate(search_queries, 1):
-                try:
-                    state.logs.append(f"  → Search {i}/{len(search_queries)}: {query[:50]}...")
-                    yield send_sse_update("state", {"current_step": state.current_step, "logs": state.logs})
-
-                    with BRAVE_SEARCH_LATENCY.time():
-                        if research_depth >= 2:
-                            results = tavily_search(query, max_results=5, depth="advanced" if research_depth>=3 else "basic")
-                        else:
-                            results = search_web(query, count=3)
-                        all_search_results.extend(results)
-                    await asyncio.sleep(0.5)
-                except Exception as e:
-                    logger.error(f"Search error: {e}")
-
-            state.sources = all_search_results
-            yield send_sse_update("state", {"current_step": state.current_step, "logs": state.logs, "sources": state.sources})
-
-            # Research synthesis
-            formatted_results = "\n\n".join([f"Source {i+1}: {r['title']}\nURL: {r['url']}\nDescription: {r['description']}" for i, r in enumerate(all_search_results[:15])])
-            researcher_prompt = f"Analyze source data for '{topic}':\n{formatted_results}\nSynthesize findings based on strategy."
-            state.raw_data = client.generate(researcher_prompt, temperature=0.6)
-            state.logs.append("✓ Data collection complete")
-            yield send_sse_update("state", {"current_step": state.current_step, "logs": state.logs, "raw_data": state.raw_data})
-
-        # ==== STEP 3: ANALYST ====
-        with AGENT_STEP_DURATION.labels(role="analyst").time():
-            state.current_step = "analyst"
-            state.logs.append("📊 Analyst is processing findings...")
-            yield send_sse_update("state", {"current_step": state.current_step, "logs": state.logs})
-
-            analyst_prompt = f"Extract insights from data:\n{state.raw_data}\nProvide: Trends, Metrics, Competitors, SWOT, Actionable Insights."
-            state.insights = client.generate(analyst_prompt, temperature=0.5)
-            state.logs.append("✓ Analysis complete")
-            yield send_sse_update("state", {"current_step": state.current_step, "logs": state.logs, "insights": state.insights})
-
-        # ==== STEP 4: VISUALIZER ====
-        with AGENT_STEP_DURATION.labels(role="visualizer").time():
-            state.current_step = "visualizer"
-            state.logs.append("📈 Generating visualization data...")
-            yield send_sse_update("state", {"current_step": state.current_step, "logs": state.logs})
-            try:
-                state.chart_data = generate_chart_data(state.insights, topic)
-                state.logs.append(f"  → Generated {len(state.chart_data.get('charts', []))} charts")
-            except Exception as e:
-                logger.error(f"Visualizer error: {e}")
-
-        # ==== STEP 5: SYNTHESIZER ====
-        with AGENT_STEP_DURATION.labels(role="synthesizer").time():
-            state.current_step = "synthesizer"
-            state.logs.append("📄 Generating final report...")
-            yield send_sse_update("state", {"current_step": state.current_step, "logs": state.logs})
-
-            synthesizer_prompt = f"Create a professional market report for '{topic}' based on:\n{state.insights}\nInclude a JSON block for metadata."
-            state.final_report = client.generate(synthesizer_prompt, temperature=0.4)
-            
-            # Chart injection logic
-            if state.chart_data and "charts" not in state.final_report:
-                try:
-                    if "```json" in state.final_report:
-                        json_parts = state.final_report.split("```json")
-                        content_json = json.loads(json_parts[1].split("```")[0].strip())
-                        content_json["charts"] = state.chart_data.get("charts", [])
-                        new_json = json.dumps(content_json, indent=2)
-                        state.final_report = state.final_report.replace(json_parts[1].split("```")[0].strip(), new_json)
-                except Exception as e:
-                    logger.error(f"Injection error: {e}")
+        async for frame in run_stages(RESEARCH_STAGES, context):
+            yield frame
 
         # Complete
+        state.usage = context.usage.to_dict()
+        root.set(sources=len(state.sources), total_tokens=context.usage.total_tokens)
         state.current_step = "complete"
         state.logs.append("✅ Research complete!")
-        yield send_sse_update("state", {"current_step": state.current_step, "logs": state.logs, "final_report": state.final_report})
-        yield send_sse_update("complete", {"status": "success", "final_report": state.final_report})
+        yield stream.complete()
         
         REQUESTS_TOTAL.labels(status="success").inc()
         REPORTS_COMPLETED.inc()
 
+    except asyncio.CancelledError:
+        # The client went away; stages were cancelled by run_stages
+        logger.info(f"Research cancelled: {topic}")
+        REQUESTS_TOTAL.labels(status="cancelled").inc()
+        status = STATUS_CANCELLED
+        raise
     except Exception as e:
+        root.fail(str(e))
+        status = STATUS_ERROR
         logger.error(f"Orchestrator error: {e}")
         state.logs.append(f"❌ Error: {str(e)}")
-        yield send_sse_update("error", {"error": str(e), "logs": state.logs})
+        yield stream.error(str(e))
         REQUESTS_TOTAL.labels(status="error").inc()
     finally:
         ACTIVE_REQUESTS.dec()
         RESEARCH_DURATION.observe(time.time() - start_time)
+        root.end(status)
@@ -0,0 +1,155 @@
+"""
+Declarative stage graph executor.
+
+A pipeline is a list of `Stage`s, each declaring the artifacts it reads
+(`inputs`) and produces (`outputs`). A stage starts as soon as every stage
+producing its inputs has finished, so independent stages run concurrently.
+Stages are async generators of SSE frames (or plain coroutines for stages
+with nothing to stream); the executor interleaves their frames in the order
+they are produced.
+
+Each stage runs in its own task, labelled with its role for LLM token
+accounting. If the context has a `usage` attribute (a core.usage.TokenUsage),
+the stages' LLM calls are also counted against it. If it has a `span`
+attribute (a core.tracing root span), each stage is traced as its child.
+"""
+
+import asyncio
+import inspect
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Union
+
+from .metrics import AGENT_STEP_DURATION
+from .tracing import span
+from .usage import llm_role, track_session
+
+
+class PipelineError(Exception):
+    """Exception raised for an invalid stage graph."""
+    pass
+
+
+class Stage:
+    """One step of a pipeline."""
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[Any], Union[AsyncIterator[bytes], Awaitable[None]]],
+        inputs: Sequence[str] = (),
+        outputs: Sequence[str] = (),
+        role: Optional[str] = None,
+    ):
+        """
+        Args:
+            name: Unique stage name
+            run: Async generator function (or coroutine function) taking the pipeline context
+            inputs: Artifacts this stage needs
+            outputs: Artifacts this stage produces
+            role: AGENT_STEP_DURATION label (None skips timing)
+        """
+        self.name = name
+        self.run = run
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.role = role
+
+    def __repr__(self) -> str:
+        return f"Stage({self.name!r})"
+
+
+def resolve_dependencies(stages: List[Stage]) -> Dict[str, Set[str]]:
+    """
+    Map each stage name to the names of the stages it waits for.
+
+    Raises:
+        PipelineError: On duplicate names or outputs, inputs nobody
+            produces, or dependency cycles
+    """
+    producers: Dict[str, str] = {}
+    names = set()
+    for stage in stages:
+        if stage.name in names:
+            raise PipelineError(f"Duplicate stage name: {stage.name}")
+        names.add(stage.name)
+        for output in stage.outputs:
+            if output in producers:
+                raise PipelineError(f"Output {output!r} produced by both {producers[output]} and {stage.name}")
+            producers[output] = stage.name
+
+    dependencies: Dict[str, Set[str]] = {}
+    for stage in stages:
+        missing = [name for name in stage.inputs if name not in producers]
+        if missing:
+            raise PipelineError(f"Stage {stage.name} needs {missing}, which no stage produces")
+        dependencies[stage.name] = {producers[name] for name in stage.inputs}
+
+    # Kahn's algorithm: anything left unsorted sits on a cycle
+    remaining = {name: set(deps) for name, deps in dependencies.items()}
+    while remaining:
+        ready = [name for name, deps in remaining.items() if not deps]
+        if not ready:
+            raise PipelineError(f"Dependency cycle between stages: {sorted(remaining)}")
+        for name in ready:
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return dependencies
+
+
+async def run_stages(stages: List[Stage], context: Any) -> AsyncIterator[bytes]:
+    """
+    Run `stages` with maximal concurrency, yielding their frames as produced.
+
+    The first stage to fail cancels the others and its exception is raised.
+    Closing the iterator early cancels every running stage.
+    """
+    dependencies = resolve_dependencies(stages)
+    usage = getattr(context, "usage", None)
+    root_span = getattr(context, "span", None)
+    by_name = {stage.name: stage for stage in stages}
+    queue: asyncio.Queue = asyncio.Queue()
+    finished: Set[str] = set()
+    running: Dict[str, asyncio.Task] = {}
+
+    async def drive(stage: Stage) -> None:
+        result = stage.run(context)
+        if inspect.isawaitable(result):
+            await result
+            return
+        async for frame in result:
+            queue.put_nowait((stage.name, frame, None))
+
+    async def execute(stage: Stage) -> None:
+        try:
+            with llm_role(stage.role or stage.name), track_session(usage), \
+                    span(f"stage.{stage.name}", parent=root_span, role=stage.role or stage.name):
+                if stage.role is None:
+                    await drive(stage)
+                else:
+                    with AGENT_STEP_DURATION.labels(role=stage.role).time():
+                        await drive(stage)
+        except Exception as e:
+            queue.put_nowait((stage.name, None, e))
+        else:
+            queue.put_nowait((stage.name, None, None))
+
+    def start_ready() -> None:
+        for name, deps in dependencies.items():
+            if name not in running and name not in finished and deps <= finished:
+                running[name] = asyncio.create_task(execute(by_name[name]))
+
+    try:
+        start_ready()
+        while running:
+            name, frame, error = await queue.get()
+            if frame is not None:
+                yield frame
+                continue
+            if error is not None:
+                raise error
+            del running[name]
+            finished.add(name)
+            start_ready()
+    finally:
+        for task in running.values():
+            task.cancel()
@@ -0,0 +1,194 @@
+"""
+SSE wire protocols for research sessions.
+
+Protocol 1 (legacy) resends `current_step` and the full `logs` list, plus
+whichever fields changed, in every `state` event.
+
+Protocol 2 (delta) sends only changes, as `patch` events carrying an
+increasing `id`:
+
+    {"set": {"current_step": "analyst"}, "append": {"logs": ["..."], "insights": "..."}}
+
+`set` replaces a field; `append` extends a list field with new items or a
+text field with new text. The final `complete` event carries only the status,
+because the client has already built the report from patches.
+
+In both protocols the first frame of a session also carries `trace_id`,
+the id of its trace (core.tracing), when tracing is enabled.
+"""
+
+from typing import Any, Dict, Optional
+
+from .sse import FragmentCache, PreEncoded, dumps, encode_frame
+from .state import AgentState
+from .tracing import new_trace_id, tracing_enabled
+
+PROTOCOL_LEGACY = 1
+PROTOCOL_DELTA = 2
+SUPPORTED_PROTOCOLS = (PROTOCOL_LEGACY, PROTOCOL_DELTA)
+
+# AgentState fields mirrored to the client
+STREAMED_FIELDS = ["current_step", "logs", "sources", "strategy", "raw_data", "insights", "final_report"]
+
+# Fields that only grow while streaming, so they can be sent as appends
+APPENDABLE_FIELDS = {"logs", "sources", "strategy", "raw_data", "insights", "final_report"}
+
+# List fields whose items are never mutated once added; their encoded items are reused
+LIST_FIELDS = {"logs", "sources"}
+
+
+class StateStream:
+    """
+    Encodes AgentState changes for one session in the negotiated protocol.
+
+    The orchestrator mutates `state` and then calls `update`, `delta`,
+    `complete` or `error`. Each call returns the encoded frames to send,
+    joined into one bytes object; in delta mode it may be empty.
+    """
+
+    def __init__(self, state: AgentState, protocol: int = PROTOCOL_LEGACY):
+        if protocol not in SUPPORTED_PROTOCOLS:
+            raise ValueError(f"Unsupported SSE protocol: {protocol}")
+        self.state = state
+        self.protocol = protocol
+        self._last_id = 0
+        self._last_state_id = 0
+        self._fragments = FragmentCache()
+        # The `complete` or `error` frame, once the session has ended
+        self.terminal_frame: Optional[bytes] = None
+        # Id of the session's trace (core.tracing), sent in the first frame
+        self.trace_id: Optional[str] = new_trace_id() if tracing_enabled() else None
+        # What the client has seen so far, per field (delta mode only)
+        self._sent: Dict[str, Any] = {field: _empty(getattr(state, field)) for field in STREAMED_FIELDS}
+
+    @property
+    def last_id(self) -> int:
+        """
+        Sequence number of the last frame produced.
+
+        Written as the SSE id in delta mode; legacy frames are numbered
+        the same way but carry no id.
+        """
+        return self._last_id
+
+    def snapshot(self) -> bytes:
+        """
+        One frame carrying every field as of the last state frame sent,
+        and the trace id.
+
+        In delta mode it is a `patch` with the id of the last patch, so a
+        client that missed earlier patches can apply it and then continue
+        with later frames. In legacy mode it is a full `state` event.
+        """
+        extra = {"trace_id": self.trace_id} if self.trace_id else {}
+        if self.protocol == PROTOCOL_LEGACY:
+            data = {field: self._value(field, getattr(self.state, field)) for field in STREAMED_FIELDS}
+            return encode_frame("state", dict(data, **extra))
+        data = {field: self._value(field, value) for field, value in self._sent.items()}
+        return encode_frame("patch", {"set": data, **extra}, event_id=self._last_state_id)
+
+    def _frame(self, event: str, data: Dict[str, Any], state: bool = False) -> bytes:
+        """
+        Number and encode a frame; `state` marks frames that change client state.
+
+        The first frame also carries the session's `trace_id`.
+        """
+        if self._last_id == 0 and self.trace_id:
+            data = dict(data, trace_id=self.trace_id)
+        self._last_id += 1
+        if state:
+            self._last_state_id = self._last_id
+        event_id = self._last_id if self.protocol == PROTOCOL_DELTA else None
+        return encode_frame(event, data, event_id=event_id)
+
+    def _value(self, field: str, value: Any) -> Any:
+        """Field value for a frame, with list items taken from the fragment cache."""
+        if field in LIST_FIELDS:
+            return self._fragments.encode_list(field, value)
+        return value
+
+    def _legacy_state(self, **extra: Any) -> bytes:
+        data = {"current_step": self.state.current_step, "logs": self._value("logs", self.state.logs)}
+        data.update(extra)
+        return self._frame("state", data, state=True)
+
+    def _patch(self) -> bytes:
+        """Diff every streamed field against what was last sent."""
+        set_fields: Dict[str, Any] = {}
+        append_fields: Dict[str, Any] = {}
+        for field in STREAMED_FIELDS:
+            value = getattr(self.state, field)
+            sent = self._sent[field]
+            if value == sent:
+                continue
+            if field in APPENDABLE_FIELDS and value[:len(sent)] == sent:
+                # Only the new items, each encoded once; the fragment cache
+                # is for whole lists (snapshots, sets) and would always miss
+                append_fields[field] = value[len(sent):]
+            else:
+                set_fields[field] = self._value(field, value)
+            self._sent[field] = list(value) if isinstance(value, list) else value
+
+        data: Dict[str, Any] = {}
+        if set_fields:
+            data["set"] = set_fields
+        if append_fields:
+            data["append"] = append_fields
+        return self._frame("patch", data, state=True) if data else b""
+
+    def update(self, *fields: str) -> bytes:
+        """
+        Frames for a state change.
+
+        Legacy mode sends `current_step`, `logs` and the named `fields`;
+        delta mode sends whatever changed since the last frame.
+        """
+        if self.protocol == PROTOCOL_LEGACY:
+            return self._legacy_state(**{field: self._value(field, getattr(self.state, field)) for field in fields})
+        return self._patch()
+
+    def delta(self, field: str, text: str) -> bytes:
+        """Frames for `text` just appended to the text field `field`."""
+        if self.protocol == PROTOCOL_LEGACY:
+            return self._frame("delta", {"field": field, "text": text}, state=True)
+        # Only `field` changed, so skip the full diff
+        self._sent[field] = getattr(self.state, field)
+        return self._frame("patch", {"append": {field: text}}, state=True)
+
+    def queued(self, position: int) -> bytes:
+        """Frame telling a waiting client its place in the admission queue."""
+        return self._frame("queued", {"position": position})
+
+    def complete(self) -> bytes:
+        """Final frames of a successful session, with its token usage if recorded."""
+        data: Dict[str, Any] = {"status": "success"}
+        if self.state.usage:
+            data["usage"] = self.state.usage
+        if self.protocol == PROTOCOL_LEGACY:
+            # The report goes out twice in legacy mode; encode it once
+            report = PreEncoded(dumps(self.state.final_report))
+            state = self._legacy_state(final_report=report)
+            self.terminal_frame = self._frame("complete", dict(data, final_report=report))
+            return state + self.terminal_frame
+        patch = self._patch()
+        self.terminal_frame = self._frame("complete", data)
+        return patch + self.terminal_frame
+
+    def error(self, message: str) -> bytes:
+        """Final frames of a failed session."""
+        if self.protocol == PROTOCOL_LEGACY:
+            self.terminal_frame = self._frame("error", {"error": message, "logs": self._value("logs", self.state.logs)})
+            return self.terminal_frame
+        patch = self._patch()
+        self.terminal_frame = self._frame("error", {"error": message})
+        return patch + self.terminal_frame
+
+
+def _empty(value: Any) -> Any:
+    """Initial client-side value of a field: empty text and lists, otherwise the value itself."""
+    if isinstance(value, list):
+        return []
+    if isinstance(value, str):
+        return ""
+    return value
+
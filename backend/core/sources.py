@@ -0,0 +1,226 @@
+"""
+Deduplicated, ranked search sources for a research session.
+
+The same page often comes back from several queries under slightly
+different URLs (tracking parameters, `www.`, AMP variants), and syndicated
+copies of one press release appear on many sites. `SourceIndex` keys
+results by canonical URL and compares their snippets' word bigrams, so
+both kinds of repeat are merged into the best-ranked copy before the
+results reach the SSE `sources` field or the researcher prompt.
+
+Snippets are a few dozen words, too short for SimHash to separate an
+edited copy from an unrelated story on the same topic, so near-duplicates
+are judged by exact Jaccard similarity. A MinHash signature split into
+bands (locality-sensitive hashing) picks the candidates to compare, so a
+lookup doesn't scan every source seen so far.
+"""
+
+import re
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from config import Config
+
+from .metrics import SOURCES_DEDUPLICATED
+
+_WORD = re.compile(r"\w+")
+_AMP_PATH = re.compile(r"(/amp)+/?$|\.amp(?=\.html?$)")
+
+# Query parameters that only track the visitor, never select content
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "ref", "ref_src", "ref_url", "referrer", "cmpid", "ocid", "amp",
+}
+TRACKING_PREFIXES = ("utm_", "_hs", "pk_", "mkt_")
+# Host prefixes that serve the same content as the bare domain
+HOST_PREFIXES = ("www.", "m.", "amp.")
+
+# MinHash signature: one-permutation hashing into 32 bins, grouped into
+# bands of 2 bins for candidate lookup
+SIGNATURE_SIZE = 32
+BAND_ROWS = 2
+# Snippets shorter than this many words are too generic to compare
+MIN_SHINGLE_WORDS = 8
+# hash() never returns -1, so it can mark a bin no shingle fell into
+_EMPTY = -1
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Reduce `url` to a form shared by every address of the same page.
+
+    Lowercases the scheme and host, drops `www.`/`m.`/`amp.` host
+    prefixes, AMP path variants, tracking parameters, fragments, default
+    ports and trailing slashes, and sorts the remaining query parameters.
+    Strings that aren't absolute URLs are returned stripped.
+    """
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    if not parts.netloc:
+        return url
+    scheme = parts.scheme.lower()
+    if scheme in ("http", "https"):
+        scheme = "https"
+    host = (parts.hostname or "").rstrip(".")
+    for prefix in HOST_PREFIXES:
+        if host.startswith(prefix) and host.count(".") > 1:
+            host = host[len(prefix):]
+            break
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+    path = _AMP_PATH.sub("", parts.path).rstrip("/")
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+def shingles(text: str) -> Optional[FrozenSet[Tuple[str, str]]]:
+    """
+    Lowercased word bigrams of `text`.
+
+    Returns None for text under MIN_SHINGLE_WORDS words, which would match
+    too easily.
+    """
+    words = _WORD.findall(text.lower())
+    if len(words) < MIN_SHINGLE_WORDS:
+        return None
+    return frozenset(zip(words, words[1:]))
+
+
+def minhash(shingle_set: Iterable[Tuple[str, str]]) -> Tuple[int, ...]:
+    """
+    One-permutation MinHash signature of a shingle set.
+
+    Each shingle is hashed once and binned by its low bits; a bin keeps its
+    smallest hash, so two sets' bins agree with probability close to their
+    Jaccard similarity. Uses Python's string hashing, which is seeded per
+    process: signatures are only comparable within one process. Bins no
+    shingle fell into hold _EMPTY.
+    """
+    signature = [_EMPTY] * SIGNATURE_SIZE
+    mask = SIGNATURE_SIZE - 1
+    for shingle in shingle_set:
+        h = hash(shingle)
+        b = h & mask
+        if signature[b] == _EMPTY or h < signature[b]:
+            signature[b] = h
+    return tuple(signature)
+
+
+def jaccard(a: FrozenSet[Tuple[str, str]], b: FrozenSet[Tuple[str, str]]) -> float:
+    common = len(a & b)
+    return common / (len(a) + len(b) - common)
+
+
+class _Source:
+    __slots__ = ("result", "key", "shingles")
+
+    def __init__(self, result: Dict[str, Any], key: Tuple[int, int], shingle_set: Optional[FrozenSet[Tuple[str, str]]]):
+        self.result = result
+        # (rank within its query, query index): lower is better
+        self.key = key
+        self.shingles = shingle_set
+
+
+class SourceIndex:
+    """Unique search results of one session, ranked best first."""
+
+    def __init__(self, similarity: Optional[float] = None):
+        """
+        Args:
+            similarity: Jaccard similarity of snippet word bigrams at which
+                two results count as the same story (default
+                Config.SOURCE_NEAR_DUPLICATE_SIMILARITY, 0 disables
+                near-duplicate detection)
+        """
+        self.similarity = Config.SOURCE_NEAR_DUPLICATE_SIMILARITY if similarity is None else similarity
+        self._sources: List[_Source] = []
+        self._by_url: Dict[str, _Source] = {}
+        # Results merged into an earlier copy
+        self.merged = 0
+        self._bands: List[Dict[Tuple[int, ...], List[_Source]]] = [{} for _ in range(SIGNATURE_SIZE // BAND_ROWS)]
+
+    def __len__(self) -> int:
+        return len(self._sources)
+
+    @staticmethod
+    def _band_keys(signature: Tuple[int, ...]) -> Iterator[Tuple[int, Tuple[int, ...]]]:
+        """Yield (band number, key) for bands without empty bins, which would match spuriously."""
+        for band in range(SIGNATURE_SIZE // BAND_ROWS):
+            key = signature[band * BAND_ROWS:(band + 1) * BAND_ROWS]
+            if _EMPTY not in key:
+                yield band, key
+
+    def _near_duplicate(self, shingle_set: FrozenSet[Tuple[str, str]], signature: Tuple[int, ...]) -> Optional[_Source]:
+        checked = set()
+        size = len(shingle_set)
+        for band, key in self._band_keys(signature):
+            for source in self._bands[band].get(key, ()):
+                if id(source) in checked:
+                    continue
+                checked.add(id(source))
+                # Jaccard can't exceed the ratio of the set sizes
+                other = len(source.shingles)
+                if min(size, other) < self.similarity * max(size, other):
+                    continue
+                if jaccard(shingle_set, source.shingles) >= self.similarity:
+                    return source
+        return None
+
+    def _merge(self, source: _Source, key: Tuple[int, int], reason: str) -> None:
+        self.merged += 1
+        source.key = min(source.key, key)
+        SOURCES_DEDUPLICATED.labels(reason=reason).inc()
+
+    def add(self, query_index: int, results: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Add one query's results in rank order.
+
+        Returns the results that were new; repeats of a URL or a
+        near-duplicate snippet are merged into the copy already indexed,
+        which takes the better of the two ranks.
+        """
+        added = []
+        for rank, result in enumerate(results):
+            key = (rank, query_index)
+            url = canonicalize_url(result.get("url") or "")
+            source = self._by_url.get(url) if url else None
+            if source is not None:
+                self._merge(source, key, "url")
+                continue
+            shingle_set = signature = None
+            if self.similarity > 0:
+                shingle_set = shingles(result.get("description") or "")
+            if shingle_set is not None:
+                signature = minhash(shingle_set)
+                source = self._near_duplicate(shingle_set, signature)
+                if source is not None:
+                    self._merge(source, key, "near_duplicate")
+                    if url:
+                        self._by_url[url] = source
+                    continue
+            source = _Source(result, key, shingle_set)
+            self._sources.append(source)
+            if url:
+                self._by_url[url] = source
+            if signature is not None:
+                for band, band_key in self._band_keys(signature):
+                    self._bands[band].setdefault(band_key, []).append(source)
+            added.append(result)
+        return added
+
+    def ranked(self) -> List[Dict[str, Any]]:
+        """
+        Unique results best first.
+
+        Every query's top result comes before any query's second, and so
+        on, so one broad query cannot crowd out the others.
+        """
+        return [source.result for source in sorted(self._sources, key=lambda s: s.key)]
+
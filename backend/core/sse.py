@@ -0,0 +1,90 @@
+"""
+Byte-level SSE frame encoder.
+
+Frames are built directly as bytes, so Starlette sends them without
+re-encoding, using orjson when it is installed and the stdlib json module
+otherwise. Both write compact JSON; the stdlib path escapes non-ASCII
+characters, which is faster there.
+
+Values already encoded for an earlier frame, such as the growing log and
+source lists, can be spliced into later frames as `PreEncoded` fragments
+instead of being serialized again; see `FragmentCache`.
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised when orjson is absent
+    orjson = None
+
+
+# Built once: json.dumps with non-default options constructs an encoder per call
+_stdlib_encoder = json.JSONEncoder(separators=(",", ":"))
+
+
+def _stdlib_dumps(value: Any) -> bytes:
+    return _stdlib_encoder.encode(value).encode("ascii")
+
+
+dumps = orjson.dumps if orjson is not None else _stdlib_dumps
+
+
+class PreEncoded:
+    """A JSON value that has already been encoded to bytes."""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+
+def encode_json(value: Any) -> bytes:
+    """Encode `value` to JSON bytes, splicing in any PreEncoded fragments in dicts."""
+    if isinstance(value, PreEncoded):
+        return value.data
+    if isinstance(value, dict) and _has_fragments(value):
+        return b"{" + b",".join(dumps(key) + b":" + encode_json(item) for key, item in value.items()) + b"}"
+    return dumps(value)
+
+
+def _has_fragments(value: Dict[str, Any]) -> bool:
+    return any(isinstance(item, PreEncoded) or (isinstance(item, dict) and _has_fragments(item))
+               for item in value.values())
+
+
+def encode_frame(event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> bytes:
+    """Encode one SSE frame; `data` may contain PreEncoded fragments."""
+    head = b"event: " + event.encode("utf-8") + b"\ndata: "
+    if event_id is not None:
+        head = b"id: " + str(event_id).encode("ascii") + b"\n" + head
+    return head + encode_json(data) + b"\n\n"
+
+
+class FragmentCache:
+    """
+    Per-session cache of encoded append-only lists (logs, sources).
+
+    A list that grew since it was last encoded is re-sent as the cached
+    encoding plus the encoded new items, so each item is serialized once.
+    Any other change re-encodes the whole list. Items must not be mutated
+    in place after they are first encoded.
+    """
+
+    def __init__(self):
+        # key -> (snapshot of the items, their encoding)
+        self._lists: Dict[str, Tuple[List[Any], bytes]] = {}
+
+    def encode_list(self, key: str, items: List[Any]) -> PreEncoded:
+        cached = self._lists.get(key)
+        if cached is not None and len(items) >= len(cached[0]) and items[:len(cached[0])] == cached[0]:
+            snapshot, data = cached
+            if len(items) == len(snapshot):
+                return PreEncoded(data)
+            tail = dumps(items[len(snapshot):])
+            data = tail if not snapshot else data[:-1] + b"," + tail[1:]
+        else:
+            data = dumps(items)
+        self._lists[key] = (list(items), data)
+        return PreEncoded(data)
@@ -1,5 +1,5 @@
 import json
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 class AgentState:
     """Shared state for agent execution"""
@@ -13,7 +13,11 @@ class AgentState:
         self.chart_data: Dict[str, Any] = {}
         self.final_report: str = ""
         self.dashboard_url: str = ""
+        # Session token totals (core.usage.TokenUsage.to_dict), set on completion
+        self.usage: Dict[str, Any] = {}
 
-def send_sse_update(event: str, data: Dict[str, Any]) -> str:
+def send_sse_update(event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
     """Helper to format SSE update string"""
+    if event_id is not None:
+        return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
     return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,92 @@
+"""
+Relaying SSE streams to HTTP clients.
+
+Starlette only notices a closed connection when it next tries to send (or,
+on older ASGI servers, cancels the response without closing the stream),
+so a pipeline waiting seconds on an LLM call keeps running for nobody.
+`stream_until_disconnect` watches the connection itself and cancels the
+producer as soon as the client goes away. It also ends the stream with a
+retryable error once a worker shutdown's grace period runs out (core.drain).
+"""
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict
+
+from .drain import RESTART_FRAME, get_drain
+from .metrics import ACTIVE_SSE, SSE_DISCONNECTS, SSE_DRAINED
+
+logger = logging.getLogger("market_analyst_agent")
+
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+
+_END = object()
+
+
+async def _wait_for_disconnect(receive: Receive) -> None:
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def stream_until_disconnect(frames: AsyncIterator[bytes], receive: Receive) -> AsyncIterator[bytes]:
+    """
+    Yield `frames` until they end or the client disconnects.
+
+    `frames` runs in its own task, so a disconnect cancels whatever it is
+    awaiting right away rather than at its next frame. Frames are queued
+    without a bound; a session produces a few hundred at most. Maintains the
+    ACTIVE_SSE gauge and counts streams that end early in SSE_DISCONNECTS,
+    or in SSE_DRAINED when a drain cut them off with RESTART_FRAME.
+
+    Args:
+        frames: The SSE stream, e.g. a pipeline or job subscription
+        receive: The request's ASGI receive channel
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    disconnected = False
+    drained = False
+
+    async def produce() -> None:
+        try:
+            async for frame in frames:
+                queue.put_nowait(frame)
+        finally:
+            queue.put_nowait(_END)
+
+    async def watch() -> None:
+        nonlocal disconnected
+        await _wait_for_disconnect(receive)
+        disconnected = True
+        producer.cancel()
+
+    async def watch_drain() -> None:
+        nonlocal drained
+        await get_drain().expired()
+        if not producer.done():
+            drained = True
+            producer.cancel()
+
+    producer = asyncio.create_task(produce())
+    watcher = asyncio.create_task(watch())
+    drain_watcher = asyncio.create_task(watch_drain())
+    ACTIVE_SSE.inc()
+    finished = False
+    try:
+        while (frame := await queue.get()) is not _END:
+            yield frame
+        if drained and not disconnected:
+            finished = True
+            SSE_DRAINED.inc()
+            yield RESTART_FRAME
+        elif not disconnected:
+            finished = True
+            # Re-raises anything the stream failed with
+            await producer
+    finally:
+        ACTIVE_SSE.dec()
+        watcher.cancel()
+        drain_watcher.cancel()
+        if not finished:
+            SSE_DISCONNECTS.inc()
+            producer.cancel()
+            logger.info("SSE client disconnected; cancelled its stream")
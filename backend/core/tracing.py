@@ -0,0 +1,517 @@
+"""
+Span-based tracing of research sessions.
+
+Each session has a root span; the stage executor (core.pipeline) opens a
+child span per stage, and LLM calls, search queries, fetches and cache
+lookups made inside a stage open their own children. The current span is
+carried in a context variable, so tasks a stage starts inherit it. Outside
+a trace `span` returns a no-op span, so library code can be instrumented
+unconditionally.
+
+When the root span ends, the whole trace goes to the configured exporters
+(Config.TRACE_EXPORTERS):
+
+- `memory`: keeps recent traces for GET /traces/{trace_id}
+- `jsonl`: appends one JSON line per span to Config.TRACE_JSONL_PATH
+- `otlp`: posts OTLP/HTTP JSON to Config.TRACE_OTLP_ENDPOINT from a
+  background thread
+
+The trace id is sent in the first SSE frame of the session. Run
+`python -m core.tracing show traces.jsonl <trace_id>` to print a trace as
+a waterfall, or `python -m core.tracing collect` for a local stand-in of
+an OTLP collector that writes what it receives to a JSONL file.
+"""
+
+import argparse
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+
+from config import Config
+
+from .metrics import TRACE_EXPORT_ERRORS
+
+logger = logging.getLogger("market_analyst_agent")
+
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+STATUS_CANCELLED = "cancelled"
+
+# OTLP status codes (opentelemetry.proto.trace.v1.Status.StatusCode)
+_OTLP_STATUS = {STATUS_OK: 1, STATUS_ERROR: 2, STATUS_CANCELLED: 0}
+_SPAN_KIND_INTERNAL = 1
+
+_current: ContextVar[Optional["Span"]] = ContextVar("trace_span", default=None)
+
+
+def new_trace_id() -> str:
+    """Random 128-bit trace id, hex encoded as in W3C Trace Context and OTLP."""
+    return os.urandom(16).hex()
+
+
+class _Trace:
+    """Spans of one trace, exported together when the root span ends."""
+
+    def __init__(self, trace_id: str, tracer: "Tracer"):
+        self.trace_id = trace_id
+        self.tracer = tracer
+        self.spans: List[Dict[str, Any]] = []
+        self.exported = False
+
+
+class Span:
+    """One timed operation in a trace."""
+
+    def __init__(self, name: str, trace: _Trace, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.status = STATUS_OK
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+
+    @property
+    def trace_id(self) -> str:
+        return self.trace.trace_id
+
+    def set(self, **attributes: Any) -> None:
+        """Add or replace attributes."""
+        self.attributes.update(attributes)
+
+    def fail(self, error: str) -> None:
+        """Mark a handled failure; the span ends with status "error"."""
+        self.status = STATUS_ERROR
+        self.attributes["error"] = error
+
+    def end(self, status: str = STATUS_OK, error: Optional[str] = None) -> None:
+        """
+        Finish the span; ending the root span exports the trace.
+
+        Spans that end after their trace was exported (work left running
+        after the session ended) are dropped.
+        """
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        self.status = status
+        if error:
+            self.attributes["error"] = error
+        trace = self.trace
+        if trace.exported:
+            return
+        trace.spans.append(self.to_dict())
+        if self.parent_id is None:
+            trace.exported = True
+            trace.tracer.export(trace.spans)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Stands in for a span outside any trace."""
+
+    trace_id = None
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def fail(self, error: str) -> None:
+        pass
+
+    def end(self, status: str = STATUS_OK, error: Optional[str] = None) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def current_span() -> Any:
+    """The innermost open span in this context, or a no-op span."""
+    return _current.get() or NOOP_SPAN
+
+
+def start_trace(name: str, trace_id: Optional[str] = None, **attributes: Any) -> Any:
+    """
+    Start a root span, or return a no-op span when tracing is disabled.
+
+    The root span is not made current: pass it as `parent` (the stage
+    executor does this with the pipeline context's `span`) and `end` it
+    when the session is over.
+    """
+    tracer = get_tracer()
+    if not tracer.enabled:
+        return NOOP_SPAN
+    return Span(name, _Trace(trace_id or new_trace_id(), tracer), None, attributes)
+
+
+def _restore(token: Token) -> None:
+    try:
+        _current.reset(token)
+    except ValueError:
+        # Closed from another context, e.g. an async generator finalized by
+        # the event loop; that context never saw the span
+        pass
+
+
+@contextmanager
+def span(name: str, parent: Any = None, **attributes: Any) -> Iterator[Any]:
+    """
+    Time the enclosed block as a child of `parent` (default: the current span).
+
+    The span is current inside the block. An exception ends it with status
+    "error", cancellation with "cancelled"; `fail` marks an error the block
+    handled itself. Without a parent this yields a no-op span and records
+    nothing.
+    """
+    parent = parent or _current.get()
+    if not isinstance(parent, Span):
+        yield NOOP_SPAN
+        return
+    child = Span(name, parent.trace, parent.span_id, attributes)
+    token = _current.set(child)
+    try:
+        yield child
+    except Exception as e:
+        child.end(STATUS_ERROR, str(e))
+        raise
+    except BaseException:
+        # Cancellation, or an enclosing generator being closed
+        child.end(STATUS_CANCELLED)
+        raise
+    else:
+        child.end(child.status)
+    finally:
+        _restore(token)
+
+
+class MemoryExporter:
+    """Keeps the most recent traces in memory, for the /traces endpoint."""
+
+    name = "memory"
+
+    def __init__(self, max_traces: int = 200):
+        self.max_traces = max_traces
+        self._traces: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        trace_id = spans[0]["trace_id"]
+        self._traces[trace_id] = spans
+        self._traces.move_to_end(trace_id)
+        while len(self._traces) > self.max_traces:
+            self._traces.popitem(last=False)
+
+    def get(self, trace_id: str) -> Optional[List[Dict[str, Any]]]:
+        return self._traces.get(trace_id)
+
+    def shutdown(self) -> None:
+        pass
+
+
+class JsonlExporter:
+    """Appends one JSON line per span to a local file."""
+
+    name = "jsonl"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        lines = "".join(json.dumps(s) + "\n" for s in spans)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    def shutdown(self) -> None:
+        pass
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        # 64-bit integers are strings in the OTLP JSON mapping
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _plain_value(value: Dict[str, Any]) -> Any:
+    if "intValue" in value:
+        return int(value["intValue"])
+    for kind in ("boolValue", "doubleValue", "stringValue"):
+        if kind in value:
+            return value[kind]
+    return None
+
+
+def to_otlp(spans: List[Dict[str, Any]], service_name: str) -> Dict[str, Any]:
+    """Encode spans as an OTLP/HTTP JSON ExportTraceServiceRequest."""
+    otlp_spans = []
+    for s in spans:
+        otlp = {
+            "traceId": s["trace_id"],
+            "spanId": s["span_id"],
+            "name": s["name"],
+            "kind": _SPAN_KIND_INTERNAL,
+            "startTimeUnixNano": str(s["start_ns"]),
+            "endTimeUnixNano": str(s["end_ns"]),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s["attributes"].items()],
+            "status": {"code": _OTLP_STATUS[s["status"]], "message": "" if s["status"] == STATUS_OK else s["status"]},
+        }
+        if s["parent_id"]:
+            otlp["parentSpanId"] = s["parent_id"]
+        otlp_spans.append(otlp)
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+        "scopeSpans": [{"scope": {"name": "market_analyst_agent"}, "spans": otlp_spans}],
+    }]}
+
+
+def from_otlp(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Decode an OTLP/HTTP JSON request back into span dicts."""
+    spans = []
+    for resource in payload.get("resourceSpans", []):
+        for scope in resource.get("scopeSpans", []):
+            for s in scope.get("spans", []):
+                status = s.get("status", {})
+                spans.append({
+                    "trace_id": s["traceId"],
+                    "span_id": s["spanId"],
+                    "parent_id": s.get("parentSpanId") or None,
+                    "name": s["name"],
+                    "start_ns": int(s["startTimeUnixNano"]),
+                    "end_ns": int(s["endTimeUnixNano"]),
+                    "status": status.get("message") or STATUS_OK,
+                    "attributes": {a["key"]: _plain_value(a["value"]) for a in s.get("attributes", [])},
+                })
+    return spans
+
+
+class OtlpExporter:
+    """
+    Sends traces to an OpenTelemetry collector over OTLP/HTTP (JSON).
+
+    Requests are made from a background thread so exporting never blocks
+    the event loop; when the collector falls behind, traces beyond
+    `max_queue` are dropped and counted in TRACE_EXPORT_ERRORS.
+    """
+
+    name = "otlp"
+
+    def __init__(self, endpoint: str, service_name: str, timeout: float = 5.0, max_queue: int = 1000,
+                 client: Optional[httpx.Client] = None):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self._client = client or httpx.Client(timeout=timeout)
+        self._queue: queue.Queue = queue.Queue(max_queue)
+        self._thread = threading.Thread(target=self._worker, name="otlp-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            TRACE_EXPORT_ERRORS.labels(exporter=self.name).inc()
+
+    def _worker(self) -> None:
+        while (spans := self._queue.get()) is not None:
+            try:
+                response = self._client.post(self.url, json=to_otlp(spans, self.service_name))
+                response.raise_for_status()
+            except Exception as e:
+                TRACE_EXPORT_ERRORS.labels(exporter=self.name).inc()
+                logger.warning(f"Trace export to {self.url} failed: {e}")
+
+    def shutdown(self) -> None:
+        """Send what is queued, then stop the worker."""
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+        self._client.close()
+
+
+class Tracer:
+    """Hands finished traces to its exporters."""
+
+    def __init__(self, exporters: Optional[List[Any]] = None):
+        self.exporters = exporters or []
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.exporters)
+
+    def exporter(self, name: str) -> Optional[Any]:
+        return next((e for e in self.exporters if e.name == name), None)
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        for exporter in self.exporters:
+            try:
+                exporter.export(spans)
+            except Exception as e:
+                TRACE_EXPORT_ERRORS.labels(exporter=exporter.name).inc()
+                logger.warning(f"Trace export ({exporter.name}) failed: {e}")
+
+    def shutdown(self) -> None:
+        for exporter in self.exporters:
+            exporter.shutdown()
+
+
+def _build_exporter(name: str) -> Any:
+    if name == "memory":
+        return MemoryExporter(Config.TRACE_MEMORY_MAX_TRACES)
+    if name == "jsonl":
+        return JsonlExporter(Config.TRACE_JSONL_PATH)
+    if name == "otlp":
+        return OtlpExporter(Config.TRACE_OTLP_ENDPOINT, Config.TRACE_SERVICE_NAME)
+    raise ValueError(f"Unknown trace exporter: {name}")
+
+
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Tracer:
+    """Get or create the global tracer from Config.TRACE_EXPORTERS."""
+    global _tracer
+    if _tracer is None:
+        names = [n.strip() for n in Config.TRACE_EXPORTERS.split(",") if n.strip()]
+        _tracer = Tracer([_build_exporter(name) for name in names])
+    return _tracer
+
+
+def set_tracer(tracer: Optional[Tracer]) -> None:
+    """Replace the global tracer (None rebuilds it from config on next use)."""
+    global _tracer
+    _tracer = tracer
+
+
+def tracing_enabled() -> bool:
+    return get_tracer().enabled
+
+
+def waterfall(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Spans of one trace in depth-first order with timings relative to the root.
+
+    Each row has the span's `depth`, `offset_ms` from the start of the
+    trace and `duration_ms`, plus its name, status and attributes.
+    """
+    if not spans:
+        return []
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    ids = {s["span_id"] for s in spans}
+    for s in sorted(spans, key=lambda s: s["start_ns"]):
+        # Spans whose parent was dropped hang off the root
+        parent = s["parent_id"] if s["parent_id"] in ids else None
+        children.setdefault(parent, []).append(s)
+    origin = min(s["start_ns"] for s in spans)
+    rows: List[Dict[str, Any]] = []
+
+    def visit(parent: Optional[str], depth: int) -> None:
+        for s in children.get(parent, []):
+            rows.append({
+                "name": s["name"],
+                "span_id": s["span_id"],
+                "depth": depth,
+                "offset_ms": round((s["start_ns"] - origin) / 1e6, 1),
+                "duration_ms": round((s["end_ns"] - s["start_ns"]) / 1e6, 1),
+                "status": s["status"],
+                "attributes": s["attributes"],
+            })
+            visit(s["span_id"], depth + 1)
+
+    visit(None, 0)
+    return rows
+
+
+def format_waterfall(rows: List[Dict[str, Any]], width: int = 50) -> str:
+    """Render `waterfall` rows as text bars."""
+    if not rows:
+        return ""
+    total = max(r["offset_ms"] + r["duration_ms"] for r in rows) or 1
+    lines = []
+    for r in rows:
+        start = int(r["offset_ms"] / total * width)
+        length = max(1, int(r["duration_ms"] / total * width))
+        bar = " " * start + "█" * min(length, width - start)
+        label = "  " * r["depth"] + r["name"]
+        mark = "" if r["status"] == STATUS_OK else f"  [{r['status']}]"
+        lines.append(f"{label:32.32} {bar:{width}} {r['duration_ms']:>9.1f} ms{mark}")
+    return "\n".join(lines)
+
+
+def _collector_handler(exporter: JsonlExporter) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:
+            if self.path != "/v1/traces":
+                self.send_error(404)
+                return
+            try:
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                spans = from_otlp(json.loads(body))
+            except (ValueError, KeyError) as e:
+                self.send_error(400, str(e))
+                return
+            if spans:
+                exporter.export(spans)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return Handler
+
+
+def _show(path: str, trace_id: str) -> None:
+    with open(path, encoding="utf-8") as f:
+        spans = [s for s in map(json.loads, f) if s["trace_id"] == trace_id]
+    if not spans:
+        raise SystemExit(f"No spans for trace {trace_id} in {path}")
+    print(format_waterfall(waterfall(spans)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Inspect traces or run a local OTLP collector stand-in.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    show = commands.add_parser("show", help="print one trace from a JSONL file as a waterfall")
+    show.add_argument("path")
+    show.add_argument("trace_id")
+    collect = commands.add_parser("collect", help="accept OTLP/HTTP JSON on /v1/traces and append it to a JSONL file")
+    collect.add_argument("--port", type=int, default=4318)
+    collect.add_argument("--out", default=Config.TRACE_JSONL_PATH)
+    args = parser.parse_args()
+
+    if args.command == "show":
+        _show(args.path, args.trace_id)
+        return
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), _collector_handler(JsonlExporter(args.out)))
+    print(f"Collecting OTLP traces on http://127.0.0.1:{args.port}/v1/traces into {args.out}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+LLM token accounting per research session and pipeline role.
+
+GeminiClient reports the usage metadata of every call to `record_usage`,
+which updates the Prometheus metrics and, when a session is active, that
+session's `TokenUsage`. The session and the current role are carried in
+context variables, which the stage executor (core.pipeline) sets for each
+stage's task from the pipeline context's `usage` and the stage's role.
+
+A session may have a token budget. Once it runs low the orchestrator
+degrades instead of failing: prompt context is trimmed with `fit` and
+optional work such as chart generation is skipped.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from .context import truncate_to_tokens
+from .metrics import LLM_CALL_DURATION, LLM_PROMPT_TOKENS, LLM_RESPONSE_TOKENS, LLM_TOKENS
+
+# Trimmed context never goes below this many estimated tokens
+MIN_CONTEXT_TOKENS = 500
+
+_session: ContextVar[Optional["TokenUsage"]] = ContextVar("llm_session", default=None)
+_role: ContextVar[str] = ContextVar("llm_role", default="other")
+
+
+class TokenUsage:
+    """Token totals for one research session, overall and per role."""
+
+    def __init__(self, budget: int = 0):
+        """
+        Args:
+            budget: Total tokens the session may use (0 = unlimited)
+        """
+        self.budget = budget
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+        self.calls = 0
+        self.by_role: Dict[str, Dict[str, int]] = {}
+        # Degradations applied because of the budget, in order
+        self.degraded: list = []
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.response_tokens
+
+    @property
+    def remaining(self) -> Optional[int]:
+        """Tokens left in the budget, or None without one."""
+        if not self.budget:
+            return None
+        return max(0, self.budget - self.total_tokens)
+
+    @property
+    def exhausted(self) -> bool:
+        return self.remaining == 0
+
+    def add(self, role: str, prompt_tokens: int, response_tokens: int) -> None:
+        self.prompt_tokens += prompt_tokens
+        self.response_tokens += response_tokens
+        self.calls += 1
+        totals = self.by_role.setdefault(role, {"prompt_tokens": 0, "response_tokens": 0, "calls": 0})
+        totals["prompt_tokens"] += prompt_tokens
+        totals["response_tokens"] += response_tokens
+        totals["calls"] += 1
+
+    def fit(self, text: str, share: float = 0.5) -> str:
+        """
+        Trim `text` so its estimated size stays within `share` of the
+        remaining budget (but not below MIN_CONTEXT_TOKENS), cutting at a
+        line or sentence boundary like the prompt packer (core.context).
+        Returns it unchanged without a budget or when it already fits.
+        """
+        remaining = self.remaining
+        if remaining is None:
+            return text
+        return truncate_to_tokens(text, max(MIN_CONTEXT_TOKENS, int(remaining * share)))
+
+    def to_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {
+            "prompt_tokens": self.prompt_tokens,
+            "response_tokens": self.response_tokens,
+            "total_tokens": self.total_tokens,
+            "calls": self.calls,
+            "by_role": self.by_role,
+        }
+        if self.budget:
+            data["budget"] = self.budget
+            data["degraded"] = self.degraded
+        return data
+
+
+@contextmanager
+def track_session(usage: Optional[TokenUsage]) -> Iterator[Optional[TokenUsage]]:
+    """Attribute LLM calls made in this context (and tasks it starts) to `usage`."""
+    token = _session.set(usage)
+    try:
+        yield usage
+    finally:
+        _session.reset(token)
+
+
+@contextmanager
+def llm_role(role: str) -> Iterator[None]:
+    """Label LLM calls made in this context with a pipeline role."""
+    token = _role.set(role)
+    try:
+        yield
+    finally:
+        _role.reset(token)
+
+
+def _count(value: Any) -> int:
+    return value if isinstance(value, int) else 0
+
+
+def record_usage(model: str, usage_metadata: Any, duration: Optional[float] = None) -> Tuple[int, int]:
+    """
+    Record one call's duration and usage metadata against the current role
+    and session. Returns the (prompt, response) token counts recorded.
+    """
+    role = _role.get()
+    if duration is not None:
+        LLM_CALL_DURATION.labels(model=model, role=role).observe(duration)
+    if usage_metadata is None:
+        return 0, 0
+    prompt_tokens = _count(getattr(usage_metadata, "prompt_token_count", None))
+    response_tokens = _count(getattr(usage_metadata, "candidates_token_count", None))
+    if not prompt_tokens and not response_tokens:
+        return 0, 0
+    LLM_TOKENS.labels(model=model, role=role, kind="prompt").inc(prompt_tokens)
+    LLM_TOKENS.labels(model=model, role=role, kind="response").inc(response_tokens)
+    LLM_PROMPT_TOKENS.labels(model=model, role=role).observe(prompt_tokens)
+    LLM_RESPONSE_TOKENS.labels(model=model, role=role).observe(response_tokens)
+    session = _session.get()
+    if session is not None:
+        session.add(role, prompt_tokens, response_tokens)
+    return prompt_tokens, response_tokens
+
@@ -1,50 +1,260 @@
 """
 Direct LLM client for Google Gemini API.
-Provides simple, synchronous interface to Gemini without agent complexity.
+Provides simple synchronous and asyncio interfaces to Gemini without agent complexity.
 """
 
+import asyncio
+import hashlib
+import json
+import time
 from google import genai
+from google.genai import types
 from config import Config
-from typing import Optional
+from core.cache import MemoryCache, SQLiteCache
+from core.metrics import LLM_CACHE_EVENTS
+from core.tracing import span
+from core.usage import record_usage
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+
+def create_sdk_client(base_url: Optional[str] = None) -> genai.Client:
+    """
+    Build the Gemini SDK client.
+
+    `base_url` (default Config.GEMINI_BASE_URL) points the SDK at another
+    endpoint speaking the Gemini REST API, such as the local stand-in in
+    benchmarks.standin; empty uses Google's endpoint.
+    """
+    base_url = base_url if base_url is not None else Config.GEMINI_BASE_URL
+    http_options = types.HttpOptions(base_url=base_url) if base_url else None
+    return genai.Client(api_key=Config.GOOGLE_API_KEY, http_options=http_options)
+
 
 # Configure Gemini API
-client_sdk = genai.Client(api_key=Config.GOOGLE_API_KEY)
+client_sdk = create_sdk_client()
+
+
+class LLMResponseCache:
+    """
+    Content-addressed cache of LLM responses.
+
+    Keys hash the model, prompt, temperature and generation config, so a
+    response is only reused for an identical request. Entries live in a
+    bounded in-memory LRU, with an optional SQLite tier that survives
+    restarts and is shared between workers.
+    """
+
+    def __init__(self, memory: MemoryCache, disk: Optional[SQLiteCache] = None, ttl: float = 86400):
+        self.memory = memory
+        self.disk = disk
+        self.ttl = ttl
+
+    @staticmethod
+    def make_key(model: str, prompt: str, temperature: float, config: Dict[str, Any]) -> str:
+        payload = json.dumps(
+            {"model": model, "prompt": prompt, "temperature": temperature, "config": config},
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with span("cache.lookup", cache="llm") as lookup:
+            value = self.memory.get(key)
+            if value is not None:
+                LLM_CACHE_EVENTS.labels(event="memory_hit").inc()
+                lookup.set(hit=True, tier="memory")
+                return value
+            if self.disk is not None:
+                value = self.disk.get(key)
+                if value is not None:
+                    LLM_CACHE_EVENTS.labels(event="disk_hit").inc()
+                    lookup.set(hit=True, tier="disk")
+                    self._set_memory(key, value)
+                    return value
+            LLM_CACHE_EVENTS.labels(event="miss").inc()
+            lookup.set(hit=False)
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        self._set_memory(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value, self.ttl)
+
+    def _set_memory(self, key: str, value: str) -> None:
+        evicted = self.memory.set(key, value, self.ttl)
+        if evicted:
+            LLM_CACHE_EVENTS.labels(event="eviction").inc(evicted)
+
+    async def aget(self, key: str) -> Optional[str]:
+        """Async `get`; the disk tier is read in a worker thread."""
+        if self.disk is None:
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: str) -> None:
+        """Async `set`; the disk tier is written in a worker thread."""
+        if self.disk is None:
+            self.set(key, value)
+        else:
+            await asyncio.to_thread(self.set, key, value)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
 
 
 class GeminiClient:
     """Simple client for Gemini API calls."""
 
-    def __init__(self, model_name: Optional[str] = None):
+    def __init__(self, model_name: Optional[str] = None, cache: Optional[LLMResponseCache] = None):
         """
         Initialize Gemini client.
 
         Args:
             model_name: Model to use (defaults to Config.GEMINI_MODEL)
+            cache: Response cache (None disables caching)
         """
         self.model_name = model_name or Config.GEMINI_MODEL
+        self.cache = cache
+
+    def _cache_key(self, prompt: str, config: Dict[str, Any], use_cache: bool) -> Optional[str]:
+        """Cache key for a call, or None when the call should bypass the cache."""
+        if not use_cache or self.cache is None:
+            return None
+        return LLMResponseCache.make_key(self.model_name, prompt, config["temperature"], config)
 
-    def generate(self, prompt: str, temperature: float = 0.7) -> str:
+    def _span(self, name: str, prompt: str, temperature: float):
+        return span(name, model=self.model_name, prompt_chars=len(prompt), temperature=temperature)
+
+    def generate(self, prompt: str, temperature: float = 0.7, cache: bool = True) -> str:
         """Generates text from a prompt."""
-        try:
-            response = client_sdk.models.generate_content(
-                model=self.model_name,
-                contents=prompt,
-                config={
-                    'temperature': temperature,
-                }
-            )
+        config = {'temperature': temperature}
+        with self._span("llm.generate", prompt, temperature) as call:
+            key = self._cache_key(prompt, config, cache)
+            if key is not None:
+                cached = self.cache.get(key)
+                call.set(cache_hit=cached is not None)
+                if cached is not None:
+                    return cached
+
+            started = time.perf_counter()
+            try:
+                response = client_sdk.models.generate_content(
+                    model=self.model_name,
+                    contents=prompt,
+                    config=config
+                )
+            except Exception as e:
+                raise Exception(f"Gemini API error: {str(e)}")
+            _set_tokens(call, record_usage(self.model_name, response.usage_metadata, time.perf_counter() - started))
+
+            if key is not None and response.text:
+                self.cache.set(key, response.text)
             return response.text
-        except Exception as e:
-            raise Exception(f"Gemini API error: {str(e)}")
+
+    async def agenerate(self, prompt: str, temperature: float = 0.7, cache: bool = True) -> str:
+        """
+        Generates text from a prompt without blocking the event loop.
+
+        Uses the SDK's native async client, so concurrent research sessions
+        share one event loop instead of serializing on each Gemini round-trip.
+        Pass `cache=False` for creative calls that should not reuse a
+        previous response.
+        """
+        config = {'temperature': temperature}
+        with self._span("llm.generate", prompt, temperature) as call:
+            key = self._cache_key(prompt, config, cache)
+            if key is not None:
+                cached = await self.cache.aget(key)
+                call.set(cache_hit=cached is not None)
+                if cached is not None:
+                    return cached
+
+            started = time.perf_counter()
+            try:
+                response = await client_sdk.aio.models.generate_content(
+                    model=self.model_name,
+                    contents=prompt,
+                    config=config
+                )
+            except Exception as e:
+                raise Exception(f"Gemini API error: {str(e)}")
+            _set_tokens(call, record_usage(self.model_name, response.usage_metadata, time.perf_counter() - started))
+
+            if key is not None and response.text:
+                await self.cache.aset(key, response.text)
+            return response.text
+
+    async def astream(self, prompt: str, temperature: float = 0.7, cache: bool = True) -> AsyncIterator[str]:
+        """
+        Streams generated text as it arrives.
+
+        Yields non-empty text chunks in order; joining them gives the same
+        result as `agenerate`. A cached response is yielded as one chunk.
+        """
+        config = {'temperature': temperature}
+        with self._span("llm.stream", prompt, temperature) as call:
+            key = self._cache_key(prompt, config, cache)
+            if key is not None:
+                cached = await self.cache.aget(key)
+                call.set(cache_hit=cached is not None)
+                if cached is not None:
+                    yield cached
+                    return
+
+            chunks = []
+            # Usage metadata is cumulative; the last chunk carrying it has the totals
+            usage_metadata = None
+            started = time.perf_counter()
+            try:
+                stream = await client_sdk.aio.models.generate_content_stream(
+                    model=self.model_name,
+                    contents=prompt,
+                    config=config
+                )
+                async for chunk in stream:
+                    usage_metadata = chunk.usage_metadata or usage_metadata
+                    if chunk.text:
+                        if not chunks:
+                            call.set(first_chunk_ms=round((time.perf_counter() - started) * 1000, 1))
+                        chunks.append(chunk.text)
+                        yield chunk.text
+            except Exception as e:
+                raise Exception(f"Gemini API error: {str(e)}")
+            _set_tokens(call, record_usage(self.model_name, usage_metadata, time.perf_counter() - started))
+
+            if key is not None and chunks:
+                await self.cache.aset(key, "".join(chunks))
+
+
+def _set_tokens(call: Any, tokens: Tuple[int, int]) -> None:
+    """Record the token counts `record_usage` returned on an LLM call's span."""
+    call.set(prompt_tokens=tokens[0], response_tokens=tokens[1])
 
 
 # Global client instance
 _client: Optional[GeminiClient] = None
 
 
+def _build_cache() -> Optional[LLMResponseCache]:
+    """Create the response cache from configuration."""
+    if not Config.LLM_CACHE_ENABLED:
+        return None
+    disk = None
+    if Config.LLM_CACHE_PATH:
+        disk = SQLiteCache(Config.LLM_CACHE_PATH, namespace="llm",
+                           max_entries=Config.LLM_CACHE_DISK_MAX_ENTRIES)
+    return LLMResponseCache(
+        MemoryCache(max_entries=Config.LLM_CACHE_MAX_ENTRIES),
+        disk=disk,
+        ttl=Config.LLM_CACHE_TTL,
+    )
+
+
 def get_gemini_client() -> GeminiClient:
     """Get or create global Gemini client instance."""
     global _client
     if _client is None:
-        _client = GeminiClient()
+        _client = GeminiClient(cache=_build_cache())
     return _client
@@ -1,13 +1,63 @@
-import uvicorn
 import logging
+import os
+import tempfile
+
+import uvicorn
 from config import Config
-from app import app
 
+logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("market_analyst_agent")
 
+# Time uvicorn allows beyond the drain's grace period for streams to send
+# their final frame before it cancels them
+DRAIN_FLUSH_SECONDS = 5
+
+
+def prepare_workers(workers: int) -> str:
+    """
+    Set up the state `workers` worker processes share, through the
+    environment they inherit. Returns the state directory.
+
+    - PROMETHEUS_MULTIPROC_DIR, cleared of a previous run's files, so
+      /metrics on any worker reports the whole server
+    - RATE_LIMIT_DB_PATH and SEARCH_CACHE_PATH default to SQLite files in
+      the state directory, so workers draw on one provider quota and reuse
+      each other's search results
+    - WORKERS, so each worker enforces its share of the admission limits
+    """
+    state_dir = Config.WORKER_STATE_DIR or tempfile.mkdtemp(prefix="market-analyst-")
+    metrics_dir = os.path.join(state_dir, "metrics")
+    os.makedirs(metrics_dir, exist_ok=True)
+    for name in os.listdir(metrics_dir):
+        if name.endswith(".db"):
+            os.remove(os.path.join(metrics_dir, name))
+
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+    os.environ["WORKERS"] = str(workers)
+    for key, filename in (("RATE_LIMIT_DB_PATH", "ratelimit.db"), ("SEARCH_CACHE_PATH", "search_cache.db")):
+        if not os.environ.get(key):
+            os.environ[key] = os.path.join(state_dir, filename)
+    return state_dir
+
+
 if __name__ == "__main__":
     logger.info("🚀 Starting Market Analyst Agent Server")
     logger.info(f"Environment: {Config.ENVIRONMENT}")
     logger.info(f"Port: {Config.PORT}")
-    
-    uvicorn.run("app:app", host="0.0.0.0", port=Config.PORT, reload=Config.is_development())
+
+    reload = Config.is_development()
+    workers = 1 if reload else Config.worker_count()
+    if reload and Config.WORKERS != 1:
+        logger.warning("WORKERS is ignored with auto-reload; set ENVIRONMENT=production for multiple workers")
+    if workers > 1:
+        state_dir = prepare_workers(workers)
+        logger.info(f"Workers: {workers} (shared state in {state_dir})")
+
+    uvicorn.run(
+        "app:app",
+        host="0.0.0.0",
+        port=Config.PORT,
+        reload=reload,
+        workers=workers,
+        timeout_graceful_shutdown=Config.SHUTDOWN_GRACE_SECONDS + DRAIN_FLUSH_SECONDS,
+    )
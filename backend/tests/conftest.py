@@ -3,7 +3,7 @@
 import os
 import sys
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -15,6 +15,19 @@ os.environ["ENVIRONMENT"] = "development"
 os.environ["GEMINI_MODEL"] = "gemini-2.0-flash"
 
 
+@pytest.fixture(autouse=True)
+def isolate_caches():
+    """Give each test fresh LLM and search caches."""
+    import llm_client
+    from tools.search_cache import set_search_cache
+
+    llm_client._client = None
+    set_search_cache(None)
+    yield
+    llm_client._client = None
+    set_search_cache(None)
+
+
 @pytest.fixture
 def mock_gemini_client():
     """Mock Gemini client for testing without API calls."""
@@ -22,6 +35,15 @@ def mock_gemini_client():
         mock_response = MagicMock()
         mock_response.text = "Mocked AI response for testing"
         mock_sdk.models.generate_content.return_value = mock_response
+        mock_sdk.aio.models.generate_content = AsyncMock(return_value=mock_response)
+
+        async def mock_stream(*args, **kwargs):
+            for word in mock_response.text.split(" "):
+                chunk = MagicMock()
+                chunk.text = word + " "
+                yield chunk
+
+        mock_sdk.aio.models.generate_content_stream = AsyncMock(side_effect=lambda *a, **kw: mock_stream())
         yield mock_sdk
 
 
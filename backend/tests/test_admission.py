@@ -0,0 +1,227 @@
+"""Tests for research admission control."""
+
+import asyncio
+import json
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+from core import admission, jobs
+from core.admission import (
+    LANE_BATCH, LANE_INTERACTIVE, AdmissionController, AdmissionRejected, admitted_stream,
+)
+from core.jobs import JOB_QUEUED, JobManager
+from core.protocol import PROTOCOL_DELTA, StateStream
+from core.state import AgentState
+
+
+async def frames(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+class TestAdmissionController:
+    """Test cases for slots, queueing and lanes."""
+
+    @pytest.mark.asyncio
+    async def test_queues_beyond_max_in_flight(self):
+        """Test that excess sessions wait in order and move up as slots free."""
+        controller = AdmissionController(max_in_flight=1, queue_size=5)
+        first = controller.enqueue()
+        second = controller.enqueue()
+        third = controller.enqueue()
+
+        assert first.admitted
+        assert (second.position, third.position) == (1, 2)
+
+        first.release()
+        assert second.admitted
+        assert third.position == 1
+
+    @pytest.mark.asyncio
+    async def test_full_queue_is_rejected_with_retry_after(self):
+        """Test that a request that cannot wait raises AdmissionRejected."""
+        controller = AdmissionController(max_in_flight=1, queue_size=1)
+        controller.enqueue()
+        controller.enqueue()
+
+        with pytest.raises(AdmissionRejected) as error:
+            controller.enqueue()
+
+        assert error.value.retry_after >= 1
+        assert controller.queued(LANE_INTERACTIVE) == 1
+
+    @pytest.mark.asyncio
+    async def test_interactive_lane_goes_first(self):
+        """Test that a freed slot goes to an interactive session before earlier batch work."""
+        controller = AdmissionController(max_in_flight=1, queue_size=5, batch_queue_size=5)
+        running = controller.enqueue(LANE_BATCH)
+        batch = controller.enqueue(LANE_BATCH)
+        user = controller.enqueue(LANE_INTERACTIVE)
+
+        assert (user.position, batch.position) == (1, 2)
+        running.release()
+
+        assert user.admitted
+        assert not batch.admitted
+
+    @pytest.mark.asyncio
+    async def test_batch_cannot_take_every_slot(self):
+        """Test that batch work leaves slots free for interactive sessions."""
+        controller = AdmissionController(max_in_flight=3, batch_max_in_flight=2, batch_queue_size=5)
+        batch = [controller.enqueue(LANE_BATCH) for _ in range(3)]
+
+        assert [t.admitted for t in batch] == [True, True, False]
+        assert controller.enqueue(LANE_INTERACTIVE).admitted
+
+    @pytest.mark.asyncio
+    async def test_promote_moves_ticket_to_interactive_lane(self):
+        """Test that a waiting batch ticket can be moved ahead of other batch work."""
+        controller = AdmissionController(max_in_flight=1, batch_queue_size=5)
+        controller.enqueue(LANE_BATCH)
+        other = controller.enqueue(LANE_BATCH)
+        promoted = controller.enqueue(LANE_BATCH)
+
+        controller.promote(promoted, LANE_INTERACTIVE)
+
+        assert (promoted.position, other.position) == (1, 2)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_queue(self):
+        """Test that releasing a waiting ticket frees its place in line."""
+        controller = AdmissionController(max_in_flight=1)
+        running = controller.enqueue()
+        waiting = controller.enqueue()
+        behind = controller.enqueue()
+
+        waiting.release()
+
+        assert behind.position == 1
+        running.release()
+        assert behind.admitted
+
+
+class TestAdmittedStream:
+    """Test cases for queued events ahead of a pipeline stream."""
+
+    @pytest.mark.asyncio
+    async def test_streams_queue_positions_then_pipeline(self):
+        """Test that a waiting client sees its position count down before the frames."""
+        controller = AdmissionController(max_in_flight=1, queue_size=5)
+        ahead = [controller.enqueue(), controller.enqueue()]
+        ticket = controller.enqueue()
+        stream = StateStream(AgentState(), PROTOCOL_DELTA)
+
+        async def release_ahead():
+            for t in ahead:
+                await asyncio.sleep(0.01)
+                t.release()
+
+        releaser = asyncio.create_task(release_ahead())
+        chunks = [c async for c in admitted_stream(ticket, stream, frames(b"pipeline"))]
+        await releaser
+
+        positions = [json.loads(c.decode().split("data: ")[1])["position"] for c in chunks[:-1]]
+        assert positions == [2, 1]
+        assert chunks[-1] == b"pipeline"
+        assert ticket.released
+        assert controller.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_response_releases_ticket_when_body_never_starts(self):
+        """Test that a client gone before the response starts does not keep its slot."""
+        from starlette.requests import ClientDisconnect
+
+        from app import AdmittedResponse
+
+        controller = AdmissionController(max_in_flight=1, queue_size=5)
+        ticket = controller.enqueue()
+        waiting = controller.enqueue()
+        stream = StateStream(AgentState(), PROTOCOL_DELTA)
+        response = AdmittedResponse(ticket, admitted_stream(ticket, stream, frames(b"pipeline")))
+
+        async def receive():
+            await asyncio.sleep(10)
+
+        async def send(message):
+            raise OSError("client went away")
+
+        with pytest.raises(ClientDisconnect):
+            await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+
+        assert ticket.released
+        assert waiting.admitted
+
+
+class TestQueuedJobs:
+    """Test cases for jobs waiting on admission."""
+
+    @pytest.mark.asyncio
+    async def test_job_waits_for_slot(self):
+        """Test that a job beyond the limit is queued and starts once a slot frees."""
+        from tests.test_jobs import collect, make_runner, parse
+
+        controller = AdmissionController(max_in_flight=1, queue_size=5)
+        gate = asyncio.Event()
+        manager = JobManager(runner=make_runner(gate=gate), admission=controller)
+        first = manager.create("EV market")
+        second = manager.create("Solar market")
+        await asyncio.sleep(0.01)
+
+        assert second.status == JOB_QUEUED
+        assert second.to_dict()["queue_position"] == 1
+
+        gate.set()
+        await asyncio.wait_for(asyncio.gather(first.task, second.task), timeout=1)
+
+        events = parse(await collect(second))
+        assert events[0][1:] == ("queued", {"position": 1, "trace_id": second.stream.trace_id})
+        assert events[-1][1] == "complete"
+        assert controller.in_flight == 0
+
+
+class TestAdmissionEndpoints:
+    """Test cases for 429 responses."""
+
+    @pytest.fixture(autouse=True)
+    def saturated(self):
+        from tests.test_jobs import make_runner
+
+        controller = admission._controller = AdmissionController(max_in_flight=1, queue_size=0, batch_queue_size=0)
+        controller.enqueue()
+        jobs._manager = JobManager(runner=make_runner(), admission=controller)
+        yield
+        admission._controller = None
+        jobs._manager = None
+
+    @pytest.mark.parametrize("path, body", [
+        ("/research", {"topic": "EV market"}),
+        ("/research/jobs", {"topic": "EV market"}),
+        ("/research/batch", {"topics": ["EV market"]}),
+    ])
+    def test_full_queue_returns_429(self, path, body):
+        """Test that saturated endpoints reject with Retry-After."""
+        from app import app
+
+        response = TestClient(app).post(path, json=body)
+
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+
+    def test_uncoalesced_research_is_rejected_too(self):
+        """Test that /research without coalescing also goes through admission."""
+        from app import app
+        from config import Config
+
+        with patch.object(Config, "COALESCE_REQUESTS", False):
+            response = TestClient(app).post("/research", json={"topic": "EV market"})
+
+        assert response.status_code == 429
+
+    def test_unknown_priority_returns_400(self):
+        """Test that job priorities are limited to the admission lanes."""
+        from app import app
+
+        response = TestClient(app).post("/research/jobs", json={"topic": "EV market", "priority": "urgent"})
+
+        assert response.status_code == 400
@@ -13,7 +13,7 @@ class TestHealthEndpoint:
         # Import after environment is set
         from app import app
 
-        with patch("app.get_gemini_client") as mock_client:
+        with patch("llm_client.get_gemini_client") as mock_client:
             mock_client.return_value = MagicMock()
 
             client = TestClient(app)
@@ -28,7 +28,7 @@ class TestHealthEndpoint:
         """Test health/ready endpoint."""
         from app import app
 
-        with patch("app.get_gemini_client") as mock_client:
+        with patch("llm_client.get_gemini_client") as mock_client:
             mock_client.return_value = MagicMock()
 
             client = TestClient(app)
@@ -76,6 +76,16 @@ class TestResearchEndpoint:
 
         assert response.status_code == 400
 
+    def test_research_unknown_protocol_returns_400(self):
+        """Test that an unsupported SSE protocol version is rejected."""
+        from app import app
+
+        client = TestClient(app)
+        response = client.post("/research", json={"topic": "test topic", "protocol": 9})
+
+        assert response.status_code == 400
+        assert "Unsupported protocol" in response.json()["detail"]
+
     def test_research_valid_topic_returns_stream(self):
         """Test that valid topic returns SSE stream."""
         from app import app
@@ -0,0 +1,139 @@
+"""Tests for batch research."""
+
+import asyncio
+import json
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+from core.batch import SharedSearch, run_batch
+
+
+async def collect(lines):
+    return [line async for line in lines]
+
+
+def fake_topic(delays, in_flight=None):
+    """Stand-in for _research_topic that sleeps a per-topic delay."""
+    in_flight = in_flight if in_flight is not None else []
+    current = [0]
+
+    async def research(topic, research_depth, search):
+        current[0] += 1
+        in_flight.append(current[0])
+        await asyncio.sleep(delays.get(topic, 0.01))
+        current[0] -= 1
+        return {"type": "result", "topic": topic, "status": "success"}
+    return research
+
+
+class TestSharedSearch:
+    """Test cases for cross-topic search deduplication."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_queries_search_once(self):
+        """Test that normalized-equal queries share one provider call."""
+        calls = []
+
+        async def search(query, research_depth):
+            calls.append(query)
+            await asyncio.sleep(0.05)
+            return [{"title": query}]
+
+        shared = SharedSearch(search)
+        results = await asyncio.gather(
+            shared("EV Market size", 1), shared("ev market size?", 1), shared("EV market size", 2)
+        )
+
+        assert calls == ["EV Market size", "EV market size"]
+        assert results[0] is results[1]
+        assert (shared.requested, shared.executed) == (3, 2)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_search(self):
+        """Test that one topic giving up leaves the shared search running."""
+        async def search(query, research_depth):
+            await asyncio.sleep(0.05)
+            return [{"title": query}]
+
+        shared = SharedSearch(search)
+        first = asyncio.create_task(shared("q", 1))
+        await asyncio.sleep(0.01)
+        first.cancel()
+
+        assert await shared("q", 1) == [{"title": "q"}]
+
+
+class TestRunBatch:
+    """Test cases for run_batch scheduling and results."""
+
+    @pytest.mark.asyncio
+    async def test_topics_share_searches(self, mock_gemini_client):
+        """Test that topics generating the same queries search them once."""
+        calls = []
+
+        async def search(query, research_depth):
+            calls.append(query)
+            return [{"title": query, "url": "https://example.com", "description": "d"}]
+
+        with patch("core.orchestrator._run_search", side_effect=search):
+            lines = await collect(run_batch(["EV market", "Solar market", "Wind market"]))
+
+        results, summary = lines[:-1], lines[-1]
+        assert sorted(r["topic"] for r in results) == ["EV market", "Solar market", "Wind market"]
+        assert all(r["status"] == "success" and r["final_report"] for r in results)
+        assert len(calls) == 1
+        assert summary["searches_requested"] == 3
+        assert summary["searches_executed"] == 1
+        assert summary["succeeded"] == 3
+
+    @pytest.mark.asyncio
+    async def test_concurrency_budget_is_respected(self):
+        """Test that no more than `concurrency` topics run at once."""
+        in_flight = []
+        topics = [f"topic {i}" for i in range(8)]
+
+        with patch("core.batch._research_topic", side_effect=fake_topic({}, in_flight)):
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            await collect(run_batch(topics, concurrency=3))
+            elapsed = loop.time() - start
+
+        assert max(in_flight) == 3
+        assert elapsed < 0.08
+
+    @pytest.mark.asyncio
+    async def test_results_stream_in_completion_order(self):
+        """Test that a fast topic is reported before a slow one."""
+        delays = {"slow": 0.1, "fast": 0.01}
+
+        with patch("core.batch._research_topic", side_effect=fake_topic(delays)):
+            lines = await collect(run_batch(["slow", "fast"], concurrency=2))
+
+        assert [line.get("topic") for line in lines] == ["fast", "slow", None]
+        assert lines[-1]["type"] == "summary"
+
+
+class TestBatchEndpoint:
+    """Test cases for POST /research/batch."""
+
+    def test_streams_ndjson(self):
+        """Test that the endpoint returns one JSON line per topic plus a summary."""
+        from app import app
+
+        with patch("core.batch._research_topic", side_effect=fake_topic({})):
+            response = TestClient(app).post("/research/batch", json={"topics": ["a", "b"], "concurrency": 2})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["type"] for line in lines] == ["result", "result", "summary"]
+
+    @pytest.mark.parametrize("topics", [[], ["ok", "  "]])
+    def test_invalid_topics_return_400(self, topics):
+        """Test that empty batches and blank topics are rejected."""
+        from app import app
+
+        response = TestClient(app).post("/research/batch", json={"topics": topics})
+
+        assert response.status_code == 400
@@ -29,6 +29,15 @@ class TestConfig:
         # Security: should not allow all methods
         assert cors_config["allow_methods"] != ["*"]
 
+    def test_config_cors_exposes_stream_headers(self):
+        """Test that the frontend can read the retry and stream headers cross-origin."""
+        from config import Config
+
+        exposed = Config.get_cors_config()["expose_headers"]
+
+        for header in ("Retry-After", "X-Trace-Id", "X-Job-Id", "X-SSE-Protocol"):
+            assert header in exposed
+
     def test_config_allowed_methods_restricted(self):
         """Test that only safe HTTP methods are allowed."""
         from config import Config
@@ -0,0 +1,117 @@
+"""Tests for token-aware prompt context packing."""
+
+from core.context import (
+    TRUNCATION_MARK,
+    dedupe_sentences,
+    estimate_tokens,
+    pack_documents,
+    pack_sources,
+    pack_text,
+    truncate_to_tokens,
+)
+
+
+def result(url, title="Title", description="A description of the result."):
+    return {"url": url, "title": title, "description": description}
+
+
+class TestEstimateTokens:
+    """Test cases for local token estimation."""
+
+    def test_counts_words_and_punctuation(self):
+        """Test that short words cost one token and punctuation one each."""
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("EV car, 2024.") == 5
+
+    def test_long_words_cost_more(self):
+        """Test that a word costs about one token per four characters."""
+        assert estimate_tokens("electrification") == 4
+
+
+class TestDedupeSentences:
+    """Test cases for dropping repeated sentences."""
+
+    def test_drops_repeats_and_keeps_lines(self):
+        """Test that repeated sentences go while headings and lines stay."""
+        text = ("## Market\nThe market grew 30% in 2024 to $100B. Demand is rising fast.\n"
+                "## Outlook\nThe market grew 30% in 2024 to $100B. Prices keep falling this year.")
+        deduped = dedupe_sentences(text)
+        assert deduped.count("The market grew 30%") == 1
+        assert deduped.splitlines()[0] == "## Market"
+        assert "## Outlook" in deduped
+        assert "Prices keep falling this year." in deduped
+
+    def test_shared_seen_spans_calls(self):
+        """Test that a shared set drops sentences repeated between items."""
+        seen = set()
+        dedupe_sentences("Lithium prices fell sharply during 2024.", seen)
+        assert dedupe_sentences("lithium prices fell sharply during 2024!", seen) == ""
+
+    def test_short_sentences_kept(self):
+        """Test that short labels are never treated as repeats."""
+        assert dedupe_sentences("Yes.\nYes.") == "Yes.\nYes."
+
+
+class TestTruncate:
+    """Test cases for cutting text to a token budget."""
+
+    def test_fits_unchanged(self):
+        """Test that text within budget (or with no budget) is unchanged."""
+        assert truncate_to_tokens("short text", 100) == "short text"
+        assert truncate_to_tokens("short text " * 100, 0) == "short text " * 100
+
+    def test_cuts_within_budget_at_boundary(self):
+        """Test that long text is cut at a sentence end and marked."""
+        text = " ".join(f"Sentence number {i} talks about batteries." for i in range(100))
+        cut = truncate_to_tokens(text, 60)
+        assert estimate_tokens(cut) <= 60
+        assert cut.endswith("." + TRUNCATION_MARK)
+
+    def test_pack_text_dedupes_then_cuts(self):
+        """Test that pack_text removes repetition before truncating."""
+        text = "The battery market is growing quickly. " * 50
+        assert pack_text(text, 100) == "The battery market is growing quickly."
+
+
+class TestPackSources:
+    """Test cases for packing search results."""
+
+    def test_respects_budget(self):
+        """Test that packed sources stay within the token budget."""
+        long = "Battery makers expanded capacity across Europe and North America. " * 20
+        results = [result(f"https://s.com/{i}", description=f"{i}: {long}") for i in range(15)]
+        packed = pack_sources(results, 300)
+        assert 0 < estimate_tokens(packed) <= 300 + 5
+
+    def test_skips_syndicated_copies_and_renumbers(self):
+        """Test that a result repeating an earlier one is skipped and numbering stays contiguous."""
+        story = "CATL holds a 37 percent share of the global EV battery market."
+        packed = pack_sources([
+            result("https://a.com", description=story),
+            result("https://b.com", description=story),
+            result("https://c.com", description="Sodium-ion cells entered mass production this year."),
+        ], 0)
+        assert "https://b.com" not in packed
+        assert "Source 2: Title\nURL: https://c.com" in packed
+        assert "Source 3" not in packed
+
+    def test_caps_item_count(self):
+        """Test that max_items limits how many results are packed."""
+        results = [result(f"https://x.com/{i}", description=f"Unique finding number {i} about cells.")
+                   for i in range(10)]
+        packed = pack_sources(results, 0, max_items=3)
+        assert packed.count("Source ") == 3
+
+
+class TestPackDocuments:
+    """Test cases for packing deep-read excerpts."""
+
+    def test_shares_seen_with_sources(self):
+        """Test that document text already given as a source description is dropped."""
+        seen = set()
+        story = "Solid-state batteries remain two to three years from volume production."
+        pack_sources([result("https://a.com", description=story)], 0, seen)
+        packed = pack_documents([("https://a.com", f"{story}\nPilot lines opened in Korea and Japan.")], 0, seen)
+        assert story not in packed
+        assert packed.startswith("Document 1 (https://a.com):\n")
+        assert "Pilot lines opened" in packed
@@ -0,0 +1,91 @@
+"""Tests for HTML content extraction."""
+
+import glob
+import os
+import subprocess
+import sys
+import pytest
+
+from config import Config
+from tools import extract
+from tools.extract import EXTRACTORS, aextract_main_text, extract_main_text, shutdown_extract_pool
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "..", "benchmarks", "corpus", "*.html")))
+
+PAGE = b"""<html><head><title>T</title><style>.x{}</style></head><body>
+<header>Site header</header><nav>Menu</nav>
+<div class="sidebar">Sidebar text</div>
+<article><h1>Battery market</h1><!-- tracking -->
+<p>Demand for grid storage grew <b>40%</b> last year.</p>
+<script>var x = 1;</script></article>
+<footer>Footer</footer></body></html>"""
+
+
+class TestExtractors:
+    """Test cases for the lxml and BeautifulSoup extractors."""
+
+    @pytest.mark.parametrize("name", ["lxml", "soup"])
+    def test_extracts_main_content_only(self, name):
+        """Test that boilerplate, scripts and comments are dropped."""
+        text = EXTRACTORS[name].extract(PAGE)
+
+        assert text == "Battery market\nDemand for grid storage grew\n40%\nlast year."
+
+    @pytest.mark.parametrize("path", CORPUS, ids=os.path.basename)
+    def test_extractors_agree_on_corpus(self, path):
+        """Test that the fast path matches the BeautifulSoup output."""
+        with open(path, "rb") as f:
+            content = f.read()
+
+        assert EXTRACTORS["lxml"].extract(content) == EXTRACTORS["soup"].extract(content)
+
+    def test_falls_back_to_soup_on_failure(self, monkeypatch):
+        """Test that an lxml failure falls back to BeautifulSoup."""
+        def broken(content):
+            raise RuntimeError("parser crashed")
+
+        monkeypatch.setattr(EXTRACTORS["lxml"], "extract", broken)
+
+        assert extract_main_text(PAGE, "lxml").startswith("Battery market")
+
+    def test_unknown_extractor_raises_error(self):
+        """Test that an unknown extractor name is rejected."""
+        with pytest.raises(ValueError, match="Unknown HTML extractor"):
+            extract_main_text(PAGE, "regex")
+
+    @pytest.mark.asyncio
+    async def test_large_page_uses_process_pool(self, monkeypatch):
+        """Test that pages over the threshold are parsed in worker processes."""
+        monkeypatch.setattr(Config, "EXTRACT_PROCESS_MIN_BYTES", 1024)
+        monkeypatch.setattr(Config, "EXTRACT_WORKERS", 1)
+        large = PAGE.replace(b"</article>", b"<p>filler text</p>" * 200 + b"</article>")
+        try:
+            assert await aextract_main_text(large) == extract_main_text(large)
+            assert extract._pool is not None
+            assert await aextract_main_text(PAGE) == extract_main_text(PAGE)
+        finally:
+            shutdown_extract_pool()
+
+    def test_pool_starts_lazily_without_fork(self):
+        """Test that no workers exist before the first large page and none are forked."""
+        assert extract._pool is None
+        try:
+            assert extract._get_pool()._mp_context.get_start_method() != "fork"
+        finally:
+            shutdown_extract_pool()
+
+    @pytest.mark.parametrize("workers, cpus, size", [(1, 8, 4), (4, 8, 1), (3, 4, 2), (1, None, 1)])
+    def test_auto_pool_size_is_shared_between_server_workers(self, monkeypatch, workers, cpus, size):
+        """Test that server workers split the automatic extraction pool size."""
+        monkeypatch.setattr(Config, "EXTRACT_WORKERS", 0)
+        monkeypatch.setattr(Config, "WORKERS", workers)
+        monkeypatch.setattr(os, "cpu_count", lambda: cpus)
+        assert extract._pool_size() == size
+
+    def test_worker_imports_skip_metrics(self, tmp_path):
+        """Test that a pool worker's imports don't write multiprocess metric files."""
+        script = "import sys, tools.extract; assert 'core.metrics' not in sys.modules"
+        env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+        subprocess.run([sys.executable, "-c", script], cwd=BACKEND, env=env, check=True, capture_output=True)
+        assert list(tmp_path.iterdir()) == []
@@ -1,6 +1,10 @@
 """Tests for document fetching module."""
 
+import threading
+import time
 import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 from tools.fetch import fetch_document, FetchError
 
 
@@ -36,3 +40,126 @@ class TestFetchDocument:
         # These will fail on network, but should pass URL validation
         with pytest.raises(FetchError):  # Network error, not ValueError
             fetch_document("https://nonexistent-domain-12345.com")
+
+
+class TestBodyBuffer:
+    """Test cases for the capped body buffer."""
+
+    def test_collects_chunks(self):
+        from tools.fetch import BodyBuffer
+
+        body = BodyBuffer(1024, expected=4)
+        for chunk in (b"ab", b"cd", b"ef" * 100):
+            body.write(chunk)
+
+        assert body.getvalue() == b"abcd" + b"ef" * 100
+        assert len(body) == 204
+
+    def test_aborts_at_cap(self):
+        from tools.fetch import BodyBuffer
+
+        body = BodyBuffer(10)
+        body.write(b"x" * 10)
+        with pytest.raises(FetchError, match="exceeded size limit"):
+            body.write(b"y")
+
+
+PAGE = (
+    "<html><body><nav>menu</nav><article><h1>Market update</h1>"
+    "<p>The solar market grew 25% year over year, driven by falling module prices.</p>"
+    "</article></body></html>"
+)
+
+
+class DelayHandler(BaseHTTPRequestHandler):
+    """Serves PAGE after the delay (ms) in the path, e.g. /200; /big sends 2MB."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        if self.path == "/big":
+            body = b"<html>" + b"x" * (2 * 1024 * 1024)
+        else:
+            time.sleep(int(self.path.strip("/")) / 1000)
+            body = PAGE.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        if self.path != "/big":
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class PageServer(ThreadingHTTPServer):
+    # The default backlog of 5 makes bursts of connects retry after 1s
+    request_queue_size = 64
+
+
+@pytest.fixture
+def page_server():
+    server = PageServer(("", 0), DelayHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.server_address[1]
+    server.shutdown()
+
+
+class TestFetchMany:
+    """Test cases for concurrent async fetching."""
+
+    @pytest.mark.asyncio
+    async def test_batch_costs_about_the_slowest(self, page_server):
+        """Test that 20 fetches from different hosts overlap."""
+        from tools.fetch import fetch_many
+
+        urls = [f"http://127.0.0.{i}:{page_server}/{100 + 10 * i}" for i in range(1, 21)]
+        start = time.perf_counter()
+        results = await fetch_many(urls, max_concurrency=20)
+        elapsed = time.perf_counter() - start
+
+        assert all(r["success"] for r in results.values())
+        assert "solar market grew 25%" in results[urls[0]]["content"]
+        assert elapsed < 1.0  # slowest is 0.3s; sequential would be ~4s
+
+    @pytest.mark.asyncio
+    async def test_deadline_returns_finished_documents(self, page_server):
+        """Test that documents not back by the deadline are skipped."""
+        from tools.fetch import fetch_many
+
+        fast = f"http://127.0.0.1:{page_server}/10"
+        slow = f"http://127.0.0.2:{page_server}/2000"
+        start = time.perf_counter()
+        results = await fetch_many([fast, slow], deadline=0.5)
+
+        assert time.perf_counter() - start < 1.0
+        assert results[fast]["success"]
+        assert not results[slow]["success"]
+        assert "deadline" in results[slow]["error"]
+
+    @pytest.mark.asyncio
+    async def test_size_cap_aborts_download(self, page_server):
+        """Test that an oversized body without Content-Length is rejected."""
+        from tools.fetch import fetch_many
+
+        url = f"http://127.0.0.1:{page_server}/big"
+        results = await fetch_many([url], max_size_kb=100)
+
+        assert not results[url]["success"]
+        assert "size limit" in results[url]["error"]
+
+    @pytest.mark.asyncio
+    async def test_invalid_url_isolated(self, page_server):
+        """Test that a bad URL fails alone."""
+        from tools.fetch import fetch_many
+
+        good = f"http://127.0.0.1:{page_server}/10"
+        results = await fetch_many(["not-a-url", good])
+
+        assert results[good]["success"]
+        assert not results["not-a-url"]["success"]
@@ -0,0 +1,71 @@
+"""Tests for the hot-path benchmark suite and the functions it times."""
+
+import json
+
+import pytest
+
+from benchmarks.hotpaths import CASES, compare, merge_best
+from core.orchestrator import inject_charts
+from tools.charts import parse_chart_response
+
+CHARTS = [{"type": "bar", "title": "Share", "data": [{"label": "A", "value": 1}]}]
+
+
+class TestChartParsing:
+    """Test cases for tools.charts.parse_chart_response."""
+
+    @pytest.mark.parametrize("response", [
+        f"Charts:\n```json\n{json.dumps({'charts': CHARTS})}\n```\nDone.",
+        f"```\n{json.dumps({'charts': CHARTS})}\n```",
+        f"  {json.dumps({'charts': CHARTS})}\n",
+    ])
+    def test_fenced_and_bare(self, response):
+        """Test that the JSON is found with or without a code fence."""
+        assert parse_chart_response(response) == {"charts": CHARTS}
+
+    def test_missing_charts_and_invalid_json(self):
+        """Test that JSON without charts gives an empty list and non-JSON raises."""
+        assert parse_chart_response('{"title": "x"}') == {"charts": []}
+        with pytest.raises(ValueError):
+            parse_chart_response("Sorry, I can't chart this.")
+
+
+class TestInjectCharts:
+    """Test cases for core.orchestrator.inject_charts."""
+
+    def test_adds_charts_to_metadata_block(self):
+        """Test that charts land in the report's JSON block and the prose is untouched."""
+        report = '# Report\n\nProse.\n\n```json\n{"title": "EV"}\n```\n'
+        injected = inject_charts(report, CHARTS)
+
+        assert injected.startswith("# Report\n\nProse.\n\n```json\n")
+        block = injected.split("```json")[1].split("```")[0]
+        assert json.loads(block) == {"title": "EV", "charts": CHARTS}
+
+    def test_report_without_block_is_unchanged(self):
+        """Test that a report without a JSON block is returned as is."""
+        assert inject_charts("# Report", CHARTS) == "# Report"
+
+
+class TestHotPathSuite:
+    """Test cases for benchmarks.hotpaths."""
+
+    def test_every_case_runs(self):
+        """Test that each case builds its input and runs once."""
+        assert any(name.startswith("extract.") for name in CASES)
+        for name, setup in CASES.items():
+            setup()()
+
+    def test_compare_scales_by_calibration(self):
+        """Test that a uniformly slower machine is not a regression but a slower case is."""
+        baseline = {"calibration": 1.0, "cases": {"a": 1.0, "b": 1.0, "c": 1.0}}
+        current = {"calibration": 2.0, "cases": {"a": 2.1, "b": 3.0, "c": 1.0, "d": 1.0}}
+
+        statuses = {row["case"]: row["status"] for row in compare(current, baseline, threshold=0.25)}
+        assert statuses == {"a": "ok", "b": "regressed", "c": "improved", "d": "new"}
+
+    def test_merge_keeps_best(self):
+        """Test that re-measuring keeps the faster time of each case."""
+        current = {"calibration": 1.0, "cases": {"a": 2.0, "b": 1.0}}
+        merge_best(current, {"calibration": 1.2, "cases": {"a": 1.5}})
+        assert current == {"calibration": 1.0, "cases": {"a": 1.5, "b": 1.0}}
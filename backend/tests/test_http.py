@@ -0,0 +1,114 @@
+"""Tests for the shared outbound HTTP layer."""
+
+import asyncio
+import threading
+import time
+import httpx
+import pytest
+from unittest.mock import patch
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tools.http import CachingDNSBackend, PooledTransport, get_async_client
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        time.sleep(0.1)
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def slow_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+
+
+class TestPooledTransport:
+    """Test cases for the pooled async transport."""
+
+    @pytest.mark.asyncio
+    async def test_per_host_limit(self, slow_server):
+        """Test that at most max_per_host requests to one host run at once."""
+        transport = PooledTransport(max_per_host=2, dns_ttl=60)
+        async with httpx.AsyncClient(transport=transport) as client:
+            start = time.perf_counter()
+            responses = await asyncio.gather(*(client.get(slow_server) for _ in range(4)))
+            elapsed = time.perf_counter() - start
+
+        assert all(r.text == "ok" for r in responses)
+        # Two waves of two requests, not one wave of four
+        assert elapsed >= 0.2
+
+    @pytest.mark.asyncio
+    async def test_host_entries_do_not_accumulate(self, slow_server):
+        """Test that a host's slots are dropped once its requests finish or are cancelled."""
+        transport = PooledTransport(max_per_host=1, dns_ttl=60)
+        async with httpx.AsyncClient(transport=transport) as client:
+            running = asyncio.create_task(client.get(slow_server))
+            await asyncio.sleep(0.02)
+            waiting = asyncio.create_task(client.get(slow_server))
+            await asyncio.sleep(0.02)
+            assert transport._hosts["127.0.0.1"].users == 2
+
+            waiting.cancel()
+            await asyncio.gather(waiting, return_exceptions=True)
+            assert (await running).text == "ok"
+            assert transport._hosts == {}
+
+    @pytest.mark.asyncio
+    async def test_close_also_closes_replaced_pool(self):
+        """Test that closing the transport closes httpx's own pool as well as ours."""
+        transport = PooledTransport(max_per_host=1, dns_ttl=60, verify=False)
+        replaced = transport._replaced_pool
+        with patch.object(replaced, "aclose", wraps=replaced.aclose) as closed:
+            await transport.aclose()
+        closed.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_connections_are_reused(self, slow_server):
+        """Test that sequential requests share one keep-alive connection."""
+        transport = PooledTransport(max_per_host=2, dns_ttl=60)
+        async with httpx.AsyncClient(transport=transport) as client:
+            for _ in range(3):
+                await client.get(slow_server)
+            assert len(transport._pool.connections) == 1
+
+    @pytest.mark.asyncio
+    async def test_shared_client_is_per_event_loop(self):
+        """Test that the shared client is reused within one loop."""
+        assert get_async_client() is get_async_client()
+
+
+class TestCachingDNSBackend:
+    """Test cases for DNS caching."""
+
+    @pytest.mark.asyncio
+    async def test_resolution_is_cached(self, monkeypatch):
+        backend = CachingDNSBackend(ttl=60)
+        calls = []
+        loop = asyncio.get_running_loop()
+
+        async def fake_getaddrinfo(host, port, **kwargs):
+            calls.append(host)
+            return [(None, None, None, "", ("10.0.0.1", port))]
+
+        monkeypatch.setattr(loop, "getaddrinfo", fake_getaddrinfo)
+
+        assert await backend._resolve("api.example.com", 443) == "10.0.0.1"
+        assert await backend._resolve("api.example.com", 443) == "10.0.0.1"
+        assert calls == ["api.example.com"]
+
+    @pytest.mark.asyncio
+    async def test_ip_literals_skip_lookup(self):
+        assert await CachingDNSBackend()._resolve("127.0.0.1", 80) == "127.0.0.1"
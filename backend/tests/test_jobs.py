@@ -0,0 +1,246 @@
+"""Tests for detached background research jobs."""
+
+import asyncio
+import json
+import pytest
+from fastapi.testclient import TestClient
+
+from core import jobs
+from core.jobs import JobManager, JobNotFoundError
+
+
+def parse(chunks):
+    """Parse SSE chunks into (id, event, data) tuples."""
+    events = []
+    for frame in b"".join(chunks).decode("utf-8").split("\n\n"):
+        if frame.strip():
+            fields = dict(line.split(": ", 1) for line in frame.split("\n"))
+            events.append((int(fields["id"]), fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def make_runner(steps=3, gate=None, fail=False):
+    """Fake orchestrator writing one log line per step through the job's stream."""
+    async def runner(topic, research_depth, protocol, stream):
+        state = stream.state
+        state.current_step = "researcher"
+        for i in range(steps):
+            if gate is not None:
+                await gate.wait()
+            state.logs.append(f"step {i}")
+            yield stream.update()
+        if fail:
+            yield stream.error("boom")
+            return
+        state.current_step = "complete"
+        state.final_report = f"Report on {topic}"
+        yield stream.complete()
+    return runner
+
+
+async def collect(job, last_event_id=0):
+    return [chunk async for chunk in job.subscribe(last_event_id)]
+
+
+class TestJobManager:
+    """Test cases for job execution and event replay."""
+
+    @pytest.mark.asyncio
+    async def test_job_completes_and_keeps_result(self):
+        """Test that a job runs detached and its result stays available."""
+        manager = JobManager(runner=make_runner())
+        job = manager.create("EV market")
+        await job.task
+
+        info = manager.get(job.id).to_dict()
+        assert info["status"] == "complete"
+        assert info["result"]["final_report"] == "Report on EV market"
+        assert parse(await collect(job))[-1][1:] == ("complete", {"status": "success"})
+
+    @pytest.mark.asyncio
+    async def test_replays_after_last_event_id(self):
+        """Test that a reconnecting client only gets frames it hasn't seen."""
+        manager = JobManager(runner=make_runner(steps=4))
+        job = manager.create("EV market")
+        await job.task
+
+        full = parse(await collect(job))
+        resumed = parse(await collect(job, last_event_id=2))
+
+        assert [event_id for event_id, _, _ in resumed] == [event_id for event_id, _, _ in full if event_id > 2]
+
+    @pytest.mark.asyncio
+    async def test_subscriber_tails_running_job(self):
+        """Test that a live subscriber receives frames as they are produced."""
+        gate = asyncio.Event()
+        manager = JobManager(runner=make_runner(gate=gate))
+        job = manager.create("EV market")
+        reader = asyncio.create_task(collect(job))
+        await asyncio.sleep(0.01)
+        assert not reader.done()
+
+        gate.set()
+        events = parse(await asyncio.wait_for(reader, timeout=1))
+
+        logs = [log for _, _, d in events for log in d.get("append", {}).get("logs", [])]
+        assert logs == ["step 0", "step 1", "step 2"]
+        assert events[-1][1] == "complete"
+
+    @pytest.mark.asyncio
+    async def test_evicted_position_gets_snapshot(self):
+        """Test that a client behind the bounded log gets a state snapshot."""
+        manager = JobManager(runner=make_runner(steps=5), max_events=2)
+        job = manager.create("EV market")
+        await job.task
+
+        events = parse(await collect(job, last_event_id=1))
+
+        assert [e for _, e, _ in events] == ["patch", "complete"]
+        snapshot = events[0][2]["set"]
+        assert snapshot["logs"] == ["step 0", "step 1", "step 2", "step 3", "step 4"]
+        assert snapshot["final_report"] == "Report on EV market"
+        assert events[0][0] < events[1][0]
+
+    @pytest.mark.asyncio
+    async def test_failed_job_reports_error(self):
+        """Test that an error event from the pipeline marks the job failed."""
+        manager = JobManager(runner=make_runner(fail=True))
+        job = manager.create("EV market")
+        await job.task
+
+        assert job.status == "error"
+        assert "result" not in job.to_dict()
+        assert parse(await collect(job))[-1][1:] == ("error", {"error": "boom"})
+
+    @pytest.mark.asyncio
+    async def test_finished_jobs_expire(self):
+        """Test that jobs are dropped once their retention has passed."""
+        manager = JobManager(runner=make_runner(), retention_seconds=0)
+        job = manager.create("EV market")
+        await job.task
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(JobNotFoundError):
+            manager.get(job.id)
+
+
+class TestCoalescing:
+    """Test cases for sharing one pipeline run between identical requests."""
+
+    @pytest.mark.asyncio
+    async def test_identical_requests_share_one_run(self):
+        """Test that a matching in-flight request joins and sees the full stream."""
+        gate = asyncio.Event()
+        runs = []
+        runner = make_runner(gate=gate)
+
+        def counting_runner(*args, **kwargs):
+            runs.append(args)
+            return runner(*args, **kwargs)
+
+        manager = JobManager(runner=counting_runner)
+        first, joined_first = manager.join_or_create("EV Market", 1)
+        first_reader = asyncio.create_task(collect(first))
+        await asyncio.sleep(0.01)
+        second, joined_second = manager.join_or_create("  ev market!", 1)
+        gate.set()
+
+        assert second is first
+        assert (joined_first, joined_second) == (False, True)
+        assert await collect(second) == await first_reader
+        assert len(runs) == 1
+        assert first.to_dict()["callers"] == 2
+
+    @pytest.mark.asyncio
+    async def test_different_or_finished_requests_run_separately(self):
+        """Test that depth, protocol and finished jobs are not shared."""
+        gate = asyncio.Event()
+        manager = JobManager(runner=make_runner(gate=gate))
+        job, _ = manager.join_or_create("EV market", 1)
+
+        assert manager.join_or_create("EV market", 2)[0] is not job
+        assert manager.join_or_create("EV market", 1, protocol=1)[0] is not job
+
+        gate.set()
+        await job.task
+        assert manager.join_or_create("EV market", 1)[0] is not job
+
+    @pytest.mark.asyncio
+    async def test_legacy_stream_replays_to_late_joiner(self):
+        """Test that legacy-protocol jobs replay their frames without ids."""
+        manager = JobManager(runner=make_runner())
+        job, _ = manager.join_or_create("EV market", 1, protocol=1)
+        await job.task
+
+        frames = b"".join(await collect(job)).decode("utf-8")
+
+        assert "id: " not in frames
+        assert frames.count("event: state") == 4
+        assert frames.endswith('"final_report":"Report on EV market"}\n\n')
+
+
+class TestJobEndpoints:
+    """Test cases for the /research/jobs API."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_manager(self):
+        jobs._manager = JobManager(runner=make_runner())
+        yield
+        jobs._manager = None
+
+    def test_job_lifecycle(self):
+        """Test creating a job, following its events and reading its status."""
+        from app import app
+
+        with TestClient(app) as client:
+            response = client.post("/research/jobs", json={"topic": "EV market"})
+            assert response.status_code == 202
+            job_id = response.json()["job_id"]
+
+            events = client.get(f"/research/jobs/{job_id}/events")
+            resumed = client.get(f"/research/jobs/{job_id}/events", headers={"Last-Event-ID": "3"})
+            status = client.get(f"/research/jobs/{job_id}").json()
+
+        assert parse([events.content])[-1][1] == "complete"
+        assert [i for i, _, _ in parse([resumed.content])] == [4, 5]
+        assert status["status"] == "complete"
+        assert status["result"]["final_report"] == "Report on EV market"
+
+    def test_concurrent_research_requests_coalesce(self):
+        """Test that two identical /research calls get the same job and stream."""
+        import httpx
+        from app import app
+
+        gate = asyncio.Event()
+        manager = jobs._manager = JobManager(runner=make_runner(gate=gate))
+
+        async def release_when_joined():
+            while not manager._running or next(iter(manager._running.values())).callers < 2:
+                await asyncio.sleep(0.01)
+            gate.set()
+
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                request = {"topic": "EV market", "protocol": 2}
+                first, second, _ = await asyncio.gather(
+                    client.post("/research", json=request),
+                    client.post("/research", json=request),
+                    release_when_joined(),
+                )
+            return first, second
+
+        first, second = asyncio.run(run())
+
+        assert first.headers["X-Job-Id"] == second.headers["X-Job-Id"]
+        assert first.content == second.content
+        assert parse([first.content])[-1][1] == "complete"
+
+    def test_unknown_job_returns_404(self):
+        """Test that unknown job ids are reported as not found."""
+        from app import app
+
+        client = TestClient(app)
+
+        assert client.get("/research/jobs/missing").status_code == 404
+        assert client.get("/research/jobs/missing/events").status_code == 404
@@ -0,0 +1,108 @@
+"""Tests for the Gemini LLM client."""
+
+import pytest
+
+
+class TestGeminiClient:
+    """Test cases for GeminiClient."""
+
+    def test_generate_returns_text(self, mock_gemini_client):
+        """Test that the sync path returns the response text."""
+        from llm_client import GeminiClient
+
+        client = GeminiClient()
+        assert client.generate("prompt") == "Mocked AI response for testing"
+
+    @pytest.mark.asyncio
+    async def test_agenerate_uses_async_sdk(self, mock_gemini_client):
+        """Test that agenerate awaits the SDK's async client, not the sync one."""
+        from llm_client import GeminiClient
+
+        client = GeminiClient()
+        result = await client.agenerate("prompt", temperature=0.2)
+
+        assert result == "Mocked AI response for testing"
+        mock_gemini_client.aio.models.generate_content.assert_awaited_once()
+        mock_gemini_client.models.generate_content.assert_not_called()
+        kwargs = mock_gemini_client.aio.models.generate_content.call_args.kwargs
+        assert kwargs["config"]["temperature"] == 0.2
+
+    @pytest.mark.asyncio
+    async def test_agenerate_wraps_errors(self, mock_gemini_client):
+        """Test that SDK failures surface as Gemini API errors."""
+        from llm_client import GeminiClient
+
+        mock_gemini_client.aio.models.generate_content.side_effect = RuntimeError("boom")
+
+        with pytest.raises(Exception, match="Gemini API error: boom"):
+            await GeminiClient().agenerate("prompt")
+
+    @pytest.mark.asyncio
+    async def test_astream_yields_chunks_in_order(self, mock_gemini_client):
+        """Test that streamed chunks join to the full response."""
+        from llm_client import GeminiClient
+
+        chunks = [chunk async for chunk in GeminiClient().astream("prompt")]
+
+        assert len(chunks) > 1
+        assert "".join(chunks).strip() == "Mocked AI response for testing"
+
+
+class TestLLMResponseCache:
+    """Test cases for the LLM response cache."""
+
+    @pytest.fixture
+    def cached_client(self):
+        from core.cache import MemoryCache
+        from llm_client import GeminiClient, LLMResponseCache
+
+        return GeminiClient(cache=LLMResponseCache(MemoryCache(max_entries=10)))
+
+    @pytest.mark.asyncio
+    async def test_identical_call_served_from_cache(self, mock_gemini_client, cached_client):
+        """Test that a repeated prompt skips the API."""
+        first = await cached_client.agenerate("extract queries", temperature=0.3)
+        second = await cached_client.agenerate("extract queries", temperature=0.3)
+
+        assert first == second
+        assert mock_gemini_client.aio.models.generate_content.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_key_covers_temperature_and_prompt(self, mock_gemini_client, cached_client):
+        """Test that different prompts or temperatures miss."""
+        await cached_client.agenerate("a", temperature=0.3)
+        await cached_client.agenerate("a", temperature=0.4)
+        await cached_client.agenerate("b", temperature=0.3)
+
+        assert mock_gemini_client.aio.models.generate_content.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_opt_out(self, mock_gemini_client, cached_client):
+        """Test that cache=False always calls the API."""
+        await cached_client.agenerate("creative", cache=False)
+        await cached_client.agenerate("creative", cache=False)
+
+        assert mock_gemini_client.aio.models.generate_content.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_stream_populates_cache(self, mock_gemini_client, cached_client):
+        """Test that a completed stream is replayed as one chunk."""
+        streamed = "".join([c async for c in cached_client.astream("report")])
+        replayed = [c async for c in cached_client.astream("report")]
+
+        assert replayed == [streamed]
+        assert mock_gemini_client.aio.models.generate_content_stream.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_disk_tier_survives_restart(self, mock_gemini_client, tmp_path):
+        """Test that a new process with an empty memory tier reads from disk."""
+        from core.cache import MemoryCache, SQLiteCache
+        from llm_client import GeminiClient, LLMResponseCache
+
+        path = str(tmp_path / "llm.db")
+        before = GeminiClient(cache=LLMResponseCache(MemoryCache(), SQLiteCache(path, namespace="llm")))
+        after = GeminiClient(cache=LLMResponseCache(MemoryCache(), SQLiteCache(path, namespace="llm")))
+
+        await before.agenerate("chart data", temperature=0.1)
+        assert await after.agenerate("chart data", temperature=0.1) == "Mocked AI response for testing"
+        assert mock_gemini_client.aio.models.generate_content.await_count == 1
@@ -0,0 +1,140 @@
+"""Tests for the provider stand-in, the load driver and event-loop lag monitoring."""
+
+import asyncio
+import random
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from benchmarks.load_test import lag_summary, parse_lag, percentile, summarize
+from benchmarks.standin import Latency, Profile, StandIn, create_app, serve_in_thread
+from tests.test_orchestrator import parse_events
+
+
+class TestStandIn:
+    """Test cases for the provider stand-in server."""
+
+    def test_latency_specs(self):
+        """Test that each distribution parses and samples within its range."""
+        rng = random.Random(1)
+        assert Latency("fixed:0.25").sample(rng) == 0.25
+        assert all(0.1 <= Latency("uniform:0.1,0.3").sample(rng) <= 0.3 for _ in range(50))
+        assert all(Latency("lognormal:0.5,0.4").sample(rng) > 0 for _ in range(50))
+        assert all(Latency("exp:0.2").sample(rng) >= 0 for _ in range(50))
+        for spec in ("fixed", "uniform:1", "normal:1,2", "fixed:-1", "lognormal:0,1"):
+            with pytest.raises(ValueError):
+                Latency(spec)
+
+    def test_rate_limit_and_errors(self):
+        """Test that requests over the rate limit get 429 and injected errors get 500."""
+        standin = StandIn({
+            "brave": Profile(rate_limit=0.001, burst=2),
+            "tavily": Profile(error_rate=1.0),
+        })
+        client = TestClient(create_app(standin))
+
+        statuses = [client.get("/res/v1/web/search", params={"q": "ev", "count": 3}).status_code for _ in range(3)]
+        assert statuses == [200, 200, 429]
+        assert client.post("/search", json={"query": "ev"}).status_code == 500
+        assert client.get("/stats").json()["brave"] == {"requests": 3, "errors": 0, "throttled": 1}
+
+    def test_gemini_shapes(self):
+        """Test that generateContent returns candidates and usage and streaming ends with usage."""
+        client = TestClient(create_app(StandIn()))
+        body = {"contents": [{"role": "user", "parts": [{"text": "Extract insights from this"}]}]}
+
+        response = client.post("/v1beta/models/gemini-2.0-flash:generateContent", json=body).json()
+        assert response["candidates"][0]["content"]["parts"][0]["text"]
+        assert response["usageMetadata"]["promptTokenCount"] > 0
+
+        stream = client.post("/v1beta/models/gemini-2.0-flash:streamGenerateContent?alt=sse", json=body)
+        frames = [line for line in stream.text.splitlines() if line.startswith("data: ")]
+        assert len(frames) > 1
+        assert "usageMetadata" in frames[-1]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_sessions_through_real_clients(self):
+        """Test that sessions overlap end to end through the SDK and search client against the stand-in."""
+        import llm_client
+        from config import Config
+        from core.orchestrator import perform_market_research_stream
+        from tools.ratelimit import TokenBucket, _limiters
+
+        async def session(topic):
+            return parse_events([f async for f in perform_market_research_stream(topic, 1, 2)], with_ids=True)
+
+        standin = StandIn({"llm": Profile(latency=Latency("fixed:0.1")), "brave": Profile(latency=Latency("fixed:0.1"))})
+        with serve_in_thread(standin) as url, \
+                patch("llm_client.client_sdk", llm_client.create_sdk_client(url)), \
+                patch.object(Config, "BRAVE_SEARCH_URL", f"{url}/res/v1/web/search"), \
+                patch.dict(_limiters, {"brave": TokenBucket("brave", rate=1000, burst=1000)}):
+            started = time.perf_counter()
+            sessions = await asyncio.gather(*(session(f"EV market {i}") for i in range(4)))
+            elapsed = time.perf_counter() - started
+
+        assert all(events[-1][1] == "complete" for events in sessions)
+        per_session = standin.stats["llm"]["requests"] / 4 * 0.1 + 0.1
+        assert elapsed < 2 * per_session
+        assert standin.stats["brave"]["requests"] == 4 * len(standin.corpus["queries"])
+
+
+class TestLoadReport:
+    """Test cases for the load driver's statistics."""
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles."""
+        values = [float(v) for v in range(1, 101)]
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile([3.0], 95) == 3.0
+        assert percentile([], 50) is None
+
+    def test_summarize(self):
+        """Test that only completed sessions count toward throughput and end-to-end latency."""
+        sessions = [
+            {"status": "completed", "latency": 2.0, "first_event": 0.1},
+            {"status": "completed", "latency": 4.0, "first_event": 0.3},
+            {"status": "error", "latency": 1.0, "first_event": 0.2},
+            {"status": "rejected", "latency": 0.01, "first_event": None},
+        ]
+        report = summarize(sessions, wall=4.0)
+        assert report["throughput"] == 0.5
+        assert (report["completed"], report["error"], report["rejected"]) == (2, 1, 1)
+        assert report["end_to_end"]["max"] == 4.0
+        assert report["first_event"]["p50"] == 0.2
+
+    def test_lag_from_metrics_scrapes(self):
+        """Test that lag quantiles come from the bucket counts between two scrapes."""
+        def scrape(counts, total):
+            lines = [f'event_loop_lag_seconds_bucket{{le="{le}"}} {c}' for le, c in zip(("0.001", "0.01", "0.1", "+Inf"), counts)]
+            return "\n".join(lines + [f"event_loop_lag_seconds_sum {total}"])
+
+        before = parse_lag(scrape((5, 5, 5, 5), 0.002))
+        after = parse_lag(scrape((95, 103, 105, 105), 0.502))
+        summary = lag_summary(before, after)
+        assert summary["samples"] == 100
+        assert summary["mean"] == pytest.approx(0.005)
+        assert (summary["p50"], summary["p95"], summary["p99"]) == (0.001, 0.01, 0.1)
+
+
+class TestLoopLagMonitor:
+    """Test cases for core.loop.LoopLagMonitor."""
+
+    @pytest.mark.asyncio
+    async def test_records_blocking(self):
+        """Test that a blocking call shows up as lag."""
+        from core.loop import LoopLagMonitor
+        from core.metrics import EVENT_LOOP_LAG
+
+        monitor = LoopLagMonitor(0.01)
+        samples = EVENT_LOOP_LAG._sum.get()
+        monitor.start()
+        await asyncio.sleep(0.02)
+        time.sleep(0.1)
+        await asyncio.sleep(0.02)
+        await monitor.stop()
+
+        assert monitor.max_lag >= 0.05
+        assert EVENT_LOOP_LAG._sum.get() - samples >= 0.05
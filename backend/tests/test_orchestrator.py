@@ -0,0 +1,309 @@
+"""Tests for the research orchestrator."""
+
+import json
+import pytest
+import asyncio
+from unittest.mock import patch
+
+
+def parse_events(chunks, with_ids=False):
+    """Parse streamed SSE chunks into (event, data) or (id, event, data) tuples."""
+    events = []
+    for frame in b"".join(chunks).decode("utf-8").split("\n\n"):
+        if not frame.strip():
+            continue
+        fields = dict(line.split(": ", 1) for line in frame.split("\n"))
+        event, data = fields["event"], json.loads(fields["data"])
+        events.append((int(fields["id"]), event, data) if with_ids else (event, data))
+    return events
+
+
+async def run_pipeline(topic="EV market", depth=1, protocol=1):
+    from core.orchestrator import perform_market_research_stream
+
+    return [frame async for frame in perform_market_research_stream(topic, depth, protocol)]
+
+
+class TestResearchStream:
+    """Test cases for perform_market_research_stream."""
+
+    @pytest.mark.asyncio
+    async def test_pipeline_completes(self, mock_gemini_client, mock_brave_search):
+        """Test that the pipeline finishes with a complete event."""
+        events = parse_events(await run_pipeline())
+
+        assert events[-1][0] == "complete"
+        assert events[-1][1]["status"] == "success"
+
+    @pytest.mark.asyncio
+    async def test_synthesizer_streams_deltas(self, mock_gemini_client, mock_brave_search):
+        """Test that report deltas arrive before completion and add up to the report."""
+        events = parse_events(await run_pipeline())
+
+        report_deltas = [d["text"] for e, d in events if e == "delta" and d["field"] == "final_report"]
+        insight_deltas = [d["text"] for e, d in events if e == "delta" and d["field"] == "insights"]
+
+        assert len(report_deltas) > 1
+        assert insight_deltas
+        assert "".join(report_deltas) == events[-1][1]["final_report"]
+
+    @pytest.mark.asyncio
+    async def test_steps_only_move_forward(self, mock_gemini_client, mock_brave_search):
+        """Test that the parallel chart and report stages don't make the reported step flip."""
+        events = parse_events(await run_pipeline())
+
+        steps = [d["current_step"] for _, d in events if "current_step" in d]
+        changes = [step for i, step in enumerate(steps) if i == 0 or step != steps[i - 1]]
+        assert changes == ["strategist", "researcher", "analyst", "synthesizer", "complete"]
+
+    @pytest.mark.asyncio
+    async def test_repeated_session_served_from_cache(self, mock_gemini_client):
+        """Test that a repeated topic reuses every step until the search data changes."""
+        import itertools
+        from unittest.mock import MagicMock
+
+        import llm_client
+        from core.cache import MemoryCache
+        from llm_client import GeminiClient, LLMResponseCache
+
+        # Every model call answers differently, as a real model would
+        counter = itertools.count()
+
+        async def generate(**kwargs):
+            return MagicMock(text=f"answer {next(counter)}")
+
+        async def stream(**kwargs):
+            async def chunks():
+                for word in (f"streamed {next(counter)}", " done"):
+                    yield MagicMock(text=word)
+            return chunks()
+
+        mock_gemini_client.aio.models.generate_content.side_effect = generate
+        mock_gemini_client.aio.models.generate_content_stream.side_effect = stream
+        description = "EV sales rose 30%"
+
+        async def search(query, count=10):
+            return [{"title": "EV sales", "url": "https://example.com/ev", "description": description}]
+
+        def calls():
+            mocks = (mock_gemini_client.aio.models.generate_content, mock_gemini_client.aio.models.generate_content_stream)
+            return [[call.kwargs["contents"][:30] for call in mock.await_args_list] for mock in mocks]
+
+        llm_client._client = GeminiClient(cache=LLMResponseCache(MemoryCache()))
+        with patch("core.orchestrator.asearch_web", side_effect=search):
+            first = parse_events(await run_pipeline())
+            made = calls()
+            second = parse_events(await run_pipeline())
+            assert calls() == made
+            assert second[-1][1]["final_report"] == first[-1][1]["final_report"]
+
+            description = "EV sales rose 35%"
+            await run_pipeline()
+
+        generated, streamed = calls()
+        repeated = generated[len(made[0]):] + streamed[len(made[1]):]
+        assert not any(c.startswith("You are 'The Strategist'") for c in repeated)
+        assert not any(c.startswith("Extract 3-5 specific search") for c in repeated)
+        assert any(c.startswith("Analyze source data") for c in repeated)
+        assert any(c.startswith("Create a professional market") for c in repeated)
+
+    @pytest.mark.asyncio
+    async def test_searches_run_concurrently(self, mock_gemini_client):
+        """Test that queries overlap instead of running back to back."""
+        from llm_client import GeminiClient
+
+        async def slow_search(query, count=10):
+            await asyncio.sleep(0.2)
+            return [{"title": query, "url": f"https://example.com/{query}", "description": "d"}]
+
+        queries = "q1\nq2\nq3\nq4"
+        with patch("core.orchestrator.asearch_web", side_effect=slow_search), \
+                patch.object(GeminiClient, "agenerate", return_value=queries):
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            events = parse_events(await run_pipeline())
+            elapsed = loop.time() - start
+
+        assert elapsed < 0.6
+        sources = [d for e, d in events if e == "state" and "sources" in d][-1]["sources"]
+        assert [s["title"] for s in sources] == ["q1", "q2", "q3", "q4"]
+
+    @pytest.mark.asyncio
+    async def test_failed_query_is_isolated(self, mock_gemini_client):
+        """Test that one failing query doesn't drop the others' results."""
+        from llm_client import GeminiClient
+
+        async def flaky_search(query, count=10):
+            if query == "bad":
+                raise RuntimeError("provider down")
+            return [{"title": query, "url": f"https://example.com/{query}", "description": "d"}]
+
+        with patch("core.orchestrator.asearch_web", side_effect=flaky_search), \
+                patch.object(GeminiClient, "agenerate", return_value="good\nbad\nfine"):
+            events = parse_events(await run_pipeline())
+
+        assert events[-1][0] == "complete"
+        sources = [d for e, d in events if e == "state" and "sources" in d][-1]["sources"]
+        assert [s["title"] for s in sources] == ["good", "fine"]
+        assert any("failed: bad" in log for log in events[-2][1]["logs"])
+
+    @pytest.mark.asyncio
+    async def test_synthesizer_runs_alongside_visualizer(self, mock_gemini_client, mock_brave_search):
+        """Test that report deltas stream while the chart call is still running."""
+        charts = {"charts": [{"type": "bar", "title": "Share"}]}
+        report_chunks_seen = []
+
+        async def slow_charts(insights, topic):
+            await asyncio.sleep(0.2)
+            report_chunks_seen.append(len(chunks))
+            return charts
+
+        chunks = []
+        with patch("core.orchestrator.generate_chart_data", side_effect=slow_charts):
+            from core.orchestrator import perform_market_research_stream
+            async for chunk in perform_market_research_stream("EV market", 1, 1):
+                chunks.append(chunk)
+
+        events = parse_events(chunks)
+        first_delta = next(i for i, (e, d) in enumerate(events) if e == "delta" and d["field"] == "final_report")
+        assert first_delta < report_chunks_seen[0]
+        assert events[-1][1]["status"] == "success"
+        assert "  → Generated 1 charts" in events[-2][1]["logs"]
+
+
+
+def apply_patches(events):
+    """Rebuild client state from delta-protocol events, as useResearch does."""
+    state = {"current_step": "idle", "logs": []}
+    for _, event, data in events:
+        if event != "patch":
+            continue
+        state.update(data.get("set", {}))
+        for field, value in data.get("append", {}).items():
+            state[field] = state.get(field, type(value)()) + value
+    return state
+
+
+class TestDeltaProtocol:
+    """Test cases for the delta (protocol 2) SSE stream."""
+
+    @pytest.mark.asyncio
+    async def test_patches_rebuild_legacy_state(self, mock_gemini_client, mock_brave_search):
+        """Test that applying patches gives the same final state as legacy events."""
+        legacy = parse_events(await run_pipeline(protocol=1))
+        delta = parse_events(await run_pipeline(protocol=2), with_ids=True)
+
+        state = apply_patches(delta)
+        final_legacy = legacy[-2][1]
+        assert state["current_step"] == "complete"
+        assert state["logs"] == final_legacy["logs"]
+        assert state["final_report"] == legacy[-1][1]["final_report"]
+        assert state["sources"] == [d for e, d in legacy if e == "state" and "sources" in d][-1]["sources"]
+        assert delta[-1][1] == "complete"
+        assert delta[-1][2]["status"] == "success"
+        assert delta[-1][2]["usage"] == legacy[-1][1]["usage"]
+
+    @pytest.mark.asyncio
+    async def test_ids_increase_and_logs_are_appended(self, mock_gemini_client, mock_brave_search):
+        """Test that event ids are monotonic and each log line is sent once."""
+        delta = parse_events(await run_pipeline(protocol=2), with_ids=True)
+
+        ids = [event_id for event_id, _, _ in delta]
+        assert ids == list(range(1, len(ids) + 1))
+        sent_logs = [log for _, _, d in delta for log in d.get("append", {}).get("logs", [])]
+        assert sent_logs == apply_patches(delta)["logs"]
+        assert all("logs" not in d.get("set", {}) for _, _, d in delta)
+
+    @pytest.mark.asyncio
+    async def test_fewer_bytes_than_legacy(self, mock_gemini_client, mock_brave_search):
+        """Test that the delta stream is smaller than the full-state stream."""
+        legacy_bytes = len(b"".join(await run_pipeline(protocol=1)))
+        delta_bytes = len(b"".join(await run_pipeline(protocol=2)))
+
+        assert delta_bytes < legacy_bytes / 2
+
+    def test_reordered_list_is_replaced(self):
+        """Test that a list that no longer extends what was sent goes out as a set."""
+        from core.protocol import StateStream
+        from core.state import AgentState
+
+        state = AgentState()
+        stream = StateStream(state, protocol=2)
+        state.sources = [{"title": "b"}]
+        stream.update()
+        state.sources.append({"title": "c"})
+        appended = parse_events([stream.update()])[0][1]
+        state.sources = [{"title": "a"}, {"title": "b"}, {"title": "c"}]
+        replaced = parse_events([stream.update()])[0][1]
+
+        assert appended == {"append": {"sources": [{"title": "c"}]}}
+        assert replaced == {"set": {"sources": state.sources}}
+        assert stream.update() == b""
+
+    def test_appends_leave_fragment_cache_to_whole_lists(self, monkeypatch):
+        """Test that append patches skip the fragment cache, so snapshots keep reusing it."""
+        from core import sse
+        from core.protocol import StateStream
+        from core.state import AgentState
+
+        state = AgentState()
+        stream = StateStream(state, protocol=2)
+        state.logs.append("one")
+        stream.update()
+        stream.snapshot()
+
+        encoded = []
+        dumps = sse.dumps
+        monkeypatch.setattr(sse, "dumps", lambda value: encoded.append(value) or dumps(value))
+        state.logs.append("two")
+        assert parse_events([stream.update()])[0][1] == {"append": {"logs": ["two"]}}
+        snapshot = parse_events([stream.snapshot()])[0][1]
+
+        assert snapshot["set"]["logs"] == ["one", "two"]
+        assert ["one", "two"] not in encoded
+
+
+class TestDeepRead:
+    """Test cases for the deep-read stage at high research depth."""
+
+    @pytest.mark.asyncio
+    async def test_fetches_top_sources_within_budget(self, mock_gemini_client):
+        """Test that fetched text reaches the researcher prompt and slow pages are skipped."""
+        from config import Config
+
+        sources = [
+            {"title": "Fast", "url": "https://fast.example.com/a", "description": "snippet"},
+            {"title": "Slow", "url": "https://slow.example.com/b", "description": "snippet"},
+        ]
+
+        async def fake_fetch(url, max_size_kb=500):
+            if "slow" in url:
+                await asyncio.sleep(5)
+            return f"Document from: {url}\n\nSolar installations rose 40% in 2024."
+
+        with patch("core.orchestrator.atavily_search", return_value=sources), \
+                patch("tools.fetch.afetch_document", side_effect=fake_fetch), \
+                patch.object(Config, "DEEP_READ_BUDGET_SECONDS", 0.3):
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            events = parse_events(await run_pipeline(depth=3))
+            elapsed = loop.time() - start
+
+        assert elapsed < 2
+        logs = events[-2][1]["logs"]
+        assert any("Read 1/2: https://fast.example.com/a" in log for log in logs)
+        assert any("not back within budget" in log for log in logs)
+
+        prompts = [c.kwargs["contents"] for c in mock_gemini_client.aio.models.generate_content.call_args_list]
+        researcher_prompt = next(p for p in prompts if p.startswith("Analyze source data"))
+        assert "Solar installations rose 40% in 2024." in researcher_prompt
+        assert "slow.example.com/b):" not in researcher_prompt
+
+    @pytest.mark.asyncio
+    async def test_skipped_below_min_depth(self, mock_gemini_client, mock_brave_search):
+        """Test that shallow research never fetches documents."""
+        with patch("tools.fetch.afetch_document") as mock_fetch:
+            events = parse_events(await run_pipeline(depth=1))
+
+        mock_fetch.assert_not_called()
+        assert events[-1][0] == "complete"
@@ -0,0 +1,100 @@
+"""Tests for the stage graph executor."""
+
+import asyncio
+import pytest
+
+from core.pipeline import PipelineError, Stage, resolve_dependencies, run_stages
+
+
+def recording_stage(name, log, delay=0.0, inputs=(), outputs=(), fail=False):
+    """Stage that logs its start and end around a sleep and yields one frame."""
+    async def run(context):
+        log.append(f"start {name}")
+        await asyncio.sleep(delay)
+        if fail:
+            raise RuntimeError(f"{name} failed")
+        yield name.encode()
+        log.append(f"end {name}")
+    return Stage(name, run, inputs=inputs, outputs=outputs)
+
+
+async def collect(stages, context=None):
+    return [frame async for frame in run_stages(stages, context)]
+
+
+class TestResolveDependencies:
+    """Test cases for stage graph validation."""
+
+    def test_maps_inputs_to_producers(self):
+        """Test that each stage depends on the stages producing its inputs."""
+        stages = [
+            Stage("a", None, outputs=["x"]),
+            Stage("b", None, inputs=["x"], outputs=["y"]),
+            Stage("c", None, inputs=["x", "y"]),
+        ]
+
+        assert resolve_dependencies(stages) == {"a": set(), "b": {"a"}, "c": {"a", "b"}}
+
+    @pytest.mark.parametrize("stages, message", [
+        ([Stage("a", None), Stage("a", None)], "Duplicate stage"),
+        ([Stage("a", None, outputs=["x"]), Stage("b", None, outputs=["x"])], "produced by both"),
+        ([Stage("a", None, inputs=["x"])], "no stage produces"),
+        ([Stage("a", None, inputs=["y"], outputs=["x"]), Stage("b", None, inputs=["x"], outputs=["y"])], "cycle"),
+    ])
+    def test_invalid_graphs_are_rejected(self, stages, message):
+        """Test that malformed graphs raise PipelineError before running."""
+        with pytest.raises(PipelineError, match=message):
+            resolve_dependencies(stages)
+
+
+class TestRunStages:
+    """Test cases for concurrent stage execution."""
+
+    @pytest.mark.asyncio
+    async def test_independent_stages_overlap(self):
+        """Test that siblings run together and their dependant waits for both."""
+        log = []
+        stages = [
+            recording_stage("root", log, outputs=["x"]),
+            recording_stage("slow", log, 0.1, inputs=["x"], outputs=["y"]),
+            recording_stage("fast", log, 0.01, inputs=["x"], outputs=["z"]),
+            recording_stage("join", log, inputs=["y", "z"]),
+        ]
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        frames = await collect(stages)
+        elapsed = loop.time() - start
+
+        assert frames == [b"root", b"fast", b"slow", b"join"]
+        assert log.index("start fast") < log.index("end slow")
+        assert log.index("start join") > log.index("end slow")
+        assert elapsed < 0.15
+
+    @pytest.mark.asyncio
+    async def test_coroutine_stage(self):
+        """Test that a stage with nothing to stream can be a plain coroutine."""
+        seen = []
+
+        async def record(context):
+            seen.append(context)
+
+        frames = await collect([Stage("a", record)], context="ctx")
+
+        assert frames == []
+        assert seen == ["ctx"]
+
+    @pytest.mark.asyncio
+    async def test_failure_cancels_siblings(self):
+        """Test that a failing stage raises and cancels the stages still running."""
+        log = []
+        stages = [
+            recording_stage("bad", log, 0.01, fail=True),
+            recording_stage("slow", log, 0.2),
+        ]
+
+        with pytest.raises(RuntimeError, match="bad failed"):
+            await collect(stages)
+        await asyncio.sleep(0.25)
+
+        assert "end slow" not in log
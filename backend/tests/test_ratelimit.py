@@ -0,0 +1,129 @@
+"""Tests for search provider rate limiting."""
+
+import asyncio
+import time
+import pytest
+
+from tools.ratelimit import MemoryBucketStore, SQLiteBucketStore, TokenBucket
+
+
+class TestTokenBucket:
+    """Test cases for TokenBucket."""
+
+    def test_burst_is_free_then_throttled(self):
+        """Test that burst tokens are immediate and the next one waits 1/rate."""
+        bucket = TokenBucket("test", rate=10, burst=3)
+
+        waits = [bucket.reserve() for _ in range(4)]
+
+        assert waits[:3] == [0.0, 0.0, 0.0]
+        assert waits[3] == pytest.approx(0.1, abs=0.01)
+
+    def test_reservations_queue_in_order(self):
+        """Test that each waiter is scheduled one interval after the previous one."""
+        bucket = TokenBucket("test", rate=4, burst=1)
+
+        waits = [bucket.reserve() for _ in range(4)]
+
+        assert waits == pytest.approx([0.0, 0.25, 0.5, 0.75], abs=0.01)
+
+    def test_invalid_rate_raises_error(self):
+        """Test that a non-positive rate is rejected."""
+        with pytest.raises(ValueError, match="must be positive"):
+            TokenBucket("test", rate=0)
+
+    @pytest.mark.asyncio
+    async def test_acquire_does_not_block_event_loop(self):
+        """Test that waiting sessions yield to other tasks and finish FIFO."""
+        bucket = TokenBucket("test", rate=20, burst=1)
+        order = []
+
+        async def session(i):
+            await bucket.acquire()
+            order.append(i)
+
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while len(order) < 5:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        start = time.perf_counter()
+        await asyncio.gather(ticker(), *(session(i) for i in range(5)))
+
+        assert order == [0, 1, 2, 3, 4]
+        assert time.perf_counter() - start == pytest.approx(0.2, abs=0.1)
+        assert ticks > 5
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_refunds_token(self):
+        """Test that a waiter cancelled mid-sleep gives its token to the next caller."""
+        bucket = TokenBucket("test", rate=10, burst=1)
+        bucket.reserve()
+
+        waiter = asyncio.create_task(bucket.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        assert bucket.reserve() == pytest.approx(0.1, abs=0.02)
+
+    def test_wait_histogram_observed(self):
+        """Test that waits are exported per provider."""
+        from prometheus_client import REGISTRY
+
+        def observed():
+            return REGISTRY.get_sample_value("search_rate_limit_wait_seconds_count", {"provider": "hist"}) or 0
+
+        before = observed()
+        TokenBucket("hist", rate=100, burst=5).acquire_sync()
+        assert observed() == before + 1
+
+
+class TestBucketStores:
+    """Test cases for bucket state stores."""
+
+    def test_memory_buckets_are_independent(self):
+        """Test that providers don't share tokens."""
+        store = MemoryBucketStore()
+
+        assert store.reserve("brave", 1, 1) == 0.0
+        assert store.reserve("tavily", 1, 1) == 0.0
+        assert store.reserve("brave", 1, 1) > 0
+
+    def test_sqlite_store_shared_between_instances(self, tmp_path):
+        """Test that two stores on one file (e.g. two workers) share a quota."""
+        path = str(tmp_path / "ratelimit.db")
+        worker_a = TokenBucket("brave", rate=2, burst=1, store=SQLiteBucketStore(path))
+        worker_b = TokenBucket("brave", rate=2, burst=1, store=SQLiteBucketStore(path))
+
+        assert worker_a.reserve() == 0.0
+        assert worker_b.reserve() == pytest.approx(0.5, abs=0.05)
+        assert worker_a.reserve() == pytest.approx(1.0, abs=0.05)
+
+    def test_sqlite_store_refund(self, tmp_path):
+        """Test that a refunded token is available to the next reservation."""
+        store = SQLiteBucketStore(str(tmp_path / "ratelimit.db"))
+
+        assert store.reserve("brave", 2, 1) == 0.0
+        store.refund("brave", 2, 1)
+        assert store.reserve("brave", 2, 1) == 0.0
+
+    def test_sqlite_store_reuses_connection_per_thread(self, tmp_path):
+        """Test that reservations on one thread share a connection and threads don't."""
+        import threading
+
+        store = SQLiteBucketStore(str(tmp_path / "ratelimit.db"))
+        store.reserve("brave", 100, 10)
+        conn = store._connect()
+        store.reserve("brave", 100, 10)
+        assert store._connect() is conn
+
+        other = []
+        thread = threading.Thread(target=lambda: (store.reserve("brave", 100, 10), other.append(store._connect())))
+        thread.start()
+        thread.join()
+        assert other[0] is not conn
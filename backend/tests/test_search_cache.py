@@ -0,0 +1,185 @@
+"""Tests for the search result cache and its backends."""
+
+import time
+import pytest
+from unittest.mock import patch
+
+from core.cache import MemoryCache, SQLiteCache
+from tools.search_cache import SearchCache, is_permanent_failure, normalize_query
+
+
+class TestNormalizeQuery:
+    """Test cases for query normalization."""
+
+    def test_case_whitespace_and_punctuation(self):
+        """Test that trivially different phrasings normalize equally."""
+        assert normalize_query("EV market,  2024?") == normalize_query("ev market 2024")
+        assert normalize_query("  Electric-Vehicle   Market ") == "electric vehicle market"
+
+    def test_meaningful_symbols_kept(self):
+        """Test that symbols which change meaning are preserved."""
+        assert normalize_query("C++ jobs") != normalize_query("C jobs")
+        assert normalize_query("C# tools") == "c# tools"
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryCache(max_entries=3)
+    return SQLiteCache(str(tmp_path / "cache.db"), namespace="test", max_entries=3)
+
+
+class TestCacheBackends:
+    """Test cases shared by the memory and SQLite backends."""
+
+    def test_set_and_get(self, backend):
+        backend.set("k", "v", ttl=60)
+        assert backend.get("k") == "v"
+        assert backend.get("missing") is None
+
+    def test_entries_expire(self, backend):
+        backend.set("k", "v", ttl=0.05)
+        time.sleep(0.1)
+        assert backend.get("k") is None
+
+    def test_lru_eviction(self, backend):
+        """Test that the least recently used entry is evicted first."""
+        for key in ("a", "b", "c"):
+            backend.set(key, key, ttl=60)
+            time.sleep(0.01)
+        backend.get("a")
+        time.sleep(0.01)
+
+        assert backend.set("d", "d", ttl=60) == 1
+        assert backend.get("b") is None
+        assert backend.get("a") == "a"
+
+    def test_clear(self, backend):
+        backend.set("k", "v", ttl=60)
+        backend.clear()
+        assert backend.get("k") is None
+
+
+class TestSearchCache:
+    """Test cases for SearchCache."""
+
+    def test_normalized_hit(self):
+        cache = SearchCache(MemoryCache())
+        results = [{"title": "t", "url": "u", "description": "d"}]
+        cache.set("brave", "EV Market!", results, count=3)
+
+        assert cache.get("brave", "ev market", count=3) == results
+        assert cache.get("brave", "ev market", count=5) is None
+        assert cache.get("tavily", "ev market", count=3) is None
+
+    def test_negative_entry_uses_short_ttl(self):
+        from config import Config
+
+        cache = SearchCache(MemoryCache())
+        with patch.object(Config, "SEARCH_CACHE_NEGATIVE_TTL", 0.05):
+            cache.set_failure("brave", "broken", count=3)
+            assert cache.get("brave", "broken", count=3) == []
+            time.sleep(0.1)
+            assert cache.get("brave", "broken", count=3) is None
+
+    def test_metrics_exported(self):
+        from prometheus_client import REGISTRY
+
+        def sample(event):
+            labels = {"provider": "metrics-test", "event": event}
+            return REGISTRY.get_sample_value("search_cache_events_total", labels) or 0
+
+        cache = SearchCache(MemoryCache())
+        cache.get("metrics-test", "q")
+        with patch("config.Config.get_search_cache_ttl", return_value=60):
+            cache.set("metrics-test", "q", [{"title": "t"}])
+        cache.get("metrics-test", "q")
+
+        assert sample("miss") == 1
+        assert sample("hit") == 1
+
+    def test_sqlite_shared_between_processes(self, tmp_path):
+        """Test that a second cache on the same file sees the first one's entries."""
+        path = str(tmp_path / "shared.db")
+        worker_a = SearchCache(SQLiteCache(path, namespace="search"))
+        worker_b = SearchCache(SQLiteCache(path, namespace="search"))
+
+        worker_a.set("tavily", "ai chips", [{"title": "t"}], max_results=5, depth="basic")
+        assert worker_b.get("tavily", "AI chips", max_results=5, depth="basic") == [{"title": "t"}]
+
+
+class TestSearchIntegration:
+    """Test cases for cache use in search_web."""
+
+    @pytest.fixture
+    def cache(self):
+        from tools.ratelimit import TokenBucket, _limiters
+        from tools.search_cache import set_search_cache
+
+        cache = SearchCache(MemoryCache())
+        set_search_cache(cache)
+        unlimited = {name: TokenBucket(name, rate=1000, burst=1000) for name in ("brave", "tavily")}
+        with patch.dict(_limiters, unlimited):
+            yield cache
+        set_search_cache(None)
+
+    @pytest.mark.parametrize("status_code, permanent", [
+        (400, True), (403, True), (404, True), (408, False), (429, False), (500, False), (503, False), (None, False),
+    ])
+    def test_only_client_errors_are_permanent(self, status_code, permanent):
+        """Test that timeouts, throttling and server errors are treated as transient."""
+        import httpx
+        from tools.search import SearchError
+
+        assert is_permanent_failure(SearchError("failed", status_code)) is permanent
+        if status_code is not None:
+            response = httpx.Response(status_code, request=httpx.Request("GET", "https://api.test"))
+            error = httpx.HTTPStatusError("failed", request=response.request, response=response)
+            assert is_permanent_failure(error) is permanent
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("status_code, cached", [(503, False), (429, False), (None, False), (400, True)])
+    async def test_brave_failures_cached_only_when_permanent(self, cache, status_code, cached):
+        """Test that sync and async searches negatively cache the same failures."""
+        from tools.search import SearchError, _acached_search, _cached_search
+
+        error = SearchError("failed", status_code)
+        with patch("tools.search._request_search", side_effect=error), \
+                patch("tools.search._arequest_search", side_effect=error):
+            with pytest.raises(SearchError):
+                _cached_search("solar panels", 3)
+            assert (cache.get("brave", "solar panels", count=3) == []) is cached
+            with pytest.raises(SearchError):
+                await _acached_search("wind turbines", 3)
+            assert (cache.get("brave", "wind turbines", count=3) == []) is cached
+
+    @pytest.mark.asyncio
+    async def test_tavily_blip_is_not_cached(self, cache):
+        """Test that a transient Tavily failure is retried by the next session."""
+        import httpx
+        from config import Config
+        from tools.tavily import atavily_search
+
+        results = [{"title": "T", "url": "https://a.com", "content": "C"}]
+        with patch.object(Config, "TAVILY_API_KEY", "test-key"), \
+                patch("tools.tavily._arequest_tavily", side_effect=[httpx.ReadTimeout("slow"), results]) as request:
+            assert await atavily_search("EV market") == []
+            assert await atavily_search("EV market") == results
+            assert await atavily_search("EV market") == results
+        assert request.await_count == 2
+
+    def test_repeated_query_hits_cache(self):
+        from tools.search import search_web
+        from tools.search_cache import set_search_cache
+
+        response = '{"web": {"results": [{"title": "T", "url": "https://a.com", "description": "D"}]}}'
+        set_search_cache(SearchCache(MemoryCache()))
+        try:
+            with patch("tools.search._request_search", return_value=response) as mock_request:
+                first = search_web("Solar panels", count=3)
+                second = search_web("solar panels?", count=3)
+        finally:
+            set_search_cache(None)
+
+        assert first == second == [{"title": "T", "url": "https://a.com", "description": "D"}]
+        assert mock_request.call_count == 1
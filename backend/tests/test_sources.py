@@ -0,0 +1,130 @@
+"""Tests for search source canonicalization and deduplication."""
+
+import time
+
+import pytest
+
+from core.sources import SourceIndex, canonicalize_url, jaccard, minhash, shingles
+
+STORY = ("CATL and BYD together supplied more than half of all electric vehicle batteries "
+         "installed worldwide in 2024, according to new figures from SNE Research.")
+
+
+def result(url, description=STORY, title="Title"):
+    return {"url": url, "title": title, "description": description}
+
+
+class TestCanonicalizeUrl:
+    """Test cases for URL canonicalization."""
+
+    @pytest.mark.parametrize("variant", [
+        "https://www.example.com/news/ev-batteries/",
+        "http://example.com/news/ev-batteries?utm_source=x&utm_medium=y",
+        "https://EXAMPLE.com/news/ev-batteries#section-2",
+        "https://m.example.com/news/ev-batteries?fbclid=abc",
+        "https://example.com/news/ev-batteries/amp/",
+        "https://amp.example.com/news/ev-batteries?amp=1",
+        "https://example.com:443/news/ev-batteries",
+    ])
+    def test_variants_share_canonical_form(self, variant):
+        """Test that tracking, host, AMP and slash variants collapse to one URL."""
+        assert canonicalize_url(variant) == "https://example.com/news/ev-batteries"
+
+    def test_content_params_kept_and_sorted(self):
+        """Test that content-selecting parameters stay, in a stable order."""
+        assert canonicalize_url("https://example.com/search?q=ev&page=2&gclid=1") == \
+            "https://example.com/search?page=2&q=ev"
+
+    def test_amp_html_suffix(self):
+        """Test that .amp.html pages map to their .html original."""
+        assert canonicalize_url("https://example.com/story.amp.html") == "https://example.com/story.html"
+
+    def test_relative_and_bad_urls_returned_as_is(self):
+        """Test that strings that aren't absolute URLs are only stripped."""
+        assert canonicalize_url(" /local/path ") == "/local/path"
+        assert canonicalize_url("http://[bad") == "http://[bad"
+
+
+class TestSimilarity:
+    """Test cases for snippet shingles and MinHash signatures."""
+
+    def test_edited_copy_above_threshold(self):
+        """Test that a lightly edited copy stays similar and an unrelated story does not."""
+        edited = "Reuters: " + STORY.replace("according to new figures from", "per data from")
+        unrelated = ("Sodium-ion cells entered mass production in China this year, "
+                     "offering cheaper storage for entry-level vehicles and grid use.")
+        assert jaccard(shingles(STORY), shingles(STORY.upper())) == 1
+        assert jaccard(shingles(STORY), shingles(edited)) >= 0.5
+        assert jaccard(shingles(STORY), shingles(unrelated)) < 0.1
+
+    def test_minhash_agreement_tracks_similarity(self):
+        """Test that signatures of similar sets agree in more positions."""
+        original = minhash(shingles(STORY))
+        similar = minhash(shingles(STORY + " Shares rose."))
+        unrelated = minhash(shingles("Sodium-ion cells entered mass production in China this year."))
+        def agree(a, b):
+            return sum(x == y for x, y in zip(a, b))
+
+        assert agree(original, similar) > agree(original, unrelated)
+        assert original == minhash(shingles(STORY))
+
+    def test_short_text_not_compared(self):
+        """Test that snippets too short to be distinctive get no shingles."""
+        assert shingles("EV battery market") is None
+
+
+class TestSourceIndex:
+    """Test cases for cross-query source deduplication and ranking."""
+
+    def test_merges_url_variants(self):
+        """Test that the same page under another URL is dropped."""
+        index = SourceIndex()
+        assert index.add(0, [result("https://www.example.com/a/", "First snippet text about lithium prices.")])
+        assert index.add(1, [result("https://example.com/a?utm_source=feed", "Other text")]) == []
+        assert len(index) == 1
+
+    def test_merges_syndicated_copies(self):
+        """Test that the same story on another site counts as one source."""
+        index = SourceIndex()
+        index.add(0, [result("https://wire.com/release")])
+        copy = "Reuters: " + STORY.replace("more than half", "over 50%")
+        added = index.add(1, [result("https://news.com/copy", copy)])
+        assert added == []
+        assert [r["url"] for r in index.ranked()] == ["https://wire.com/release"]
+
+    def test_near_duplicates_can_be_disabled(self):
+        """Test that a similarity of 0 merges repeated URLs only."""
+        index = SourceIndex(similarity=0)
+        index.add(0, [result("https://wire.com/release"), result("https://news.com/copy")])
+        assert len(index) == 2
+
+    def test_ranked_round_robin(self):
+        """Test that each query's top result comes before any second result."""
+        index = SourceIndex()
+        index.add(1, [result("https://b.com/1", "b1"), result("https://b.com/2", "b2")])
+        index.add(0, [result("https://a.com/1", "a1"), result("https://a.com/2", "a2")])
+        assert [r["url"] for r in index.ranked()] == [
+            "https://a.com/1", "https://b.com/1", "https://a.com/2", "https://b.com/2"
+        ]
+
+    def test_duplicate_takes_better_rank(self):
+        """Test that a repeat ranked higher elsewhere promotes the kept copy."""
+        index = SourceIndex()
+        index.add(0, [result("https://a.com/1", "a1"), result("https://shared.com", "s")])
+        index.add(1, [result("https://shared.com/", "s")])
+        assert [r["url"] for r in index.ranked()] == ["https://a.com/1", "https://shared.com"]
+
+    def test_fast_on_hundreds_of_results(self):
+        """Test that indexing stays well under a millisecond per result."""
+        words = STORY.split()
+        results = [
+            result(f"https://site{i}.com/story-{i}?utm_campaign=x",
+                   " ".join(words[i % len(words):] + words[:i % len(words)]) + f" Report {i}.")
+            for i in range(500)
+        ]
+        index = SourceIndex()
+        start = time.perf_counter()
+        for query_index in range(5):
+            index.add(query_index, results[query_index * 100:(query_index + 1) * 100])
+        per_result = (time.perf_counter() - start) / len(results)
+        assert per_result < 0.001
@@ -0,0 +1,81 @@
+"""Tests for the SSE frame encoder."""
+
+import json
+import pytest
+
+from core import sse
+from core.sse import FragmentCache, PreEncoded, encode_frame, encode_json
+from core.state import send_sse_update
+
+
+def decode(frame: bytes):
+    """Parse one encoded frame into its fields, with data decoded from JSON."""
+    fields = dict(line.split(": ", 1) for line in frame.decode("utf-8").rstrip("\n").split("\n"))
+    fields["data"] = json.loads(fields["data"])
+    return fields
+
+
+class TestEncodeFrame:
+    """Test cases for encode_frame and encode_json."""
+
+    def test_matches_legacy_helper(self):
+        """Test that frames decode to the same event and data as send_sse_update."""
+        data = {"current_step": "analyst", "logs": ["🚀 started", "→ done"], "n": 1.5}
+
+        frame = encode_frame("state", data)
+
+        assert isinstance(frame, bytes)
+        assert frame.endswith(b"\n\n")
+        assert decode(frame) == decode(send_sse_update("state", data).encode("utf-8"))
+
+    def test_event_id_comes_first(self):
+        """Test that an event id is written on the first line."""
+        frame = encode_frame("patch", {"set": {}}, event_id=7)
+
+        assert frame.startswith(b"id: 7\nevent: patch\n")
+
+    def test_splices_nested_fragments(self):
+        """Test that PreEncoded values are inserted verbatim at any dict depth."""
+        fragment = PreEncoded(b'[{"title":"a"}]')
+        data = {"set": {"sources": fragment, "current_step": "researcher"}, "status": "ok"}
+
+        assert json.loads(encode_json(data)) == {
+            "set": {"sources": [{"title": "a"}], "current_step": "researcher"}, "status": "ok"
+        }
+
+    def test_stdlib_fallback_is_equivalent(self):
+        """Test that the stdlib backend decodes to the same value as the default one."""
+        data = {"text": "marché → 市場", "items": [1, None, True]}
+
+        assert json.loads(sse._stdlib_dumps(data)) == json.loads(sse.dumps(data))
+
+
+class TestFragmentCache:
+    """Test cases for cached list encoding."""
+
+    def test_grown_list_encodes_only_new_items(self, monkeypatch):
+        """Test that appending to a list reuses the earlier encoding."""
+        cache = FragmentCache()
+        logs = ["one", "two"]
+        cache.encode_list("logs", logs)
+
+        encoded = []
+        monkeypatch.setattr(sse, "dumps", lambda value: encoded.append(value) or json.dumps(value).encode())
+        logs.append("three")
+        result = cache.encode_list("logs", logs)
+
+        assert json.loads(result.data) == ["one", "two", "three"]
+        assert encoded == [["three"]]
+
+    @pytest.mark.parametrize("before, after", [
+        (["a", "b"], ["b", "a"]),
+        (["a", "b"], ["a"]),
+        ([], ["a"]),
+        (["a"], []),
+    ])
+    def test_other_changes_reencode(self, before, after):
+        """Test that reordered, shrunk or first-time lists encode correctly."""
+        cache = FragmentCache()
+        cache.encode_list("sources", before)
+
+        assert json.loads(cache.encode_list("sources", after).data) == after
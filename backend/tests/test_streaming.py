@@ -0,0 +1,252 @@
+"""Tests for cancelling work when an SSE client disconnects."""
+
+import asyncio
+import json
+import pytest
+
+from core import jobs
+from core.jobs import JOB_CANCELLED, JobManager
+from core.metrics import ACTIVE_SSE, SSE_DISCONNECTS
+from core.streaming import stream_until_disconnect
+
+
+def client(disconnect):
+    """ASGI receive channel that reports a disconnect once `disconnect` is set."""
+    async def receive():
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+    return receive
+
+
+def blocking_runner(started, cancelled):
+    """Fake orchestrator that sends one frame and then waits forever."""
+    async def runner(topic, research_depth, protocol, stream):
+        stream.state.logs.append("started")
+        yield stream.update()
+        started.set()
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+    return runner
+
+
+class TestStreamUntilDisconnect:
+    """Test cases for stream_until_disconnect."""
+
+    @pytest.mark.asyncio
+    async def test_relays_frames_to_completion(self):
+        """Test that a connected client gets every frame and nothing is counted as a disconnect."""
+        async def frames():
+            yield b"a"
+            yield b"b"
+
+        disconnects = SSE_DISCONNECTS._value.get()
+        chunks = [c async for c in stream_until_disconnect(frames(), client(asyncio.Event()))]
+
+        assert chunks == [b"a", b"b"]
+        assert SSE_DISCONNECTS._value.get() == disconnects
+        assert ACTIVE_SSE._value.get() == 0
+
+    @pytest.mark.asyncio
+    async def test_disconnect_cancels_pending_work(self):
+        """Test that a disconnect cancels the producer while it is awaiting, not at its next frame."""
+        cancelled = asyncio.Event()
+        disconnect = asyncio.Event()
+
+        async def frames():
+            yield b"first"
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            yield b"never"
+
+        disconnects = SSE_DISCONNECTS._value.get()
+        relay = stream_until_disconnect(frames(), client(disconnect))
+        assert await relay.__anext__() == b"first"
+        assert ACTIVE_SSE._value.get() == 1
+
+        disconnect.set()
+        remaining = [c async for c in relay]
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+
+        assert remaining == []
+        assert SSE_DISCONNECTS._value.get() == disconnects + 1
+        assert ACTIVE_SSE._value.get() == 0
+
+    @pytest.mark.asyncio
+    async def test_closing_relay_cancels_producer(self):
+        """Test that a server-side close (older ASGI servers) also stops the producer."""
+        cancelled = asyncio.Event()
+
+        async def frames():
+            yield b"first"
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        relay = stream_until_disconnect(frames(), client(asyncio.Event()))
+        await relay.__anext__()
+        await relay.aclose()
+
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+
+
+class TestAttachedJobs:
+    """Test cases for jobs that stop when their callers leave."""
+
+    @pytest.mark.asyncio
+    async def test_last_caller_leaving_cancels_job(self):
+        """Test that the job survives one caller leaving and stops with the last."""
+        started, cancelled = asyncio.Event(), asyncio.Event()
+        manager = JobManager(runner=blocking_runner(started, cancelled))
+        job, _ = manager.join_or_create("EV market", detached=False)
+        manager.join_or_create("EV market", detached=False)
+        first, second = job.subscribe(attached=True), job.subscribe(attached=True)
+        await first.__anext__()
+        await second.__anext__()
+
+        await first.aclose()
+        await asyncio.sleep(0.01)
+        assert not job.done
+
+        await second.aclose()
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        await asyncio.gather(job.task, return_exceptions=True)
+
+        info = job.to_dict()
+        assert info["status"] == JOB_CANCELLED
+        assert info["partial_result"]["sources"] == []
+        assert job.stream.state.logs == ["started"]
+        assert manager.admission.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_response_detaches_when_body_never_starts(self):
+        """Test that a caller gone before the response starts does not keep the job running."""
+        from starlette.requests import ClientDisconnect
+
+        from app import AttachedResponse
+
+        started, cancelled = asyncio.Event(), asyncio.Event()
+        manager = JobManager(runner=blocking_runner(started, cancelled))
+        job, _ = manager.join_or_create("EV market", detached=False)
+        response = AttachedResponse(job, stream_until_disconnect(job.subscribe(), client(asyncio.Event())))
+
+        async def send(message):
+            raise OSError("client went away")
+
+        with pytest.raises(ClientDisconnect):
+            await response({"type": "http", "asgi": {"spec_version": "2.4"}}, client(asyncio.Event()), send)
+
+        await asyncio.gather(job.task, return_exceptions=True)
+        assert job.status == JOB_CANCELLED
+        assert manager.admission.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_detached_joiner_keeps_job_running(self):
+        """Test that a /research/jobs caller joining an attached job keeps it alive."""
+        started, cancelled = asyncio.Event(), asyncio.Event()
+        manager = JobManager(runner=blocking_runner(started, cancelled))
+        job, _ = manager.join_or_create("EV market", detached=False)
+        manager.join_or_create("EV market")
+        subscription = job.subscribe(attached=True)
+        await subscription.__anext__()
+
+        await subscription.aclose()
+        await asyncio.sleep(0.01)
+
+        assert not job.done
+        assert not cancelled.is_set()
+        await manager.shutdown()
+
+
+    @pytest.mark.asyncio
+    async def test_retry_reuses_cancelled_job_work(self, mock_gemini_client):
+        """Test that retrying a cancelled topic does not repeat the LLM calls it finished."""
+        from unittest.mock import patch
+
+        import llm_client
+        from core.cache import MemoryCache
+        from llm_client import GeminiClient, LLMResponseCache
+
+        llm_client._client = GeminiClient(cache=LLMResponseCache(MemoryCache()))
+        searching, blocked = asyncio.Event(), True
+
+        async def search(query, count=10):
+            if blocked:
+                searching.set()
+                await asyncio.Event().wait()
+            return [{"title": query, "url": f"https://example.com/{query}", "description": "d"}]
+
+        manager = JobManager()
+        with patch("core.orchestrator.asearch_web", side_effect=search):
+            job, _ = manager.join_or_create("EV market", detached=False)
+            subscription = job.subscribe(attached=True)
+            await subscription.__anext__()
+            await asyncio.wait_for(searching.wait(), timeout=1)
+            await subscription.aclose()
+            await asyncio.gather(job.task, return_exceptions=True)
+            assert job.status == JOB_CANCELLED
+            made = mock_gemini_client.aio.models.generate_content.await_count
+
+            blocked = False
+            retry, joined = manager.join_or_create("EV market", detached=False)
+            assert not joined
+            await asyncio.wait_for(retry.task, timeout=5)
+
+        prompts = [call.kwargs["contents"] for call in mock_gemini_client.aio.models.generate_content.await_args_list]
+        assert made == 2 and len(prompts) > made
+        assert not any(p.startswith(("You are 'The Strategist'", "Extract 3-5")) for p in prompts[made:])
+
+
+class TestResearchDisconnect:
+    """Test cases for /research when the client goes away mid-stream."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_manager(self):
+        yield
+        jobs._manager = None
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("coalesce", [True, False])
+    async def test_disconnect_cancels_pipeline(self, coalesce):
+        """Test that closing the connection cancels the pipeline behind /research."""
+        from unittest.mock import patch
+        from app import app
+        from config import Config
+
+        started, cancelled = asyncio.Event(), asyncio.Event()
+        runner = blocking_runner(started, cancelled)
+        jobs._manager = JobManager(runner=runner)
+        body = json.dumps({"topic": "EV market", "protocol": 2}).encode()
+        requests = [{"type": "http.request", "body": body, "more_body": False}]
+        sent = []
+
+        async def receive():
+            if requests:
+                return requests.pop(0)
+            await started.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1",
+            "method": "POST", "path": "/research", "raw_path": b"/research", "root_path": "",
+            "scheme": "http", "query_string": b"", "server": ("test", 80), "client": ("test", 1234),
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        }
+        orchestrator = "app.perform_market_research_stream"
+        with patch.object(Config, "COALESCE_REQUESTS", coalesce), \
+                patch(orchestrator, side_effect=lambda t, d, p, stream: runner(t, d, p, stream)):
+            await asyncio.wait_for(app(scope, receive, send), timeout=2)
+            await asyncio.wait_for(cancelled.wait(), timeout=1)
+
+        assert sent[0]["status"] == 200
+        assert b"started" in b"".join(m.get("body", b"") for m in sent)
@@ -0,0 +1,233 @@
+"""Tests for session tracing and trace exporters."""
+
+import asyncio
+import json
+import threading
+from http.server import ThreadingHTTPServer
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from core.tracing import (
+    NOOP_SPAN,
+    JsonlExporter,
+    MemoryExporter,
+    OtlpExporter,
+    Tracer,
+    _collector_handler,
+    format_waterfall,
+    from_otlp,
+    set_tracer,
+    span,
+    start_trace,
+    to_otlp,
+    waterfall,
+)
+from tests.test_orchestrator import parse_events
+
+
+@pytest.fixture
+def memory():
+    """Trace into a fresh in-memory exporter."""
+    exporter = MemoryExporter()
+    set_tracer(Tracer([exporter]))
+    yield exporter
+    set_tracer(None)
+
+
+def by_name(spans):
+    return {s["name"]: s for s in spans}
+
+
+class TestSpans:
+    """Test cases for span nesting, status and export."""
+
+    def test_no_trace_is_noop(self, memory):
+        """Test that spans outside a trace record nothing."""
+        with span("orphan") as s:
+            s.set(ignored=True)
+        assert s is NOOP_SPAN
+
+    def test_disabled_tracer_is_noop(self):
+        """Test that start_trace returns a no-op span without exporters."""
+        set_tracer(Tracer([]))
+        try:
+            assert start_trace("research") is NOOP_SPAN
+        finally:
+            set_tracer(None)
+
+    def test_nesting_and_export_on_root_end(self, memory):
+        """Test that children link to their parents and the trace exports when the root ends."""
+        root = start_trace("research", topic="EV")
+        with span("stage.analyst", parent=root):
+            with span("llm.generate", prompt_chars=10) as call:
+                call.set(cache_hit=False)
+        assert memory.get(root.trace_id) is None
+
+        root.end()
+        spans = by_name(memory.get(root.trace_id))
+        assert spans["research"]["parent_id"] is None
+        assert spans["stage.analyst"]["parent_id"] == spans["research"]["span_id"]
+        assert spans["llm.generate"]["parent_id"] == spans["stage.analyst"]["span_id"]
+        assert spans["llm.generate"]["attributes"] == {"prompt_chars": 10, "cache_hit": False}
+
+    def test_error_and_handled_failure(self, memory):
+        """Test that raised errors and `fail` both end the span with status error."""
+        root = start_trace("research")
+        with pytest.raises(ValueError):
+            with span("search", parent=root):
+                raise ValueError("provider down")
+        with span("fetch", parent=root) as fetch:
+            fetch.fail("404")
+        root.end()
+
+        spans = by_name(memory.get(root.trace_id))
+        assert spans["search"]["status"] == "error"
+        assert spans["search"]["attributes"]["error"] == "provider down"
+        assert spans["fetch"]["status"] == "error"
+
+    @pytest.mark.asyncio
+    async def test_tasks_inherit_span_and_cancel(self, memory):
+        """Test that a task started inside a span is its child and cancellation is recorded."""
+        root = start_trace("research")
+
+        async def slow():
+            with span("fetch"):
+                await asyncio.sleep(10)
+
+        with span("stage.reader", parent=root):
+            task = asyncio.create_task(slow())
+            await asyncio.sleep(0)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        root.end()
+
+        spans = by_name(memory.get(root.trace_id))
+        assert spans["fetch"]["parent_id"] == spans["stage.reader"]["span_id"]
+        assert spans["fetch"]["status"] == "cancelled"
+
+    def test_memory_exporter_is_bounded(self):
+        """Test that the oldest traces are evicted."""
+        exporter = MemoryExporter(max_traces=2)
+        for trace_id in ("a", "b", "c"):
+            exporter.export([{"trace_id": trace_id}])
+        assert exporter.get("a") is None
+        assert exporter.get("c") is not None
+
+
+class TestResearchTrace:
+    """Test cases for tracing a research session."""
+
+    @pytest.mark.asyncio
+    async def test_session_trace(self, memory, mock_gemini_client):
+        """Test that the first event carries the trace id and the trace covers stages, searches and LLM calls."""
+        from core.orchestrator import perform_market_research_stream
+
+        async def search(query, count=10):
+            return [{"title": query, "url": f"https://example.com/{query}", "description": "d"}]
+
+        mock_gemini_client.aio.models.generate_content.return_value.text = "EV demand\nEV supply"
+        with patch("core.orchestrator.asearch_web", side_effect=search):
+            events = parse_events([f async for f in perform_market_research_stream("EV market", 1, 2)])
+
+        trace_id = events[0][1]["trace_id"]
+        assert all("trace_id" not in data for _, data in events[1:])
+        rows = waterfall(memory.get(trace_id))
+        names = [r["name"] for r in rows]
+        assert rows[0]["name"] == "research" and rows[0]["depth"] == 0
+        assert {"stage.strategist", "stage.researcher", "stage.analyst", "stage.synthesizer"} <= set(names)
+
+        searches = [r for r in rows if r["name"] == "search"]
+        assert len(searches) == 2
+        assert all(r["depth"] == 2 and r["attributes"]["provider"] == "brave" for r in searches)
+        assert any(r["name"] == "llm.stream" for r in rows)
+        llm = next(r for r in rows if r["name"] == "llm.generate")
+        assert llm["attributes"]["prompt_chars"] > 0
+        assert "cache_hit" in llm["attributes"]
+
+    def test_trace_endpoint(self, memory):
+        """Test that GET /traces/{id} returns a recent trace as a waterfall."""
+        from app import app
+
+        root = start_trace("research")
+        with span("stage.strategist", parent=root):
+            pass
+        root.end()
+
+        client = TestClient(app)
+        response = client.get(f"/traces/{root.trace_id}")
+        assert response.status_code == 200
+        assert [r["depth"] for r in response.json()["spans"]] == [0, 1]
+        assert client.get("/traces/unknown").status_code == 404
+
+
+class TestExporters:
+    """Test cases for the JSONL and OTLP exporters."""
+
+    def spans(self):
+        tracer = Tracer([MemoryExporter()])
+        set_tracer(tracer)
+        try:
+            root = start_trace("research", topic="EV")
+            with span("llm.generate", parent=root, prompt_tokens=1200, cache_hit=True, ratio=0.5):
+                pass
+            root.end()
+        finally:
+            set_tracer(None)
+        return tracer.exporters[0].get(root.trace_id)
+
+    def test_jsonl_and_waterfall_text(self, tmp_path):
+        """Test that spans are appended as JSON lines and render as a waterfall."""
+        path = tmp_path / "traces.jsonl"
+        spans = self.spans()
+        JsonlExporter(str(path)).export(spans)
+
+        lines = [json.loads(line) for line in path.read_text().splitlines()]
+        assert lines == spans
+        text = format_waterfall(waterfall(lines))
+        assert text.splitlines()[0].startswith("research")
+        assert text.splitlines()[1].startswith("  llm.generate")
+
+    def test_otlp_round_trip(self):
+        """Test that the OTLP JSON encoding decodes back to the same spans."""
+        spans = self.spans()
+        payload = to_otlp(spans, "market-analyst-agent")
+        otlp_spans = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        otlp_span = next(s for s in otlp_spans if s["name"] == "llm.generate")
+        assert {"key": "prompt_tokens", "value": {"intValue": "1200"}} in otlp_span["attributes"]
+        assert from_otlp(payload) == spans
+
+    def test_otlp_exporter_posts_to_collector(self):
+        """Test that the exporter posts to /v1/traces from its worker thread."""
+        received = []
+
+        def handler(request):
+            received.append((request.url.path, json.loads(request.content)))
+            return httpx.Response(200, json={})
+
+        exporter = OtlpExporter("http://collector:4318/", "svc", client=httpx.Client(transport=httpx.MockTransport(handler)))
+        exporter.export(self.spans())
+        exporter.shutdown()
+
+        path, payload = received[0]
+        assert path == "/v1/traces"
+        assert len(from_otlp(payload)) == 2
+
+    def test_collector_stand_in(self, tmp_path):
+        """Test that the local collector accepts OTLP posts and writes JSONL."""
+        path = tmp_path / "collected.jsonl"
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _collector_handler(JsonlExporter(str(path))))
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            spans = self.spans()
+            exporter = OtlpExporter(f"http://127.0.0.1:{server.server_address[1]}", "svc")
+            exporter.export(spans)
+            exporter.shutdown()
+        finally:
+            server.shutdown()
+
+        assert [json.loads(line) for line in path.read_text().splitlines()] == spans
@@ -0,0 +1,126 @@
+"""Tests for LLM token accounting and session budgets."""
+
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from core.metrics import LLM_TOKENS
+from core.context import TRUNCATION_MARK, estimate_tokens
+from core.usage import MIN_CONTEXT_TOKENS, TokenUsage, llm_role, record_usage, track_session
+
+
+def usage_metadata(prompt, response):
+    return SimpleNamespace(prompt_token_count=prompt, candidates_token_count=response)
+
+
+class TestTokenUsage:
+    """Test cases for per-session totals and budget checks."""
+
+    def test_totals_by_role(self):
+        """Test that calls add up overall and per role."""
+        usage = TokenUsage()
+        with track_session(usage):
+            with llm_role("analyst"):
+                record_usage("gemini-test", usage_metadata(100, 20))
+                record_usage("gemini-test", usage_metadata(50, 10))
+            record_usage("gemini-test", usage_metadata(5, 5))
+
+        data = usage.to_dict()
+        assert data["total_tokens"] == 190
+        assert data["by_role"]["analyst"] == {"prompt_tokens": 150, "response_tokens": 30, "calls": 2}
+        assert data["by_role"]["other"]["calls"] == 1
+        assert "budget" not in data
+
+    def test_records_metrics_by_model_and_role(self):
+        """Test that the Prometheus counter is labelled by model, role and kind."""
+        counter = LLM_TOKENS.labels(model="gemini-metrics", role="strategist", kind="prompt")
+        before = counter._value.get()
+
+        with llm_role("strategist"):
+            record_usage("gemini-metrics", usage_metadata(42, 7))
+
+        assert counter._value.get() == before + 42
+
+    def test_fit_trims_to_remaining_budget(self):
+        """Test that context is cut to the budget share but never below the floor."""
+        usage = TokenUsage(budget=20000)
+        usage.add("researcher", 16000, 0)
+        text = "Battery demand grew again. " * 2000
+
+        fitted = usage.fit(text)
+        assert 1800 < estimate_tokens(fitted) <= 2000
+        assert fitted.endswith("again." + TRUNCATION_MARK)
+        assert TokenUsage().fit(text) == text
+        usage.add("researcher", 5000, 0)
+        assert usage.exhausted
+        assert MIN_CONTEXT_TOKENS * 0.9 < estimate_tokens(usage.fit(text)) <= MIN_CONTEXT_TOKENS
+
+
+class TestClientUsage:
+    """Test cases for usage capture in GeminiClient."""
+
+    @pytest.mark.asyncio
+    async def test_agenerate_records_usage(self, mock_gemini_client):
+        """Test that an uncached call is counted against the active session."""
+        from llm_client import GeminiClient
+
+        mock_gemini_client.aio.models.generate_content.return_value.usage_metadata = usage_metadata(30, 12)
+        usage = TokenUsage()
+        with track_session(usage), llm_role("strategist"):
+            await GeminiClient().agenerate("prompt")
+
+        assert usage.by_role["strategist"] == {"prompt_tokens": 30, "response_tokens": 12, "calls": 1}
+
+    @pytest.mark.asyncio
+    async def test_astream_uses_final_chunk_usage(self, mock_gemini_client):
+        """Test that a streamed call is counted once, from the last chunk's totals."""
+        from llm_client import GeminiClient
+
+        async def stream(*args, **kwargs):
+            for i, text in enumerate(["a", "b", "c"]):
+                yield MagicMock(text=text, usage_metadata=usage_metadata(10, i + 1) if i else None)
+
+        mock_gemini_client.aio.models.generate_content_stream.side_effect = lambda *a, **kw: stream()
+        usage = TokenUsage()
+        with track_session(usage):
+            text = "".join([chunk async for chunk in GeminiClient().astream("prompt")])
+
+        assert text == "abc"
+        assert (usage.prompt_tokens, usage.response_tokens, usage.calls) == (10, 3, 1)
+
+
+class TestSessionBudget:
+    """Test cases for budget-driven degradation in the orchestrator."""
+
+    @pytest.mark.asyncio
+    async def test_exhausted_budget_skips_charts(self, mock_gemini_client, mock_brave_search):
+        """Test that charts are skipped once the budget is spent and totals reach the complete event."""
+        from config import Config
+        from tests.test_orchestrator import parse_events, run_pipeline
+
+        mock_gemini_client.aio.models.generate_content.return_value.usage_metadata = usage_metadata(100, 50)
+        with patch.object(Config, "SESSION_TOKEN_BUDGET", 300), \
+                patch("core.orchestrator.generate_chart_data") as charts:
+            events = parse_events(await run_pipeline(protocol=1))
+
+        complete = events[-1][1]
+        usage = complete["usage"]
+        assert complete["status"] == "success"
+        charts.assert_not_called()
+        assert "skipped charts" in usage["degraded"]
+        assert usage["by_role"]["strategist"]["calls"] == 1
+        assert usage["by_role"]["researcher"]["calls"] == 2
+        assert usage["total_tokens"] == 450
+        assert any("skipping charts" in log for log in events[-2][1]["logs"])
+
+    @pytest.mark.asyncio
+    async def test_unbudgeted_session_reports_usage(self, mock_gemini_client, mock_brave_search):
+        """Test that sessions without a budget still report their totals."""
+        from tests.test_orchestrator import parse_events, run_pipeline
+
+        mock_gemini_client.aio.models.generate_content.return_value.usage_metadata = usage_metadata(10, 5)
+        events = parse_events(await run_pipeline(protocol=2))
+
+        usage = events[-1][1]["usage"]
+        assert usage["total_tokens"] > 0
+        assert "degraded" not in usage
@@ -0,0 +1,196 @@
+"""Tests for multi-worker serving: shutdown drain, per-worker limits and multiprocess metrics."""
+
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from config import Config
+from core.drain import RESTART_FRAME, Drain, get_drain, set_drain
+from core.metrics import ACTIVE_SSE, SSE_DISCONNECTS, SSE_DRAINED, mark_worker_dead, metrics_registry
+from core.streaming import stream_until_disconnect
+from tests.test_streaming import blocking_runner, client
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def drain():
+    """A fresh drain state for the test."""
+    state = Drain()
+    set_drain(state)
+    yield state
+    set_drain(None)
+
+
+class TestDrain:
+    """Test cases for draining a stopping worker."""
+
+    @pytest.mark.asyncio
+    async def test_open_stream_ends_with_restart_frame(self, drain):
+        """Test that a stream still running after the grace period ends with a retryable error."""
+        cancelled = asyncio.Event()
+
+        async def frames():
+            yield b"first"
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        drained, disconnects = SSE_DRAINED._value.get(), SSE_DISCONNECTS._value.get()
+        relay = stream_until_disconnect(frames(), client(asyncio.Event()))
+        assert await relay.__anext__() == b"first"
+
+        drain.begin(0.05)
+        assert [c async for c in relay] == [RESTART_FRAME]
+        assert cancelled.is_set()
+        assert SSE_DRAINED._value.get() == drained + 1
+        assert SSE_DISCONNECTS._value.get() == disconnects
+        assert ACTIVE_SSE._value.get() == 0
+
+    @pytest.mark.asyncio
+    async def test_stream_finishing_within_grace_is_untouched(self, drain):
+        """Test that a stream that ends before the deadline ends normally."""
+        async def frames():
+            yield b"a"
+            await asyncio.sleep(0.05)
+            yield b"b"
+
+        drain.begin(1)
+        chunks = [c async for c in stream_until_disconnect(frames(), client(asyncio.Event()))]
+        assert chunks == [b"a", b"b"]
+
+    @pytest.mark.asyncio
+    async def test_signal_begins_drain_and_chains(self, drain):
+        """Test that SIGTERM starts the drain and still reaches the server's own handler."""
+        received = []
+        previous = signal.signal(signal.SIGTERM, lambda sig, frame: received.append(sig))
+        try:
+            drain.install(5)
+            os.kill(os.getpid(), signal.SIGTERM)
+            await asyncio.sleep(0.05)
+            drain.uninstall()
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+
+        assert received == [signal.SIGTERM]
+        assert drain.draining
+        assert 4 < drain.remaining() <= 5
+
+    def test_draining_worker_refuses_new_research(self, drain):
+        """Test that readiness and new research requests get 503 while draining."""
+        from app import app
+
+        test_client = TestClient(app)
+        assert test_client.get("/health/ready").status_code == 200
+
+        drain.deadline = time.monotonic() + 10
+        assert test_client.get("/health/ready").status_code == 503
+        for path, body in (("/research", {"topic": "EV"}), ("/research/jobs", {"topic": "EV"}),
+                           ("/research/batch", {"topics": ["EV"]})):
+            response = test_client.post(path, json=body)
+            assert response.status_code == 503
+            assert response.headers["Retry-After"] == "5"
+        assert test_client.get("/health").status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_jobs_get_the_grace_period(self):
+        """Test that shutdown waits for jobs up to the grace period, then cancels them."""
+        from core.jobs import JOB_CANCELLED, JobManager
+
+        async def quick(topic, research_depth, protocol, stream):
+            await asyncio.sleep(0.05)
+            yield stream.update()
+
+        finished = JobManager(runner=quick)
+        job, _ = finished.join_or_create("EV market")
+        await finished.shutdown(grace=1)
+        assert job.status != JOB_CANCELLED
+
+        started, cancelled = asyncio.Event(), asyncio.Event()
+        stuck = JobManager(runner=blocking_runner(started, cancelled))
+        stuck.join_or_create("EV market")
+        await started.wait()
+        begin = time.monotonic()
+        await stuck.shutdown(grace=0.1)
+        assert cancelled.is_set()
+        assert time.monotonic() - begin < 1
+
+    def test_global_drain_is_idle(self):
+        """Test that a worker that was never signalled is not draining."""
+        set_drain(None)
+        assert not get_drain().draining
+        assert get_drain().remaining() == 0
+
+
+class TestPerWorkerLimits:
+    """Test cases for splitting server-wide limits between workers."""
+
+    @pytest.mark.parametrize("workers, limit, share", [(1, 8, 8), (3, 8, 3), (4, 1, 1), (4, 0, 0)])
+    def test_per_worker(self, workers, limit, share):
+        """Test that shares round up, never reach 0 and leave 0 (unlimited) alone."""
+        with patch.object(Config, "WORKERS", workers):
+            assert Config.per_worker(limit) == share
+
+    def test_admission_defaults_use_share(self):
+        """Test that the admission controller enforces this worker's share."""
+        from core.admission import LANE_INTERACTIVE, AdmissionController
+
+        with patch.object(Config, "WORKERS", 4), patch.object(Config, "ADMISSION_MAX_IN_FLIGHT", 8), \
+                patch.object(Config, "ADMISSION_QUEUE_SIZE", 32):
+            controller = AdmissionController()
+        assert controller.max_in_flight == 2
+        assert controller.queue_sizes[LANE_INTERACTIVE] == 8
+
+    def test_prepare_workers_shares_state(self, tmp_path):
+        """Test that workers get a clean metrics directory and shared rate-limit and cache files."""
+        from main import prepare_workers
+
+        metrics_dir = tmp_path / "metrics"
+        metrics_dir.mkdir()
+        (metrics_dir / "counter_123.db").write_bytes(b"stale")
+        keys = ("PROMETHEUS_MULTIPROC_DIR", "WORKERS", "RATE_LIMIT_DB_PATH", "SEARCH_CACHE_PATH")
+        with patch.object(Config, "WORKER_STATE_DIR", str(tmp_path)), patch.dict(os.environ, {"SEARCH_CACHE_PATH": "/data/cache.db"}):
+            prepare_workers(3)
+            env = {key: os.environ.get(key) for key in keys}
+
+        assert env == {
+            "PROMETHEUS_MULTIPROC_DIR": str(metrics_dir),
+            "WORKERS": "3",
+            "RATE_LIMIT_DB_PATH": str(tmp_path / "ratelimit.db"),
+            "SEARCH_CACHE_PATH": "/data/cache.db",
+        }
+        assert list(metrics_dir.iterdir()) == []
+
+
+class TestMultiprocessMetrics:
+    """Test cases for aggregating metrics across worker processes."""
+
+    def test_values_aggregate_across_processes(self, tmp_path):
+        """Test that counters sum over workers and gauges over live workers."""
+        env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+        script = (
+            "import os; from core.metrics import REQUESTS_TOTAL, ACTIVE_SSE, EVENT_LOOP_LAG;"
+            "REQUESTS_TOTAL.labels(status='success').inc(); ACTIVE_SSE.inc(); EVENT_LOOP_LAG.observe(0.003);"
+            "print(os.getpid())"
+        )
+        pids = [int(subprocess.run([sys.executable, "-c", script], cwd=BACKEND, env=env, check=True,
+                                   capture_output=True, text=True).stdout) for _ in range(2)]
+
+        with patch.dict(os.environ, {"PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}):
+            registry = metrics_registry()
+            assert registry.get_sample_value("research_requests_total", {"status": "success"}) == 2
+            assert registry.get_sample_value("active_sse_connections") == 2
+            assert registry.get_sample_value("event_loop_lag_seconds_count") == 2
+
+            mark_worker_dead(pids[0])
+            assert metrics_registry().get_sample_value("active_sse_connections") == 1
+            assert metrics_registry().get_sample_value("research_requests_total", {"status": "success"}) == 2
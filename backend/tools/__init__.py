@@ -1,8 +1,19 @@
 """
 Tools package for market research data collection.
+
+`search_web` and `fetch_document` are imported on first use, so processes
+that only need one tool module (the tools.extract worker pool) don't load
+the search clients and their metrics.
 """
 
-from .search import search_web
-from .fetch import fetch_document
+import importlib
+
+_EXPORTS = {'search_web': '.search', 'fetch_document': '.fetch'}
+
+__all__ = list(_EXPORTS)
+
 
-__all__ = ['search_web', 'fetch_document']
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,7 +2,31 @@
 import json
 from llm_client import get_gemini_client
 
-def generate_chart_data(research_data: str, topic: str) -> dict:
+
+def parse_chart_response(response: str) -> dict:
+    """
+    Parses the chart JSON out of a model response, fenced or bare.
+
+    Raises ValueError (json.JSONDecodeError) when no valid JSON is found.
+    """
+    # Clean JSON
+    if "```json" in response:
+        json_str = response.split("```json")[1].split("```")[0].strip()
+    elif "```" in response:
+        json_str = response.split("```")[1].split("```")[0].strip()
+    else:
+        json_str = response.strip()
+
+    data = json.loads(json_str)
+
+    # Validate structure
+    if "charts" not in data:
+        data = {"charts": []}
+
+    return data
+
+
+async def generate_chart_data(research_data: str, topic: str) -> dict:
     """
     Analyzes research data and extracts structured JSON for frontend charts.
     Returns a dictionary containing a list of chart configurations.
@@ -58,23 +82,8 @@ def generate_chart_data(research_data: str, topic: str) -> dict:
     """
     
     try:
-        response = client.generate(prompt, temperature=0.1)
-        
-        # Clean JSON
-        if "```json" in response:
-            json_str = response.split("```json")[1].split("```")[0].strip()
-        elif "```" in response:
-            json_str = response.split("```")[1].split("```")[0].strip()
-        else:
-            json_str = response.strip()
-            
-        data = json.loads(json_str)
-        
-        # Validate structure
-        if "charts" not in data:
-            data = {"charts": []}
-            
-        return data
+        response = await client.agenerate(prompt, temperature=0.1)
+        return parse_chart_response(response)
         
     except Exception as e:
         print(f"Error generating chart data: {e}")
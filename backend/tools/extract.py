@@ -0,0 +1,169 @@
+"""
+Main-content extraction from HTML pages.
+
+Two interchangeable extractors produce the same kind of output (the text
+of the main content area, one stripped line per text node):
+
+- "lxml": libxml2 parser with precompiled XPath selectors (default, fast)
+- "soup": BeautifulSoup with the stdlib html.parser (fallback)
+
+If the lxml path fails or finds almost nothing, extraction falls back to
+BeautifulSoup. `aextract_main_text` runs large pages in a process pool so
+parsing never holds the event loop. The pool starts on the first large
+page, with workers started by forkserver (spawn where unavailable) rather
+than forked from the server, whose threads and open connections they must
+not inherit.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+from bs4 import BeautifulSoup
+from lxml import etree, html as lxml_html
+
+from config import Config
+
+# Boilerplate elements removed before extraction
+BOILERPLATE_TAGS = ['script', 'style', 'nav', 'footer', 'header', 'aside']
+
+# Main content containers, in priority order
+MAIN_SELECTORS = ['main', 'article', '[role="main"]', '.content', '#content', '.post', '.entry-content']
+
+MIN_TEXT_CHARS = 50
+
+
+def _clean_lines(pieces) -> str:
+    return '\n'.join(piece.strip() for piece in pieces if piece.strip())
+
+
+class SoupExtractor:
+    """BeautifulSoup extractor (html.parser backend)."""
+
+    name = "soup"
+
+    def extract(self, content: bytes) -> str:
+        soup = BeautifulSoup(content, 'html.parser')
+
+        # Remove script and style elements
+        for element in soup(BOILERPLATE_TAGS):
+            element.decompose()
+
+        # Extract text from main content areas (prioritize)
+        main_content = None
+        for selector in MAIN_SELECTORS:
+            main_content = soup.select_one(selector)
+            if main_content:
+                break
+
+        root = main_content if main_content else soup
+        return _clean_lines(root.get_text(separator='\n').split('\n'))
+
+
+class LxmlExtractor:
+    """lxml extractor with the selectors compiled to XPath once."""
+
+    name = "lxml"
+
+    _SELECTORS = [
+        etree.XPath(xpath) for xpath in (
+            '//main',
+            '//article',
+            '//*[@role="main"]',
+            '//*[contains(concat(" ", normalize-space(@class), " "), " content ")]',
+            '//*[@id="content"]',
+            '//*[contains(concat(" ", normalize-space(@class), " "), " post ")]',
+            '//*[contains(concat(" ", normalize-space(@class), " "), " entry-content ")]',
+        )
+    ]
+
+    def extract(self, content: bytes) -> str:
+        tree = lxml_html.fromstring(content)
+        etree.strip_elements(tree, etree.Comment, *BOILERPLATE_TAGS, with_tail=False)
+
+        root = tree
+        for selector in self._SELECTORS:
+            matches = selector(tree)
+            if matches:
+                root = matches[0]
+                break
+
+        return _clean_lines(root.itertext())
+
+
+EXTRACTORS: Dict[str, object] = {
+    LxmlExtractor.name: LxmlExtractor(),
+    SoupExtractor.name: SoupExtractor(),
+}
+
+
+def extract_main_text(content: bytes, extractor: Optional[str] = None) -> str:
+    """
+    Extract the main readable text of an HTML document.
+
+    Args:
+        content: Raw HTML bytes
+        extractor: Extractor name (defaults to Config.HTML_EXTRACTOR)
+
+    Returns:
+        Cleaned text, one line per text block
+    """
+    name = extractor or Config.HTML_EXTRACTOR
+    primary = EXTRACTORS.get(name)
+    if primary is None:
+        raise ValueError(f"Unknown HTML extractor: {name}")
+
+    try:
+        text = primary.extract(content)
+        if len(text) >= MIN_TEXT_CHARS or primary is EXTRACTORS["soup"]:
+            return text
+    except Exception as e:
+        if primary is EXTRACTORS["soup"]:
+            raise
+        print(f"⚠️ {name} extraction failed, falling back to BeautifulSoup: {e}")
+
+    return EXTRACTORS["soup"].extract(content)
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _pool_size() -> int:
+    # Auto-sizing shares the CPUs between the server's worker processes
+    return Config.EXTRACT_WORKERS or Config.per_worker(min(4, os.cpu_count() or 1))
+
+
+def _mp_context():
+    # A forked child could inherit locks held by the server's threads
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=_pool_size(), mp_context=_mp_context())
+    return _pool
+
+
+async def aextract_main_text(content: bytes, extractor: Optional[str] = None) -> str:
+    """
+    Async `extract_main_text` that keeps parsing off the event loop.
+
+    Pages of at least Config.EXTRACT_PROCESS_MIN_BYTES go to a process pool;
+    smaller ones aren't worth the pickling cost and run in a thread.
+    """
+    if len(content) >= Config.EXTRACT_PROCESS_MIN_BYTES:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_pool(), extract_main_text, content, extractor)
+    return await asyncio.to_thread(extract_main_text, content, extractor)
+
+
+def shutdown_extract_pool() -> None:
+    """Stop extraction worker processes; called on application shutdown."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
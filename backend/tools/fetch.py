@@ -1,33 +1,72 @@
 """
 Document fetching and content extraction.
-Downloads web pages and extracts main content using BeautifulSoup.
+Downloads web pages and extracts main content (see tools.extract).
 """
 
-import requests
-from bs4 import BeautifulSoup
-from typing import Optional
+import asyncio
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from urllib.parse import urlparse
 
+import httpx
+import requests
+
+from config import Config
+from core.tracing import span
+from .extract import aextract_main_text, extract_main_text
+from .http import get_async_client, get_sync_session
+
+# Set headers to mimic a browser
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1'
+}
+
 
 class FetchError(Exception):
     """Exception raised for document fetching errors."""
     pass
 
 
-def fetch_document(url: str, max_size_kb: int = 500) -> str:
+class BodyBuffer:
     """
-    Fetch and extract main content from a URL.
+    Size-capped response body buffer.
 
-    Args:
-        url: URL to fetch
-        max_size_kb: Maximum document size in KB (default 500KB)
+    Preallocates from Content-Length when known and grows by doubling
+    otherwise, so appending chunks is linear in document size. Writing past
+    the cap raises FetchError immediately, aborting the download.
+    """
 
-    Returns:
-        Extracted text content from the page
+    def __init__(self, max_bytes: int, expected: Optional[int] = None):
+        self.max_bytes = max_bytes
+        initial = expected if expected else 64 * 1024
+        self._buffer = bytearray(min(initial, max_bytes))
+        self._size = 0
 
-    Raises:
-        FetchError: If fetching fails or URL is invalid
-    """
+    def write(self, chunk: bytes) -> None:
+        end = self._size + len(chunk)
+        if end > self.max_bytes:
+            raise FetchError(f"Document exceeded size limit while downloading (max {self.max_bytes // 1024}KB)")
+        if end > len(self._buffer):
+            grow_to = min(max(end, len(self._buffer) * 2), self.max_bytes)
+            self._buffer.extend(bytes(grow_to - len(self._buffer)))
+        self._buffer[self._size:end] = chunk
+        self._size = end
+
+    def getvalue(self) -> bytes:
+        return bytes(memoryview(self._buffer)[:self._size])
+
+    def __len__(self) -> int:
+        return self._size
+
+
+def _validate_url(url: str) -> None:
+    """Raise ValueError unless `url` is a well-formed http(s) URL."""
     # Input validation
     if not url or not url.strip():
         raise ValueError("URL cannot be empty")
@@ -44,93 +83,108 @@ def fetch_document(url: str, max_size_kb: int = 500) -> str:
     if parsed.scheme not in ['http', 'https']:
         raise ValueError(f"Unsupported URL scheme: {parsed.scheme}. Only http/https allowed.")
 
-    try:
-        # Set headers to mimic a browser
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1'
-        }
 
+def _check_content_length(headers, max_size_kb: int) -> Optional[int]:
+    """Reject documents whose declared size is over the cap; return the declared size."""
+    content_length = headers.get('content-length')
+    if content_length and int(content_length) > max_size_kb * 1024:
+        raise FetchError(f"Document too large: {int(content_length) / 1024:.1f}KB (max {max_size_kb}KB)")
+    return int(content_length) if content_length else None
+
+
+def _status_error(status_code: int, url: str) -> FetchError:
+    if status_code == 404:
+        return FetchError(f"Document not found (404): {url}")
+    elif status_code == 403:
+        return FetchError(f"Access forbidden (403): {url}")
+    elif status_code == 429:
+        return FetchError(f"Rate limited (429): {url}")
+    return FetchError(f"HTTP error {status_code}: {url}")
+
+
+def _non_html_note(content: bytes, url: str, content_type: str) -> str:
+    # For non-HTML content, return limited info
+    return f"Document at {url} (Content-Type: {content_type})\nNote: Non-HTML content. Size: {len(content)} bytes."
+
+
+def _format_document(text: str, url: str) -> str:
+    """Truncate extracted text and prefix it with its source URL."""
+    # Limit text length (max ~10KB)
+    max_chars = 10000
+    if len(text) > max_chars:
+        text = text[:max_chars] + f"\n\n[Content truncated. Full document: {len(text)} characters]"
+
+    if not text or len(text) < 50:
+        return f"Document at {url}\nNote: Minimal content extracted. The page may be JavaScript-heavy or have restricted access."
+
+    print(f"✓ Fetched document from {url} ({len(text)} characters)")
+    return f"Document from: {url}\n\n{text}"
+
+
+def extract_content(content: bytes, url: str, content_type: str) -> str:
+    """
+    Extract the main readable text from a downloaded document.
+
+    Args:
+        content: Raw response body
+        url: Source URL (used in the returned header)
+        content_type: Response Content-Type
+
+    Returns:
+        Extracted text prefixed with its source URL
+    """
+    if 'text/html' not in content_type.lower():
+        return _non_html_note(content, url, content_type)
+    return _format_document(extract_main_text(content), url)
+
+
+async def aextract_content(content: bytes, url: str, content_type: str) -> str:
+    """Async `extract_content`; parsing runs off the event loop."""
+    if 'text/html' not in content_type.lower():
+        return _non_html_note(content, url, content_type)
+    return _format_document(await aextract_main_text(content), url)
+
+
+def fetch_document(url: str, max_size_kb: int = 500) -> str:
+    """
+    Fetch and extract main content from a URL.
+
+    Args:
+        url: URL to fetch
+        max_size_kb: Maximum document size in KB (default 500KB)
+
+    Returns:
+        Extracted text content from the page
+
+    Raises:
+        FetchError: If fetching fails or URL is invalid
+    """
+    _validate_url(url)
+
+    try:
         # Fetch with streaming to check size
-        response = requests.get(
+        response = get_sync_session().get(
             url,
-            headers=headers,
+            headers=BROWSER_HEADERS,
             timeout=10,
             stream=True,
             allow_redirects=True
         )
         response.raise_for_status()
 
-        # Check content size
-        content_length = response.headers.get('content-length')
-        if content_length and int(content_length) > max_size_kb * 1024:
-            raise FetchError(f"Document too large: {int(content_length) / 1024:.1f}KB (max {max_size_kb}KB)")
-
-        # Download content
-        content = b''
-        max_bytes = max_size_kb * 1024
+        # Check content size, then download into a capped buffer
+        body = BodyBuffer(max_size_kb * 1024, _check_content_length(response.headers, max_size_kb))
         for chunk in response.iter_content(chunk_size=8192):
-            content += chunk
-            if len(content) > max_bytes:
-                raise FetchError(f"Document exceeded size limit while downloading (max {max_size_kb}KB)")
-
-        # Check content type
-        content_type = response.headers.get('content-type', '')
-        if 'text/html' not in content_type.lower():
-            # For non-HTML content, return limited info
-            return f"Document at {url} (Content-Type: {content_type})\nNote: Non-HTML content. Size: {len(content)} bytes."
-
-        # Parse HTML
-        soup = BeautifulSoup(content, 'html.parser')
-
-        # Remove script and style elements
-        for script in soup(['script', 'style', 'nav', 'footer', 'header', 'aside']):
-            script.decompose()
-
-        # Extract text from main content areas (prioritize)
-        main_content = None
-        for selector in ['main', 'article', '[role="main"]', '.content', '#content', '.post', '.entry-content']:
-            main_content = soup.select_one(selector)
-            if main_content:
-                break
-
-        if main_content:
-            text = main_content.get_text(separator='\n', strip=True)
-        else:
-            # Fallback to body
-            text = soup.get_text(separator='\n', strip=True)
-
-        # Clean up text
-        lines = [line.strip() for line in text.split('\n') if line.strip()]
-        text = '\n'.join(lines)
-
-        # Limit text length (max ~10KB)
-        max_chars = 10000
-        if len(text) > max_chars:
-            text = text[:max_chars] + f"\n\n[Content truncated. Full document: {len(text)} characters]"
+            body.write(chunk)
 
-        if not text or len(text) < 50:
-            return f"Document at {url}\nNote: Minimal content extracted. The page may be JavaScript-heavy or have restricted access."
-
-        print(f"✓ Fetched document from {url} ({len(text)} characters)")
-        return f"Document from: {url}\n\n{text}"
+        return extract_content(body.getvalue(), url, response.headers.get('content-type', ''))
 
+    except FetchError:
+        raise
     except requests.exceptions.Timeout:
         raise FetchError(f"Request timed out for URL: {url}")
     except requests.exceptions.HTTPError as e:
-        if e.response.status_code == 404:
-            raise FetchError(f"Document not found (404): {url}")
-        elif e.response.status_code == 403:
-            raise FetchError(f"Access forbidden (403): {url}")
-        elif e.response.status_code == 429:
-            raise FetchError(f"Rate limited (429): {url}")
-        else:
-            raise FetchError(f"HTTP error {e.response.status_code}: {url}")
+        raise _status_error(e.response.status_code, url)
     except requests.exceptions.SSLError:
         raise FetchError(f"SSL certificate error for URL: {url}")
     except requests.exceptions.RequestException as e:
@@ -139,9 +193,117 @@ def fetch_document(url: str, max_size_kb: int = 500) -> str:
         raise FetchError(f"Unexpected error fetching {url}: {str(e)}")
 
 
+async def afetch_document(url: str, max_size_kb: int = 500) -> str:
+    """
+    Async variant of `fetch_document` over the shared HTTP client.
+
+    The download stops as soon as the body passes `max_size_kb`; HTML
+    extraction runs in a worker thread or, for large pages, a process pool.
+    """
+    _validate_url(url)
+
+    try:
+        async with get_async_client().stream("GET", url, headers=BROWSER_HEADERS, timeout=10) as response:
+            if response.status_code >= 400:
+                raise _status_error(response.status_code, url)
+
+            body = BodyBuffer(max_size_kb * 1024, _check_content_length(response.headers, max_size_kb))
+            async for chunk in response.aiter_bytes(chunk_size=8192):
+                body.write(chunk)
+            content_type = response.headers.get('content-type', '')
+
+        return await aextract_content(body.getvalue(), url, content_type)
+
+    except FetchError:
+        raise
+    except httpx.TimeoutException:
+        raise FetchError(f"Request timed out for URL: {url}")
+    except httpx.HTTPError as e:
+        raise FetchError(f"Request failed for {url}: {str(e)}")
+    except Exception as e:
+        raise FetchError(f"Unexpected error fetching {url}: {str(e)}")
+
+
+async def iter_fetch_many(
+    urls: List[str],
+    max_size_kb: int = 500,
+    deadline: Optional[float] = None,
+    max_concurrency: Optional[int] = None,
+    max_per_host: Optional[int] = None,
+) -> AsyncIterator[Tuple[str, Dict]]:
+    """
+    Fetch documents concurrently, yielding (url, result) as each finishes.
+
+    Args:
+        urls: URLs to fetch (duplicates are fetched once)
+        max_size_kb: Maximum size per document
+        deadline: Seconds for the whole batch; unfinished fetches are cancelled
+        max_concurrency: Fetches in flight overall (default Config.FETCH_CONCURRENCY)
+        max_per_host: Fetches in flight per host (default Config.FETCH_MAX_PER_HOST)
+
+    Yields:
+        (url, {"success": True, "content": ...} or {"success": False, "error": ...})
+    """
+    global_slots = asyncio.Semaphore(max_concurrency or Config.FETCH_CONCURRENCY)
+    per_host = max_per_host or Config.FETCH_MAX_PER_HOST
+    host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    async def fetch_one(url: str) -> Tuple[str, Dict]:
+        host = urlparse(url).netloc
+        host_slot = host_slots.setdefault(host, asyncio.Semaphore(per_host))
+        with span("fetch", url=url, host=host) as fetch:
+            try:
+                async with host_slot, global_slots:
+                    content = await afetch_document(url, max_size_kb)
+                fetch.set(chars=len(content))
+                return url, {"success": True, "content": content}
+            except (FetchError, ValueError) as e:
+                print(f"❌ Failed to fetch {url}: {e}")
+                fetch.fail(str(e))
+                return url, {"success": False, "error": str(e)}
+
+    pending = {asyncio.create_task(fetch_one(url)) for url in dict.fromkeys(urls)}
+    stop_at = time.monotonic() + deadline if deadline is not None else None
+    try:
+        while pending:
+            timeout = None if stop_at is None else max(0.0, stop_at - time.monotonic())
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def fetch_many(
+    urls: List[str],
+    max_size_kb: int = 500,
+    deadline: Optional[float] = None,
+    max_concurrency: Optional[int] = None,
+    max_per_host: Optional[int] = None,
+) -> Dict[str, Dict]:
+    """
+    Fetch documents concurrently under global and per-host limits.
+
+    Returns the same mapping as `fetch_multiple_documents`. With a
+    `deadline`, whatever finished in time is returned; URLs still in
+    flight are reported as failures.
+    """
+    results = {}
+    async for url, result in iter_fetch_many(urls, max_size_kb, deadline, max_concurrency, max_per_host):
+        results[url] = result
+    for url in urls:
+        results.setdefault(url, {"success": False, "error": "Not fetched before the batch deadline"})
+    return results
+
+
 def fetch_multiple_documents(urls: list, max_size_kb: int = 500) -> dict:
     """
-    Fetch multiple documents.
+    Fetch multiple documents sequentially.
+
+    Prefer `fetch_many` from async code; it fetches concurrently.
 
     Args:
         urls: List of URLs to fetch
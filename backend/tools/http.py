@@ -0,0 +1,256 @@
+"""
+Shared outbound HTTP clients for all tools.
+
+Every search and fetch goes through one pooled, keep-alive client instead
+of opening a fresh TCP+TLS connection per request:
+
+- `get_async_client()` returns an httpx.AsyncClient (HTTP/2 when `h2` is
+  installed) with global and per-host connection limits and a TTL cache
+  for DNS lookups.
+- `get_sync_session()` returns a pooled requests.Session for the remaining
+  synchronous callers.
+
+`close_http_clients()` is called on application shutdown.
+"""
+
+import asyncio
+import ipaddress
+import socket
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import httpcore
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import Config
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+}
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package."""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class CachingDNSBackend(httpcore.AsyncNetworkBackend):
+    """
+    Network backend that caches DNS answers for `ttl` seconds.
+
+    Only the TCP connect target is replaced by the cached address; TLS still
+    uses the original hostname for SNI and certificate checks.
+    """
+
+    def __init__(self, ttl: float = 300):
+        self.ttl = ttl
+        self._backend = httpcore.AnyIOBackend()
+        self._cache: Dict[Tuple[str, int], Tuple[str, float]] = {}
+
+    async def _resolve(self, host: str, port: int) -> str:
+        try:
+            ipaddress.ip_address(host)
+            return host
+        except ValueError:
+            pass
+        cached = self._cache.get((host, port))
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        address = infos[0][4][0]
+        self._cache[(host, port)] = (address, time.monotonic() + self.ttl)
+        return address
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        address = await self._resolve(host, port)
+        return await self._backend.connect_tcp(
+            address, port, timeout=timeout, local_address=local_address, socket_options=socket_options
+        )
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self._backend.connect_unix_socket(path, timeout=timeout, socket_options=socket_options)
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response body wrapper that frees a per-host slot when the body is closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+        self._released = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._release()
+
+
+class _HostSlots:
+    """Concurrency cap for one host, and how many requests hold or await it."""
+
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.users = 0
+
+
+class PooledTransport(httpx.AsyncHTTPTransport):
+    """
+    Keep-alive transport with a DNS cache and a per-host concurrency cap.
+
+    A request holds its host's slot until the response body is closed, so a
+    slow site can't take up the whole pool. A host's entry only exists while
+    requests to it are in flight, so the hosts seen over a long run don't
+    accumulate.
+    """
+
+    def __init__(self, max_per_host: int, dns_ttl: float, verify=True, cert=None, trust_env: bool = True, **kwargs):
+        ssl_context = httpx.create_ssl_context(verify=verify, cert=cert, trust_env=trust_env)
+        super().__init__(verify=ssl_context, **kwargs)
+        limits = kwargs.get("limits", httpx.Limits())
+        # httpx doesn't expose a network backend option, so replace its pool
+        # with one with the same settings plus the caching resolver. The
+        # replaced pool never opens a connection but is closed with ours.
+        self._replaced_pool = self._pool
+        self._pool = httpcore.AsyncConnectionPool(
+            ssl_context=ssl_context,
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            http1=kwargs.get("http1", True),
+            http2=kwargs.get("http2", False),
+            retries=kwargs.get("retries", 0),
+            network_backend=CachingDNSBackend(ttl=dns_ttl),
+        )
+        self.max_per_host = max_per_host
+        self._hosts: Dict[str, _HostSlots] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        slots = self._hosts.get(host)
+        if slots is None:
+            slots = self._hosts[host] = _HostSlots(self.max_per_host)
+        slots.users += 1
+        try:
+            await slots.semaphore.acquire()
+        except BaseException:
+            self._leave(host, slots)
+            raise
+        try:
+            response = await super().handle_async_request(request)
+        except BaseException:
+            self._release(host, slots)
+            raise
+        response.stream = _ReleasingStream(response.stream, lambda: self._release(host, slots))
+        return response
+
+    def _release(self, host: str, slots: _HostSlots) -> None:
+        slots.semaphore.release()
+        self._leave(host, slots)
+
+    def _leave(self, host: str, slots: _HostSlots) -> None:
+        slots.users -= 1
+        if slots.users == 0 and self._hosts.get(host) is slots:
+            del self._hosts[host]
+
+    async def aclose(self) -> None:
+        try:
+            await super().aclose()
+        finally:
+            await self._replaced_pool.aclose()
+
+    async def __aexit__(self, exc_type=None, exc_value=None, traceback=None) -> None:
+        try:
+            await super().__aexit__(exc_type, exc_value, traceback)
+        finally:
+            await self._replaced_pool.aclose()
+
+
+def create_async_client(verify=True, **kwargs) -> httpx.AsyncClient:
+    """Build a pooled async client from configuration."""
+    http2 = Config.HTTP2_ENABLED and http2_available()
+    limits = httpx.Limits(
+        max_connections=Config.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=Config.HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=Config.HTTP_KEEPALIVE_EXPIRY,
+    )
+    transport = PooledTransport(
+        max_per_host=Config.HTTP_MAX_PER_HOST,
+        dns_ttl=Config.HTTP_DNS_CACHE_TTL,
+        verify=verify,
+        limits=limits,
+        http2=http2,
+    )
+    return httpx.AsyncClient(
+        transport=transport,
+        headers=DEFAULT_HEADERS,
+        timeout=httpx.Timeout(Config.HTTP_TIMEOUT, connect=5.0),
+        follow_redirects=True,
+        **kwargs,
+    )
+
+
+def create_sync_session() -> requests.Session:
+    """Build a pooled requests session for synchronous callers."""
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=Config.HTTP_MAX_PER_HOST)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+_async_client: Optional[httpx.AsyncClient] = None
+_async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_sync_session: Optional[requests.Session] = None
+_sync_lock = threading.Lock()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Get or create the shared async client for the running event loop."""
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    # Pooled connections belong to one event loop; the server only ever has
+    # one, but tests and scripts may start several.
+    if _async_client is None or _async_client.is_closed or _async_client_loop is not loop:
+        _async_client = create_async_client()
+        _async_client_loop = loop
+    return _async_client
+
+
+def get_sync_session() -> requests.Session:
+    """Get or create the shared requests session."""
+    global _sync_session
+    with _sync_lock:
+        if _sync_session is None:
+            _sync_session = create_sync_session()
+        return _sync_session
+
+
+async def close_http_clients() -> None:
+    """Close pooled connections; called on application shutdown."""
+    global _async_client, _async_client_loop, _sync_session
+    if _async_client is not None and _async_client_loop is asyncio.get_running_loop():
+        await _async_client.aclose()
+    _async_client = None
+    _async_client_loop = None
+    with _sync_lock:
+        if _sync_session is not None:
+            _sync_session.close()
+            _sync_session = None
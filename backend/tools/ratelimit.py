@@ -0,0 +1,203 @@
+"""
+Token-bucket rate limiting for outbound search providers.
+
+Each provider gets a bucket with a refill rate (requests/second) and a burst
+size. Callers reserve a token and are told how long to wait for it; because
+reservations are handed out in call order, waiters are served FIFO. Bucket
+state lives either in-process or in a shared SQLite file so several uvicorn
+workers respect one quota.
+"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from config import Config
+from core.metrics import RATE_LIMIT_WAIT
+
+
+class MemoryBucketStore:
+    """In-process bucket state, shared by all sessions in this worker."""
+
+    is_shared = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, tuple] = {}
+
+    def reserve(self, name: str, rate: float, burst: int) -> float:
+        """Take one token from the bucket and return the seconds to wait for it."""
+        return self._update(name, burst, lambda tokens, elapsed: _take_token(tokens, elapsed, rate, burst))
+
+    def refund(self, name: str, rate: float, burst: int) -> None:
+        """Give back a token that was reserved but not used."""
+        self._update(name, burst, lambda tokens, elapsed: (_return_token(tokens, elapsed, rate, burst), None))
+
+    def _update(self, name: str, burst: int, change: Callable[[float, float], tuple]) -> Any:
+        with self._lock:
+            now = time.time()
+            tokens, updated = self._buckets.get(name, (float(burst), now))
+            tokens, result = change(tokens, now - updated)
+            self._buckets[name] = (tokens, now)
+            return result
+
+
+class SQLiteBucketStore:
+    """
+    Bucket state in a SQLite file, shared between processes.
+
+    Each reservation runs in an IMMEDIATE transaction, so concurrent workers
+    serialize on the row and hand out tokens in order.
+    """
+
+    is_shared = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets ("
+            "name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared across threads; keep one per thread.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def reserve(self, name: str, rate: float, burst: int) -> float:
+        """Take one token from the shared bucket and return the seconds to wait for it."""
+        return self._update(name, burst, lambda tokens, elapsed: _take_token(tokens, elapsed, rate, burst))
+
+    def refund(self, name: str, rate: float, burst: int) -> None:
+        """Give back a token that was reserved but not used."""
+        self._update(name, burst, lambda tokens, elapsed: (_return_token(tokens, elapsed, rate, burst), None))
+
+    def _update(self, name: str, burst: int, change: Callable[[float, float], tuple]) -> Any:
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            row = conn.execute(
+                "SELECT tokens, updated FROM rate_buckets WHERE name = ?", (name,)
+            ).fetchone()
+            tokens, updated = row if row else (float(burst), now)
+            tokens, result = change(tokens, now - updated)
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                (name, tokens, now),
+            )
+            conn.execute("COMMIT")
+            return result
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def _take_token(tokens: float, elapsed: float, rate: float, burst: int) -> tuple:
+    """
+    Refill the bucket for `elapsed` seconds and take one token.
+
+    The balance may go negative: that is a reservation for a future token,
+    and the caller waits until the refill covers it.
+    """
+    tokens = min(float(burst), tokens + max(elapsed, 0.0) * rate) - 1.0
+    wait = 0.0 if tokens >= 0 else -tokens / rate
+    return tokens, wait
+
+
+def _return_token(tokens: float, elapsed: float, rate: float, burst: int) -> float:
+    """Refill the bucket for `elapsed` seconds and put one token back."""
+    return min(float(burst), tokens + max(elapsed, 0.0) * rate + 1.0)
+
+
+class TokenBucket:
+    """Rate limiter for one provider."""
+
+    def __init__(self, name: str, rate: float, burst: int = 1, store=None):
+        """
+        Args:
+            name: Provider name, used as bucket key and metric label
+            rate: Sustained requests per second
+            burst: Requests allowed back to back before throttling
+            store: Bucket state store (defaults to in-process)
+        """
+        if rate <= 0:
+            raise ValueError(f"Rate limit for {name} must be positive")
+        self.name = name
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.store = store or MemoryBucketStore()
+
+    def reserve(self) -> float:
+        """Reserve the next token; returns the delay before it may be used."""
+        return self.store.reserve(self.name, self.rate, self.burst)
+
+    async def acquire(self) -> float:
+        """Wait for a token without blocking the event loop. Returns the time waited."""
+        if self.store.is_shared:
+            wait = await asyncio.to_thread(self.reserve)
+        else:
+            wait = self.reserve()
+        RATE_LIMIT_WAIT.labels(provider=self.name).observe(wait)
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                # The caller gave up (disconnect, batch deadline); let the
+                # token go to whoever asks next
+                if self.store.is_shared:
+                    await asyncio.to_thread(self.refund)
+                else:
+                    self.refund()
+                raise
+        return wait
+
+    def refund(self) -> None:
+        """Return a reserved token that won't be used."""
+        self.store.refund(self.name, self.rate, self.burst)
+
+    def acquire_sync(self) -> float:
+        """Blocking variant of `acquire` for synchronous callers."""
+        wait = self.reserve()
+        RATE_LIMIT_WAIT.labels(provider=self.name).observe(wait)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+_limiters: Dict[str, TokenBucket] = {}
+_limiters_lock = threading.Lock()
+_store = None
+
+
+def _get_store():
+    """Shared store for all provider buckets, chosen by RATE_LIMIT_DB_PATH."""
+    global _store
+    if _store is None:
+        _store = SQLiteBucketStore(Config.RATE_LIMIT_DB_PATH) if Config.RATE_LIMIT_DB_PATH else MemoryBucketStore()
+    return _store
+
+
+def get_rate_limiter(provider: str) -> TokenBucket:
+    """Get or create the process-wide rate limiter for a search provider."""
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            rate, burst = Config.get_rate_limit(provider)
+            limiter = TokenBucket(provider, rate, burst, store=_get_store())
+            _limiters[provider] = limiter
+        return limiter
+
+
+def reset_rate_limiters(store: Optional[object] = None) -> None:
+    """Drop all limiters so they are rebuilt from current configuration."""
+    global _store
+    with _limiters_lock:
+        _limiters.clear()
+        _store = store
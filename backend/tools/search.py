@@ -3,52 +3,26 @@ Brave Search API integration for real web search.
 Includes rate limiting, caching, and error handling.
 """
 
+import httpx
+import json
 import requests
-import time
 from typing import List, Dict, Optional
-from functools import lru_cache
 from config import Config
-
-# Rate limiting
-_last_request_time = 0
-_min_request_interval = 1.0  # Minimum seconds between requests
+from .http import get_async_client, get_sync_session
+from .ratelimit import get_rate_limiter
+from .search_cache import get_search_cache, is_permanent_failure
 
 
 class SearchError(Exception):
     """Exception raised for search API errors."""
-    pass
-
-
-def _rate_limit():
-    """Enforce rate limiting between API requests."""
-    global _last_request_time
-    current_time = time.time()
-    time_since_last = current_time - _last_request_time
-
-    if time_since_last < _min_request_interval:
-        sleep_time = _min_request_interval - time_since_last
-        time.sleep(sleep_time)
-
-    _last_request_time = time.time()
-
-
-@lru_cache(maxsize=100)
-def _cached_search(query: str, count: int) -> str:
-    """
-    Cached search function to avoid duplicate API calls.
-
-    Args:
-        query: Search query
-        count: Number of results
 
-    Returns:
-        JSON response as string (for caching)
-    """
-    _rate_limit()
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        # HTTP status of the failed request, if it got a response
+        self.status_code = status_code
 
-    # Brave Search API endpoint
-    url = "https://api.search.brave.com/res/v1/web/search"
 
+def _brave_request_args(query: str, count: int) -> Dict:
     headers = {
         "Accept": "application/json",
         "Accept-Encoding": "gzip",
@@ -61,30 +35,138 @@ def _cached_search(query: str, count: int) -> str:
         "search_lang": "en",
         "safesearch": "moderate"
     }
+    return {"headers": headers, "params": params, "timeout": 10}
+
+
+def _status_error(status_code: int, error: Exception) -> SearchError:
+    if status_code == 429:
+        return SearchError("Rate limit exceeded. Please try again later.", status_code)
+    elif status_code == 401:
+        return SearchError("Invalid API key. Please check BRAVE_SEARCH_API_KEY configuration.", status_code)
+    return SearchError(f"HTTP error {status_code}: {str(error)}", status_code)
+
+
+def _request_search(query: str, count: int) -> str:
+    """
+    Call the Brave Search API over the shared requests session.
 
+    Args:
+        query: Search query
+        count: Number of results
+
+    Returns:
+        JSON response as string
+    """
     try:
-        response = requests.get(
-            url,
-            headers=headers,
-            params=params,
-            timeout=10
-        )
+        response = get_sync_session().get(Config.BRAVE_SEARCH_URL, **_brave_request_args(query, count))
         response.raise_for_status()
         return response.text
 
     except requests.exceptions.Timeout:
         raise SearchError(f"Search request timed out for query: {query}")
     except requests.exceptions.HTTPError as e:
-        if e.response.status_code == 429:
-            raise SearchError("Rate limit exceeded. Please try again later.")
-        elif e.response.status_code == 401:
-            raise SearchError("Invalid API key. Please check BRAVE_SEARCH_API_KEY configuration.")
-        else:
-            raise SearchError(f"HTTP error {e.response.status_code}: {str(e)}")
+        raise _status_error(e.response.status_code, e)
     except requests.exceptions.RequestException as e:
         raise SearchError(f"Search request failed: {str(e)}")
 
 
+async def _arequest_search(query: str, count: int) -> str:
+    """Call the Brave Search API over the shared async client."""
+    try:
+        response = await get_async_client().get(Config.BRAVE_SEARCH_URL, **_brave_request_args(query, count))
+        response.raise_for_status()
+        return response.text
+
+    except httpx.TimeoutException:
+        raise SearchError(f"Search request timed out for query: {query}")
+    except httpx.HTTPStatusError as e:
+        raise _status_error(e.response.status_code, e)
+    except httpx.HTTPError as e:
+        raise SearchError(f"Search request failed: {str(e)}")
+
+
+def _cached_search(query: str, count: int) -> List[Dict]:
+    """
+    Cached search function to avoid duplicate API calls.
+
+    Blocks the calling thread while waiting for a rate-limit token; async
+    callers use `_acached_search` instead. Returns an empty list for
+    queries that recently found nothing or failed permanently.
+    """
+    cache = get_search_cache()
+    results = cache.get("brave", query, count=count)
+    if results is None:
+        get_rate_limiter("brave").acquire_sync()
+        try:
+            results = _parse_results(_request_search(query, count), count)
+        except Exception as e:
+            if is_permanent_failure(e):
+                cache.set_failure("brave", query, count=count)
+            raise
+        cache.set("brave", query, results, count=count)
+    return results
+
+
+async def _acached_search(query: str, count: int) -> List[Dict]:
+    """Async variant of `_cached_search` that awaits its rate-limit token."""
+    cache = get_search_cache()
+    results = await cache.aget("brave", query, count=count)
+    if results is None:
+        await get_rate_limiter("brave").acquire()
+        try:
+            response_text = await _arequest_search(query, count)
+            results = _parse_results(response_text, count)
+        except Exception as e:
+            if is_permanent_failure(e):
+                await cache.aset_failure("brave", query, count=count)
+            raise
+        await cache.aset("brave", query, results, count=count)
+    return results
+
+
+def _validate_search(query: str, count: int) -> int:
+    """Validate the query and return `count` clamped to 1-20."""
+    if not query or not query.strip():
+        raise ValueError("Search query cannot be empty")
+
+    if count < 1 or count > 20:
+        count = min(max(count, 1), 20)  # Clamp to 1-20
+    return count
+
+
+def _has_api_key() -> bool:
+    if not Config.BRAVE_SEARCH_API_KEY or Config.BRAVE_SEARCH_API_KEY == "your_brave_search_api_key_here":
+        print("⚠️ Warning: BRAVE_SEARCH_API_KEY not configured, using mock data")
+        return False
+    return True
+
+
+def _parse_results(response_text: str, count: int) -> List[Dict]:
+    """Normalize a Brave API response into title/url/description results."""
+    response_data = json.loads(response_text)
+
+    # Extract web results
+    results = []
+    web_results = response_data.get("web", {}).get("results", [])
+
+    for item in web_results[:count]:
+        results.append({
+            "title": item.get("title", ""),
+            "url": item.get("url", ""),
+            "description": item.get("description", "")
+        })
+    return results
+
+
+def _results_or_mock(query: str, results: List[Dict], count: int) -> List[Dict]:
+    if not results:
+        print(f"⚠️ Warning: No results found for query: {query}")
+        return _mock_search(query, min(count, 3))
+
+    print(f"✓ Found {len(results)} search results for: {query}")
+    return results
+
+
 def search_web(query: str, count: int = 10) -> List[Dict]:
     """
     Search the web using Brave Search API.
@@ -102,46 +184,43 @@ def search_web(query: str, count: int = 10) -> List[Dict]:
     Raises:
         SearchError: If search fails or API key is invalid
     """
-    # Input validation
-    if not query or not query.strip():
-        raise ValueError("Search query cannot be empty")
+    count = _validate_search(query, count)
 
-    if count < 1 or count > 20:
-        count = min(max(count, 1), 20)  # Clamp to 1-20
-
-    # Check if API key is configured
-    if not Config.BRAVE_SEARCH_API_KEY or Config.BRAVE_SEARCH_API_KEY == "your_brave_search_api_key_here":
-        # Fallback to mock data if no API key
-        print("⚠️ Warning: BRAVE_SEARCH_API_KEY not configured, using mock data")
+    # Fallback to mock data if no API key
+    if not _has_api_key():
         return _mock_search(query, count)
 
     try:
         # Get cached or fresh search results
-        import json
-        response_text = _cached_search(query, count)
-        response_data = json.loads(response_text)
+        return _results_or_mock(query, _cached_search(query, count), count)
 
-        # Extract web results
-        results = []
-        web_results = response_data.get("web", {}).get("results", [])
+    except SearchError as e:
+        print(f"❌ Search error: {e}")
+        # Fallback to mock data on error
+        print("  → Falling back to mock data")
+        return _mock_search(query, min(count, 3))
+    except Exception as e:
+        print(f"❌ Unexpected error in search: {e}")
+        return _mock_search(query, min(count, 3))
 
-        for item in web_results[:count]:
-            results.append({
-                "title": item.get("title", ""),
-                "url": item.get("url", ""),
-                "description": item.get("description", "")
-            })
 
-        if not results:
-            print(f"⚠️ Warning: No results found for query: {query}")
-            return _mock_search(query, min(count, 3))
+async def asearch_web(query: str, count: int = 10) -> List[Dict]:
+    """
+    Async variant of `search_web` for use inside the event loop.
 
-        print(f"✓ Found {len(results)} search results for: {query}")
-        return results
+    Awaits the shared Brave rate limiter instead of sleeping and sends the
+    request over the pooled async client.
+    """
+    count = _validate_search(query, count)
+
+    if not _has_api_key():
+        return _mock_search(query, count)
+
+    try:
+        return _results_or_mock(query, await _acached_search(query, count), count)
 
     except SearchError as e:
         print(f"❌ Search error: {e}")
-        # Fallback to mock data on error
         print("  → Falling back to mock data")
         return _mock_search(query, min(count, 3))
     except Exception as e:
@@ -181,5 +260,5 @@ def _mock_search(query: str, count: int) -> List[Dict]:
 
 def clear_search_cache():
     """Clear the search cache."""
-    _cached_search.cache_clear()
+    get_search_cache().clear()
     print("✓ Search cache cleared")
@@ -0,0 +1,129 @@
+"""
+Search result cache shared by the Brave and Tavily integrations.
+
+Entries are keyed on provider, normalized query and request parameters, and
+expire after a per-provider TTL. Empty searches, and failures that a retry
+can't fix (see `is_permanent_failure`), are cached for a shorter negative
+TTL so a broken query isn't retried on every session. Transient failures
+(timeouts, 429, 5xx) are not cached.
+"""
+
+import asyncio
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+from config import Config
+from core.cache import MemoryCache, SQLiteCache
+from core.metrics import SEARCH_CACHE_EVENTS
+from core.tracing import span
+
+_PUNCTUATION = re.compile(r"[^\w\s+#&$%]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a query so trivially different phrasings share a cache entry.
+
+    Lowercases, drops punctuation (keeping symbols such as + # & $ % that
+    change meaning, e.g. "C++") and collapses whitespace.
+    """
+    query = _PUNCTUATION.sub(" ", query.lower())
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+def is_permanent_failure(error: Exception) -> bool:
+    """
+    Whether a failed search would fail again if retried.
+
+    Only 4xx responses count, except 408 and 429; timeouts, connection
+    errors and 5xx responses are transient.
+    """
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    return isinstance(status_code, int) and 400 <= status_code < 500 and status_code not in (408, 429)
+
+
+class SearchCache:
+    """Provider-aware result cache on top of a `core.cache` backend."""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    @staticmethod
+    def make_key(provider: str, query: str, **params: Any) -> str:
+        param_str = "&".join(f"{k}={params[k]}" for k in sorted(params))
+        return f"{provider}|{normalize_query(query)}|{param_str}"
+
+    def get(self, provider: str, query: str, **params: Any) -> Optional[List[Dict]]:
+        """
+        Look up cached results.
+
+        Returns None on a miss and an empty list on a negative hit.
+        """
+        with span("cache.lookup", cache="search", provider=provider) as lookup:
+            value = self.backend.get(self.make_key(provider, query, **params))
+            if value is None:
+                SEARCH_CACHE_EVENTS.labels(provider=provider, event="miss").inc()
+                lookup.set(hit=False)
+                return None
+            results = json.loads(value)
+            event = "hit" if results else "negative_hit"
+            SEARCH_CACHE_EVENTS.labels(provider=provider, event=event).inc()
+            lookup.set(hit=True, negative=not results)
+            return results
+
+    def set(self, provider: str, query: str, results: List[Dict], **params: Any) -> None:
+        """Cache results; an empty list is stored with the negative TTL."""
+        ttl = Config.get_search_cache_ttl(provider) if results else Config.SEARCH_CACHE_NEGATIVE_TTL
+        evicted = self.backend.set(self.make_key(provider, query, **params), json.dumps(results), ttl)
+        if evicted:
+            SEARCH_CACHE_EVENTS.labels(provider=provider, event="eviction").inc(evicted)
+
+    def set_failure(self, provider: str, query: str, **params: Any) -> None:
+        """Negatively cache a failed search."""
+        self.set(provider, query, [], **params)
+
+    async def aset_failure(self, provider: str, query: str, **params: Any) -> None:
+        """Async `set_failure`."""
+        await self.aset(provider, query, [], **params)
+
+    async def aget(self, provider: str, query: str, **params: Any) -> Optional[List[Dict]]:
+        """Async `get`; disk lookups run in a worker thread."""
+        if self.backend.is_persistent:
+            return await asyncio.to_thread(self.get, provider, query, **params)
+        return self.get(provider, query, **params)
+
+    async def aset(self, provider: str, query: str, results: List[Dict], **params: Any) -> None:
+        """Async `set`; disk writes run in a worker thread."""
+        if self.backend.is_persistent:
+            await asyncio.to_thread(self.set, provider, query, results, **params)
+        else:
+            self.set(provider, query, results, **params)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+
+_search_cache: Optional[SearchCache] = None
+
+
+def get_search_cache() -> SearchCache:
+    """Get or create the global search cache (SQLite if SEARCH_CACHE_PATH is set)."""
+    global _search_cache
+    if _search_cache is None:
+        if Config.SEARCH_CACHE_PATH:
+            backend = SQLiteCache(Config.SEARCH_CACHE_PATH, namespace="search",
+                                  max_entries=Config.SEARCH_CACHE_MAX_ENTRIES)
+        else:
+            backend = MemoryCache(max_entries=Config.SEARCH_CACHE_MAX_ENTRIES)
+        _search_cache = SearchCache(backend)
+    return _search_cache
+
+
+def set_search_cache(cache: Optional[SearchCache]) -> None:
+    """Replace the global search cache (None rebuilds it from configuration)."""
+    global _search_cache
+    _search_cache = cache
@@ -1,7 +1,52 @@
-
-from typing import List, Dict, Any
-from tavily import TavilyClient
+from typing import List, Dict
 from config import Config
+from .http import get_async_client, get_sync_session
+from .ratelimit import get_rate_limiter
+from .search_cache import get_search_cache, is_permanent_failure
+
+
+def _tavily_payload(api_key: str, query: str, max_results: int, depth: str) -> Dict:
+    # Determine search depth based on request
+    search_depth = "advanced" if depth == "advanced" else "basic"
+
+    return {
+        "api_key": api_key,
+        "query": query,
+        "search_depth": search_depth,
+        "max_results": max_results,
+        "include_answer": False # We handle separate integration if needed
+    }
+
+
+def _format_results(response: Dict) -> List[Dict[str, str]]:
+    results = []
+    for result in response.get("results", []):
+        results.append({
+            "title": result.get("title", ""),
+            "url": result.get("url", ""),
+            "description": result.get("content", "")[:500] # Use content as description
+        })
+
+    return results
+
+
+def _request_tavily(api_key: str, query: str, max_results: int, depth: str) -> List[Dict[str, str]]:
+    """Call the Tavily search API over the shared requests session."""
+    response = get_sync_session().post(
+        Config.TAVILY_SEARCH_URL, json=_tavily_payload(api_key, query, max_results, depth), timeout=100
+    )
+    response.raise_for_status()
+    return _format_results(response.json())
+
+
+async def _arequest_tavily(api_key: str, query: str, max_results: int, depth: str) -> List[Dict[str, str]]:
+    """Call the Tavily search API over the shared async client."""
+    response = await get_async_client().post(
+        Config.TAVILY_SEARCH_URL, json=_tavily_payload(api_key, query, max_results, depth), timeout=100
+    )
+    response.raise_for_status()
+    return _format_results(response.json())
+
 
 def tavily_search(query: str, max_results: int = 5, depth: str = "basic") -> List[Dict[str, str]]:
     """
@@ -20,29 +65,51 @@ def tavily_search(query: str, max_results: int = 5, depth: str = "basic") -> Lis
         print("Error: TAVILY_API_KEY not configured.")
         return []
         
+    cache = get_search_cache()
+    results = cache.get("tavily", query, max_results=max_results, depth=depth)
+    if results is not None:
+        return results
+
     try:
-        client = TavilyClient(api_key=api_key)
+        get_rate_limiter("tavily").acquire_sync()
+        results = _request_tavily(api_key, query, max_results, depth)
         
-        # Determine search depth based on request
-        search_depth = "advanced" if depth == "advanced" else "basic"
-        
-        response = client.search(
-            query=query, 
-            search_depth=search_depth, 
-            max_results=max_results,
-            include_answer=False # We handle separate integration if needed
-        )
-        
-        results = []
-        for result in response.get("results", []):
-            results.append({
-                "title": result.get("title", ""),
-                "url": result.get("url", ""),
-                "description": result.get("content", "")[:500] # Use content as description
-            })
-            
+    except Exception as e:
+        print(f"Tavily search error: {e}")
+        if is_permanent_failure(e):
+            cache.set_failure("tavily", query, max_results=max_results, depth=depth)
+        return []
+
+    cache.set("tavily", query, results, max_results=max_results, depth=depth)
+    return results
+
+
+async def atavily_search(query: str, max_results: int = 5, depth: str = "basic") -> List[Dict[str, str]]:
+    """
+    Async variant of `tavily_search`.
+
+    Awaits the shared Tavily rate limiter and sends the request over the
+    pooled async client.
+    """
+    api_key = Config.TAVILY_API_KEY
+    if not api_key:
+        print("Error: TAVILY_API_KEY not configured.")
+        return []
+
+    cache = get_search_cache()
+    results = await cache.aget("tavily", query, max_results=max_results, depth=depth)
+    if results is not None:
         return results
-        
+
+    try:
+        await get_rate_limiter("tavily").acquire()
+        results = await _arequest_tavily(api_key, query, max_results, depth)
+
     except Exception as e:
         print(f"Tavily search error: {e}")
+        if is_permanent_failure(e):
+            await cache.aset_failure("tavily", query, max_results=max_results, depth=depth)
         return []
+
+    await cache.aset("tavily", query, results, max_results=max_results, depth=depth)
+    return results
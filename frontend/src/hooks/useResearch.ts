@@ -5,8 +5,12 @@ import type {
   AgentState,
   UseResearchReturn,
   SSEStateEvent,
+  SSEDeltaEvent,
+  SSEPatchEvent,
+  SSEQueuedEvent,
   SSEErrorEvent,
 } from "@/types/research";
+import { SSE_PROTOCOL_VERSION } from "@/types/research";
 
 const BACKEND_URL = process.env.NEXT_PUBLIC_BACKEND_URL || "http://localhost:8000";
 
@@ -15,6 +19,20 @@ const initialState: AgentState = {
   logs: [],
 };
 
+/**
+ * Apply a protocol 2 patch: replace `set` fields, extend `append` lists and text
+ */
+function applyPatch(prev: AgentState, patch: SSEPatchEvent): AgentState {
+  const next: AgentState = { ...prev, ...patch.set };
+  const append = patch.append || {};
+  if (append.logs) next.logs = [...next.logs, ...append.logs];
+  if (append.sources) next.sources = [...(next.sources || []), ...append.sources];
+  for (const field of ["strategy", "raw_data", "insights", "final_report"] as const) {
+    if (append[field]) next[field] = (next[field] || "") + append[field];
+  }
+  return next;
+}
+
 /**
  * Custom hook for managing market research via SSE API
  */
@@ -51,12 +69,16 @@ export function useResearch(): UseResearchReturn {
         headers: {
           "Content-Type": "application/json",
         },
-        body: JSON.stringify({ topic, research_depth }),
+        body: JSON.stringify({ topic, research_depth, protocol: SSE_PROTOCOL_VERSION }),
         signal: abortController.signal,
       });
 
       if (!response.ok) {
         const errorData = await response.json().catch(() => ({}));
+        if (response.status === 429) {
+          const retryAfter = response.headers.get("Retry-After");
+          throw new Error(`Server is busy, please retry${retryAfter ? ` in ${retryAfter}s` : " shortly"}`);
+        }
         throw new Error(errorData.detail || `HTTP error: ${response.status}`);
       }
 
@@ -103,6 +125,11 @@ export function useResearch(): UseResearchReturn {
           try {
             const data = JSON.parse(eventData);
 
+            // The first event of a session names its trace
+            if (data.trace_id) {
+              setState((prev) => ({ ...prev, trace_id: data.trace_id }));
+            }
+
             switch (eventType) {
               case "state":
                 const stateData = data as SSEStateEvent;
@@ -118,6 +145,28 @@ export function useResearch(): UseResearchReturn {
                 }));
                 break;
 
+              case "delta":
+                const deltaData = data as SSEDeltaEvent;
+                setState((prev) => ({
+                  ...prev,
+                  [deltaData.field]: (prev[deltaData.field] || "") + deltaData.text,
+                }));
+                break;
+
+              case "patch":
+                const patchData = data as SSEPatchEvent;
+                setState((prev) => applyPatch(prev, patchData));
+                break;
+
+              case "queued":
+                const queuedData = data as SSEQueuedEvent;
+                setState((prev) => ({
+                  ...prev,
+                  current_step: "queued",
+                  queue_position: queuedData.position,
+                }));
+                break;
+
               case "complete":
                 setState((prev) => ({
                   ...prev,
@@ -5,6 +5,7 @@
 // Agent pipeline steps
 export type ResearchStep =
   | "idle"
+  | "queued"
   | "strategist"
   | "researcher"
   | "analyst"
@@ -59,10 +60,17 @@ export interface AgentState {
   final_report?: string;
   sources?: Source[];
   error?: string;
+  // Place in the server's admission queue while waiting for a slot
+  queue_position?: number;
+  // Server trace of the session, viewable at GET /traces/{trace_id}
+  trace_id?: string;
 }
 
 // SSE Event types from backend
-export type SSEEventType = "state" | "complete" | "error";
+export type SSEEventType = "state" | "delta" | "patch" | "queued" | "complete" | "error";
+
+// SSE wire protocol requested from the backend: 1 = full state, 2 = patches
+export const SSE_PROTOCOL_VERSION = 2;
 
 export interface SSEStateEvent {
   current_step: ResearchStep;
@@ -75,14 +83,53 @@ export interface SSEStateEvent {
   sources?: Source[];
 }
 
+// Incremental text for a streamed field (analyst insights, final report)
+export interface SSEDeltaEvent {
+  field: "insights" | "final_report";
+  text: string;
+}
+
+// Protocol 2: fields to replace, and list items / text to append
+export interface SSEPatchEvent {
+  set?: Partial<AgentState>;
+  append?: {
+    logs?: string[];
+    sources?: Source[];
+    strategy?: string;
+    raw_data?: string;
+    insights?: string;
+    final_report?: string;
+  };
+}
+
+// Sent while the session waits for a pipeline slot
+export interface SSEQueuedEvent {
+  position: number;
+}
+
+// LLM token totals for a session, overall and per pipeline role
+export interface TokenUsage {
+  prompt_tokens: number;
+  response_tokens: number;
+  total_tokens: number;
+  calls: number;
+  by_role: Record<string, { prompt_tokens: number; response_tokens: number; calls: number }>;
+  // Present when the server enforces a session token budget
+  budget?: number;
+  degraded?: string[];
+}
+
 export interface SSECompleteEvent {
   status: "success";
-  final_report: string;
+  usage?: TokenUsage;
+  // Sent by protocol 1 only
+  final_report?: string;
 }
 
 export interface SSEErrorEvent {
   error: string;
-  logs: string[];
+  // Sent by protocol 1 only
+  logs?: string[];
 }
 
 // Research hook return type